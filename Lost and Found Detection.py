@@ -1,52 +1,183 @@
+import argparse
+import os
+import time
+
 import numpy as np
 import face_recognition
 import cv2
 
-# ---------------------------
-# Step 1: Register Face (only run once or if you want to overwrite)
-# ---------------------------
-try:
-    my_face = np.load("my_face.npy")  # Try loading saved encoding
-    print("Face encoding loaded successfully!")
-except FileNotFoundError:
-    print("No saved encoding found. Registering new face...")
-    your_image = face_recognition.load_image_file("image.jpeg")  # your clear front photo
-    your_encoding = face_recognition.face_encodings(your_image)[0]
-    np.save("my_face.npy", your_encoding)
-    my_face = your_encoding
-    print("Face registered and saved!")
+from face_archive import FaceArchive
+from face_gallery import FaceGallery
+from face_registration import encode_photo
+from face_tracking import FaceTracker
 
-# ---------------------------
-# Step 2: Load Target Image for Recognition
-# ---------------------------
-frame = cv2.imread("image.jpeg")  # Replace with another image if testing recognition
-rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+GALLERY_DIR = "face_gallery"
+MATCH_TOLERANCE = 0.5
+TOP_K = 3
+MATCH_NPROBE = None  # recall/speed knob, used when the gallery has an approximate index
 
-# Detect faces in target image
-face_locations = face_recognition.face_locations(rgb_frame)
-face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
 
 # ---------------------------
-# Step 3: Compare and Draw Results
+# Step 1: Load Gallery (register a face only if the gallery is empty)
 # ---------------------------
-for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-    # Compare with your stored face
-    match = face_recognition.compare_faces([my_face], face_encoding, tolerance=0.5)
+def load_gallery():
+    gallery = FaceGallery(GALLERY_DIR)
+    if len(gallery) == 0:
+        if os.path.exists("my_face.npy"):
+            # Migrate the old single-person encoding into the gallery
+            gallery.add("my_face", np.load("my_face.npy"), source="my_face.npy")
+            print("Imported my_face.npy into the gallery.")
+        else:
+            print("Gallery is empty. Registering new face...")
+            # your clear front photo; checked like a help-desk registration
+            your_encoding, error = encode_photo("image.jpeg")
+            if error:
+                print(f"Could not register image.jpeg: {error}")
+            else:
+                gallery.add("my_face", your_encoding, source="image.jpeg")
+                print("Face registered and saved!")
+    print(f"Face gallery loaded: {len(gallery)} registered people.")
+    return gallery
 
-    if match[0]:
-        name = "Lost Person"
-        color = (0, 255, 0)
-    else:
-        name = "Unknown"
-        color = (0, 0, 255)
 
-    # Draw bounding box & label
+def draw_face(frame, box, name, color):
+    top, right, bottom, left = box
     cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
     cv2.putText(frame, name, (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 2)
 
+
 # ---------------------------
-# Step 4: Show Output
+# Step 2 + 3: Recognize faces in a still image
+# ---------------------------
+def recognize_image(gallery, image_path):
+    frame = cv2.imread(image_path)
+    if frame is None:
+        raise FileNotFoundError(f"Image not found: {image_path}")
+    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    # Detect faces in target image
+    face_locations = face_recognition.face_locations(rgb_frame)
+    face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
+
+    # One batched comparison of every face against the whole gallery
+    rows, distances = gallery.match(face_encodings, k=TOP_K, nprobe=MATCH_NPROBE)
+
+    for box, face_rows, face_distances in zip(face_locations, rows, distances):
+        if len(face_rows) and face_distances[0] <= MATCH_TOLERANCE:
+            person = gallery.person(face_rows[0])
+            draw_face(frame, box, f"Lost Person: {person['person_id']}", (0, 255, 0))
+            candidates = ", ".join(f"{gallery.person(r)['person_id']} ({d:.2f})"
+                                   for r, d in zip(face_rows, face_distances) if r >= 0)
+            print(f"Match at {box} -> {candidates}")
+        else:
+            draw_face(frame, box, "Unknown", (0, 0, 255))
+    return frame
+
+
 # ---------------------------
-cv2.imshow("Face Recognition", frame)
-cv2.waitKey(0)
-cv2.destroyAllWindows()
+# Streaming mode: detect every N frames on a downscaled frame, track in between
+# ---------------------------
+def recognize_stream(gallery, source, detect_every=5, scale=0.5, display=True,
+                     archive=None, camera_id="cam0"):
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise Exception(f"Error: Cannot open video source {source}")
+
+    tracker = FaceTracker()
+    frame_index = 0
+    encodings_done = 0
+    start = time.perf_counter()
+    print("Streaming Lost and Found... Press ESC to exit.")
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            print("End of video or error.")
+            break
+
+        small = cv2.resize(frame, None, fx=scale, fy=scale)
+        small_gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        if frame_index % detect_every == 0:
+            # Pick up registrations and "found" updates from the help desk
+            gallery.refresh()
+            boxes = face_recognition.face_locations(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+            pending = tracker.update(boxes, small_gray)
+            if pending:
+                # Encode only new/improved tracks, at full resolution
+                full_boxes = [tuple(int(v / scale) for v in t.box) for t in pending]
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                encodings = face_recognition.face_encodings(rgb_frame, full_boxes)
+                rows, distances = gallery.match(encodings, k=1, nprobe=MATCH_NPROBE)
+                if archive is not None:
+                    # Keep every encoding for retroactive searches
+                    now = time.time()
+                    for box, encoding in zip(full_boxes, encodings):
+                        archive.append(camera_id, now, frame_index, box, encoding)
+                for track, encoding, face_rows, face_distances in zip(pending, encodings, rows, distances):
+                    matched = len(face_rows) and face_rows[0] >= 0 and face_distances[0] <= MATCH_TOLERANCE
+                    was_known = track.label is not None
+                    tracker.set_encoding(track, encoding,
+                                         gallery.person(face_rows[0]) if matched else None,
+                                         float(face_distances[0]) if matched else float("inf"))
+                    if matched and not was_known:
+                        print(f"[frame {frame_index}] Lost Person {track.label['person_id']} "
+                              f"(distance {track.distance:.2f}, track {track.track_id})")
+                encodings_done += len(encodings)
+            if archive is not None:
+                # Write out what a camera buffered before it went quiet
+                archive.flush_stale()
+        else:
+            tracker.propagate(small_gray)
+
+        if display:
+            for track in tracker.tracks:
+                box = tuple(int(v / scale) for v in track.box)
+                if track.label is not None:
+                    draw_face(frame, box, f"Lost Person: {track.label['person_id']}", (0, 255, 0))
+                else:
+                    draw_face(frame, box, "Unknown", (0, 0, 255))
+            cv2.imshow("Face Recognition", frame)
+            if cv2.waitKey(1) & 0xFF == 27:
+                break
+        frame_index += 1
+
+    elapsed = time.perf_counter() - start
+    print(f"Processed {frame_index} frames at {frame_index / max(elapsed, 1e-9):.1f} FPS "
+          f"({encodings_done} face encodings).")
+    if archive is not None:
+        archive.close()
+    cap.release()
+    cv2.destroyAllWindows()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Lost and Found face recognition")
+    parser.add_argument("--image", type=str, default="image.jpeg", help="Still image to check")
+    parser.add_argument("--source", type=str, default=None,
+                        help="Video source for streaming mode (camera index, file path or RTSP URL)")
+    parser.add_argument("--detect-every", type=int, default=5, help="Run face detection every N frames")
+    parser.add_argument("--scale", type=float, default=0.5, help="Downscale factor for face detection")
+    parser.add_argument("--no-display", action="store_true", help="Do not open a window (streaming mode)")
+    parser.add_argument("--archive", type=str, default=None,
+                        help="Archive every face encoding to this directory (streaming mode)")
+    parser.add_argument("--camera-id", type=str, default="cam0", help="Camera ID stored in the archive")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    gallery = load_gallery()
+    if args.source is None:
+        frame = recognize_image(gallery, args.image)
+
+        # ---------------------------
+        # Step 4: Show Output
+        # ---------------------------
+        cv2.imshow("Face Recognition", frame)
+        cv2.waitKey(0)
+        cv2.destroyAllWindows()
+    else:
+        source = int(args.source) if args.source.isdigit() else args.source
+        archive = FaceArchive(args.archive) if args.archive else None
+        recognize_stream(gallery, source, args.detect_every, args.scale, display=not args.no_display,
+                         archive=archive, camera_id=args.camera_id)
@@ -1,49 +1,22 @@
 import cv2
 import numpy as np
-from collections import deque
 
-# --- Load maze ---
-maze_img = cv2.imread("temple.jpg", cv2.IMREAD_GRAYSCALE)
-if maze_img is None:
-    raise FileNotFoundError("Maze image not found!")
-
-# Convert to binary: 0 = path, 1 = wall
-_, maze = cv2.threshold(maze_img, 127, 1, cv2.THRESH_BINARY_INV)
+from distance_field import DistanceField
+from floor_plan import blend_icon
+from map_cache import compile_map
 
-# Optional: Dilate walls to make path more centered
-kernel = np.ones((3,3), np.uint8)
-maze_dilated = cv2.dilate(maze, kernel, iterations=1)
+# --- Load maze ---
+# Binary maze: 0 = path, 1 = wall, with walls dilated to make path more centered.
+# Compiled once per image and settings; later runs memory-map the cached arrays.
+compiled = compile_map("temple.jpg", dilate_kernel=3, dilate_iterations=1,
+                       icons={"fire": ("fire.jpg", (60, 60))})
+maze_img, maze_dilated = compiled.gray, compiled.maze
 
 start_point = None
 end_point = None
 
-# --- Function to load fire icon safely ---
-def load_fire_icon(path):
-    fire = cv2.imread(path, cv2.IMREAD_UNCHANGED)
-    if fire is None:
-        raise FileNotFoundError("Fire icon not found!")
-
-    # If no alpha channel, create one (make black background transparent)
-    if fire.shape[2] == 3:
-        gray = cv2.cvtColor(fire, cv2.COLOR_BGR2GRAY)
-        _, alpha = cv2.threshold(gray, 10, 255, cv2.THRESH_BINARY)
-        fire = np.dstack([fire, alpha])
-    return fire
-
-# Load fire icon
-fire_icon = load_fire_icon("fire.jpg")
-
-# --- Overlay function ---
-def overlay_image(bg, overlay, x, y):
-    """ Overlay RGBA image onto BGR background at (x,y). """
-    h, w = overlay.shape[:2]
-    if y+h > bg.shape[0] or x+w > bg.shape[1]:
-        return bg  # Skip if out of bounds
-
-    alpha = overlay[:,:,3] / 255.0
-    for c in range(3):
-        bg[y:y+h, x:x+w, c] = (1 - alpha) * bg[y:y+h, x:x+w, c] + alpha * overlay[:,:,c]
-    return bg
+# Fire icon, alpha-masked and resized to 60x60 at compile time
+fire_icon = compiled.icon("fire")
 
 # --- Mouse callback ---
 def select_points(event, x, y, flags, param):
@@ -64,8 +37,7 @@ print("Click start (fire) and end points on the maze.")
 while True:
     display_img = cv2.cvtColor(maze_img.copy(), cv2.COLOR_GRAY2BGR)
     if start_point:
-        fire_resized = cv2.resize(fire_icon, (60,60))
-        display_img = overlay_image(display_img, fire_resized, start_point[1]-15, start_point[0]-15)
+        display_img = blend_icon(display_img, fire_icon, start_point[1]-15, start_point[0]-15)
     if end_point:
         cv2.circle(display_img, (end_point[1], end_point[0]), 5, (0,0,255), -1)
     cv2.imshow("Maze", display_img)
@@ -77,48 +49,16 @@ while True:
 
 cv2.destroyAllWindows()
 
-# --- BFS for shortest path ---
-def bfs(maze, start, end):
-    rows, cols = maze.shape
-    visited = np.zeros_like(maze)
-    prev = np.full((rows, cols, 2), -1, dtype=int)
-    queue = deque([start])
-    visited[start] = 1
-    directions = [(-1,0),(1,0),(0,-1),(0,1)]  # up, down, left, right
-
-    while queue:
-        current = queue.popleft()
-        if current == end:
-            break
-        for dr, dc in directions:
-            nr, nc = current[0]+dr, current[1]+dc
-            if 0 <= nr < rows and 0 <= nc < cols and maze[nr, nc] == 0 and not visited[nr, nc]:
-                queue.append((nr, nc))
-                visited[nr, nc] = 1
-                prev[nr, nc] = current
-
-    # Reconstruct path
-    path = []
-    at = end
-    while at != (-1,-1):
-        path.append(at)
-        at = tuple(prev[at])
-    path.reverse()
-
-    if path[0] == start:
-        return path
-    else:
-        return None
-
 # --- Find and draw path ---
-path = bfs(maze_dilated, start_point, end_point)
+# Distance field from the exit, then walk downhill from the fire
+field = DistanceField(maze_dilated, [end_point])
+path = field.route(start_point)
 if path:
     print(f"Path found! Length: {len(path)}")
     maze_display = cv2.cvtColor(maze_img.copy(), cv2.COLOR_GRAY2BGR)
 
     # Draw fire at start point
-    fire_resized = cv2.resize(fire_icon, (60,60))
-    maze_display = overlay_image(maze_display, fire_resized, start_point[1]-15, start_point[0]-15)
+    maze_display = blend_icon(maze_display, fire_icon, start_point[1]-15, start_point[0]-15)
 
     # Draw smooth path
     path_points = np.array([(c,r) for r,c in path], np.int32)
@@ -2,12 +2,20 @@
 Predictive Crowd Flow Analysis
 ==============================
 This program:
-- Captures live video (camera/RTSP/file).
-- Detects people using YOLOv8 (Ultralytics).
+- Captures live video (camera/RTSP/file), from one or several sources.
+- Detects people using YOLOv8 (Ultralytics), one batched model call for
+  the frames of all cameras; each camera keeps its own heatmap, flow and
+  forecast.
 - Computes crowd flow using Optical Flow (Farneback).
-- Predicts next movement by extrapolating vectors.
+- Predicts next movement by extrapolating vectors: the density is advected
+  along the flow to forecast it 5, 15 and 30 s ahead, and cells forecast
+  over capacity are outlined.
 - Generates both Heatmap (density) + Flow Arrows.
 - Adaptive: uses arrows for small crowds, heatmap for large.
+- Optionally detects only every K frames (K adapting to a target FPS) and
+  moves the people along the optical flow in between.
+- Runs capture, inference, analytics and rendering as pipelined stages
+  (see frame_pipeline), by default always on the newest frame.
 """
 
 import cv2
@@ -16,120 +24,267 @@ from ultralytics import YOLO
 import time
 import argparse
 
+from density_accumulator import DensityAccumulator
+from density_forecast import DensityForecaster
+from detection_scheduler import DetectionScheduler, propagate_boxes
+from flow_arrows import draw_flow_arrows
+from frame_pipeline import FramePipeline
+from optical_flow import FlowEstimator
 
-class CrowdFlowPredictor:
-    def __init__(self, source=0, model_path="yolov8n.pt", heatmap_size=(720, 1280)):
+
+class CameraState:
+    def __init__(self, source, heatmap_size, density_half_life, flow_mode, flow_levels, flow_skip,
+                 capacity, forecast_horizons, scheduler=None, flow_interpolate=True):
         """
-        Initialize the Crowd Flow Predictor.
+        Per-camera capture, heatmap, optical flow, forecast and detection
+        schedule (None = detect every frame) state.
         """
         self.source = source
-        self.model = YOLO(model_path)  # YOLOv8 model
-        self.heatmap_size = heatmap_size
-        self.cap = cv2.VideoCapture(self.source)
+        self.cap = cv2.VideoCapture(source)
         if not self.cap.isOpened():
-            raise Exception("Error: Cannot open video source")
+            raise Exception(f"Error: Cannot open video source {source}")
+        self.density = DensityAccumulator(heatmap_size, half_life=density_half_life)
+        self.flow = FlowEstimator(flow_mode, levels=flow_levels, skip=flow_skip, interpolate=flow_interpolate)
+        self.forecaster = DensityForecaster(heatmap_size, horizons=forecast_horizons, capacity=capacity)
+        self.people_boxes = []
+        self.last_flow = None
+        self.scheduler = scheduler
+        self.live = True
 
-        # Heatmap storage
-        self.heatmap = np.zeros(self.heatmap_size, dtype=np.float32)
 
-        # Previous gray frame for optical flow
-        self.prev_gray = None
+class CrowdFlowPredictor:
+    def __init__(self, source=0, model_path="yolov8n.pt", heatmap_size=(720, 1280), density_half_life=2.0,
+                 flow_mode="dense", flow_levels=1, flow_skip=1, flow_interpolate=True, capacity=None,
+                 forecast_horizons=(5, 15, 30),
+                 detect_every=1, target_fps=None, scene_change=12.0, flow_threshold=None,
+                 render_scale=1.0, arrow_min_magnitude=0.5):
+        """
+        Initialize the Crowd Flow Predictor.
+        source:            video source, or a list of sources sharing one model.
+        density_half_life: seconds after which a detection counts half in the heatmap.
+        flow_mode:         "dense", "pyramid" or "sparse" optical flow (see optical_flow).
+        flow_levels:       pyrDown steps for the "pyramid" mode.
+        flow_skip:         measure flow every N frames and interpolate in between.
+        flow_interpolate:  False holds the last measurement instead (no lag, less smooth).
+        capacity:          people per forecast cell flagged as over capacity (None = no alerts).
+        forecast_horizons: seconds ahead to forecast the density.
+        detect_every:      run the detector every K frames, propagating people by flow in between.
+        target_fps:        adapt K so the detector keeps up with this frame rate.
+        scene_change:      gray-level change that forces a detection between K frames.
+        flow_threshold:    flow (px/frame) that forces a detection between K frames.
+        render_scale:      draw the display frame at this fraction of the analysis size.
+        arrow_min_magnitude: flow (px/frame) below which no arrow is drawn.
+        """
+        self.sources = list(source) if isinstance(source, (list, tuple)) else [source]
+        self.source = self.sources[0]
+        self.model = YOLO(model_path)  # YOLOv8 model, shared by all cameras
+        self.heatmap_size = heatmap_size
+        scheduled = detect_every > 1 or target_fps is not None
+        self.cameras = [CameraState(src, heatmap_size, density_half_life, flow_mode, flow_levels, flow_skip,
+                                    capacity, forecast_horizons,
+                                    DetectionScheduler(detect_every, target_fps, scene_change=scene_change,
+                                                       flow_threshold=flow_threshold) if scheduled else None,
+                                    flow_interpolate)
+                        for src in self.sources]
 
-        # Colors for visualization
+        # Visualization
+        self.render_scale = render_scale
+        self.arrow_min_magnitude = arrow_min_magnitude
         self.arrow_color = (0, 0, 255)  # Red arrows
         self.person_color = (0, 255, 0)  # Green dots
         self.font = cv2.FONT_HERSHEY_SIMPLEX
 
+    # The first camera's state, as for a single-source predictor
+    @property
+    def cap(self):
+        return self.cameras[0].cap
+
+    @property
+    def density(self):
+        return self.cameras[0].density
+
+    @property
+    def flow(self):
+        return self.cameras[0].flow
+
+    @property
+    def forecaster(self):
+        return self.cameras[0].forecaster
+
+    @property
+    def people_boxes(self):
+        return self.cameras[0].people_boxes
+
     def detect_people(self, frame):
         """
         Detect people using YOLO.
-        Returns list of bounding boxes and centers.
+        Returns list of centers; the boxes are kept in self.people_boxes.
+        """
+        people_centers, self.cameras[0].people_boxes = self.detect_batch([frame])[0]
+        return people_centers
+
+    def detect_batch(self, frames):
         """
-        results = self.model(frame, classes=[0], verbose=False)  # Class 0 = person
-        people_centers = []
+        Detect people in several frames with one model call.
+        Returns (centers, boxes) per frame.
+        """
+        results = self.model(frames, classes=[0], verbose=False)  # Class 0 = person
+        detections = []
         for result in results:
+            people_centers, people_boxes = [], []
             boxes = result.boxes.xyxy.cpu().numpy()
             for box in boxes:
                 x1, y1, x2, y2 = box[:4]
                 cx, cy = int((x1 + x2) / 2), int((y1 + y2) / 2)
                 people_centers.append((cx, cy))
-        return people_centers
+                people_boxes.append((x1, y1, x2, y2))
+            detections.append((people_centers, people_boxes))
+        return detections
+
+    @property
+    def heatmap(self):
+        """
+        Crowd density (people per pixel), spread only when read.
+        """
+        return self.density.density()
 
-    def update_heatmap(self, people_centers):
+    def update_heatmap(self, people_centers, timestamp=None, camera=0):
         """
         Update heatmap with new people positions.
         """
-        for (x, y) in people_centers:
-            if 0 <= y < self.heatmap_size[0] and 0 <= x < self.heatmap_size[1]:
-                self.heatmap[y, x] += 1
-        # Smooth heatmap
-        self.heatmap = cv2.GaussianBlur(self.heatmap, (35, 35), 0)
+        self.cameras[camera].density.add(people_centers, timestamp)
 
-    def compute_optical_flow(self, frame_gray):
+    def compute_optical_flow(self, frame_gray, boxes=None, camera=0):
         """
         Compute optical flow between previous and current frames.
         Returns flow vector field.
         """
-        if self.prev_gray is None:
-            self.prev_gray = frame_gray
-            return None
-
-        flow = cv2.calcOpticalFlowFarneback(
-            self.prev_gray, frame_gray, None,
-            0.5, 3, 15, 3, 5, 1.2, 0
-        )
-        self.prev_gray = frame_gray
-        return flow
+        state = self.cameras[camera]
+        return state.flow.update(frame_gray, state.people_boxes if boxes is None else boxes)
 
     def visualize_flow(self, frame, flow, step=20, scale=2.0):
         """
-        Draw flow vectors (arrows) on frame.
+        Draw flow vectors (arrows) on frame: one per cell, static cells skipped.
         """
-        h, w = frame.shape[:2]
-        for y in range(0, h, step):
-            for x in range(0, w, step):
-                fx, fy = flow[y, x] * scale
-                end_point = (int(x + fx), int(y + fy))
-                cv2.arrowedLine(frame, (x, y), end_point,
-                                self.arrow_color, 1, tipLength=0.3)
+        frame, _ = draw_flow_arrows(frame, flow, step, scale, self.arrow_color, self.arrow_min_magnitude)
         return frame
 
-    def visualize_heatmap(self, frame):
+    def update_forecast(self, flow, camera=0):
+        """
+        Feed the current density and flow to the forecaster.
+        """
+        state = self.cameras[camera]
+        state.forecaster.update(state.density.density(full_size=False), flow, state.density.time)
+
+    def visualize_forecast(self, frame, alerts=None):
+        """
+        Outline cells forecast over capacity, labelled with the soonest horizon.
+        """
+        soonest = {}
+        for horizon, row, col, _ in self.forecaster.alerts() if alerts is None else alerts:
+            soonest.setdefault((row, col), horizon)
+        zoom = frame.shape[0] / self.heatmap_size[0]
+        for (row, col), horizon in soonest.items():
+            x1, y1, x2, y2 = (int(v * zoom) for v in self.forecaster.cell_rect(row, col))
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
+            cv2.putText(frame, f"{horizon}s", (x1 + 2, y2 - 4), self.font, 0.4, (0, 0, 255), 1)
+        return frame, len(soonest)
+
+    def visualize_heatmap(self, frame, heatmap=None):
         """
         Overlay heatmap on the frame.
         """
-        norm = cv2.normalize(self.heatmap, None, 0, 255, cv2.NORM_MINMAX)
+        heatmap = self.heatmap if heatmap is None else heatmap
+        if heatmap.shape[:2] != frame.shape[:2]:
+            heatmap = cv2.resize(heatmap, (frame.shape[1], frame.shape[0]), interpolation=cv2.INTER_LINEAR)
+        norm = cv2.normalize(heatmap, None, 0, 255, cv2.NORM_MINMAX)
         heatmap_colored = cv2.applyColorMap(norm.astype(np.uint8), cv2.COLORMAP_JET)
         overlay = cv2.addWeighted(frame, 0.6, heatmap_colored, 0.4, 0)
         return overlay
 
-    def run(self):
+    # --- Pipeline stages ---
+    def capture_frame(self):
         """
-        Main loop for processing video stream.
+        Capture stage: read and resize the next frame of every live camera.
         """
-        print("Starting Crowd Flow Prediction... Press ESC to exit.")
-        while True:
-            ret, frame = self.cap.read()
+        views = []
+        for i, state in enumerate(self.cameras):
+            if not state.live:
+                continue
+            ret, frame = state.cap.read()
             if not ret:
-                print("End of video or error.")
-                break
-
+                print(f"End of video or error ({state.source}).")
+                state.live = False
+                continue
             # Resize frame for consistency
             frame = cv2.resize(frame, (self.heatmap_size[1], self.heatmap_size[0]))
+            views.append({"camera": i, "frame": frame})
+        if not views:
+            return False, None
+        return True, {"views": views, "time": time.monotonic()}
 
-            # Detect people
-            people = self.detect_people(frame)
+    def infer(self, packet):
+        """
+        Inference stage: detect people in all due cameras' frames at once.
+        Cameras not due are left for analytics to propagate (people = None).
+        """
+        due = []
+        for view in packet["views"]:
+            state = self.cameras[view["camera"]]
+            view["gray"] = cv2.cvtColor(view["frame"], cv2.COLOR_BGR2GRAY)
+            view["people"] = view["boxes"] = None
+            if state.scheduler is None or state.scheduler.should_detect(view["gray"], state.last_flow):
+                due.append(view)
+        if due:
+            start = time.perf_counter()
+            detections = self.detect_batch([view["frame"] for view in due])
+            elapsed = time.perf_counter() - start
+            for view, (people, boxes) in zip(due, detections):
+                view["people"], view["boxes"] = people, boxes
+                scheduler = self.cameras[view["camera"]].scheduler
+                if scheduler is not None:
+                    scheduler.detected(view["gray"], elapsed)
+        return packet
 
-            # Update heatmap
-            self.update_heatmap(people)
+    def analyze(self, packet):
+        """
+        Analytics stage: heatmap, optical flow and forecast per camera.
+        Everything the renderer needs from shared state is copied into the
+        packet here.
+        """
+        for view in packet["views"]:
+            camera = view["camera"]
+            state = self.cameras[camera]
+            if view["people"] is None:
+                # Not detected: move the previous people along the flow
+                view["flow"] = state.last_flow = self.compute_optical_flow(view["gray"], None, camera)
+                view["people"], view["boxes"] = propagate_boxes(state.people_boxes, view["flow"])
+            else:
+                view["flow"] = state.last_flow = self.compute_optical_flow(view["gray"], view["boxes"], camera)
+            people = view["people"]
+            state.people_boxes = view["boxes"]
+            self.update_heatmap(people, packet["time"], camera)
+            self.update_forecast(view["flow"], camera)
+            if len(people) >= 30:
+                view["heatmap"] = state.density.density(full_size=self.render_scale >= 1.0)
+            if state.forecaster.capacity is not None:
+                view["alerts"] = state.forecaster.alerts()
+        return packet
 
-            # Optical flow prediction
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            flow = self.compute_optical_flow(gray)
+    def render(self, packet):
+        """
+        Render stage: draw and show each camera's frame. Returns False to stop.
+        """
+        for view in packet["views"]:
+            frame, people, flow = view["frame"], view["people"], view["flow"]
+            if self.render_scale < 1.0:
+                frame = cv2.resize(frame, None, fx=self.render_scale, fy=self.render_scale,
+                                   interpolation=cv2.INTER_AREA)
 
             # Draw detected people
             for (cx, cy) in people:
-                cv2.circle(frame, (cx, cy), 5, self.person_color, -1)
+                cv2.circle(frame, (int(cx * self.render_scale), int(cy * self.render_scale)), 5,
+                           self.person_color, -1)
 
             # Adaptive visualization
             if len(people) < 30:
@@ -137,32 +292,83 @@ class CrowdFlowPredictor:
                     frame = self.visualize_flow(frame, flow)
                 label = f"Mode: Arrows (small crowd: {len(people)})"
             else:
-                frame = self.visualize_heatmap(frame)
+                frame = self.visualize_heatmap(frame, view["heatmap"])
                 label = f"Mode: Heatmap (large crowd: {len(people)})"
 
+            # Forecast alerts
+            if "alerts" in view:
+                frame, flagged = self.visualize_forecast(frame, view["alerts"])
+                if flagged:
+                    cv2.putText(frame, f"Forecast: {flagged} cells over capacity", (20, 60),
+                                self.font, 0.8, (0, 0, 255), 2)
+
             # Add status text
             cv2.putText(frame, label, (20, 30), self.font, 0.8, (255, 255, 255), 2)
 
             # Show result
-            cv2.imshow("Predictive Crowd Flow", frame)
+            title = "Predictive Crowd Flow"
+            if len(self.cameras) > 1:
+                title += f" [{self.cameras[view['camera']].source}]"
+            cv2.imshow(title, frame)
 
-            # Exit on ESC
-            if cv2.waitKey(1) & 0xFF == 27:
-                break
+        # Exit on ESC
+        return cv2.waitKey(1) & 0xFF != 27
 
-        self.cap.release()
-        cv2.destroyAllWindows()
+    def run(self, policy="newest", queue_size=2):
+        """
+        Main loop for processing video stream.
+        policy: "newest" skips stale frames (live cameras), "every" processes
+                every frame (recorded video).
+        """
+        print("Starting Crowd Flow Prediction... Press ESC to exit.")
+        pipeline = FramePipeline(self.capture_frame, [("inference", self.infer), ("analytics", self.analyze)],
+                                 self.render, policy=policy, queue_size=queue_size)
+        try:
+            pipeline.run()
+        finally:
+            for state in self.cameras:
+                state.cap.release()
+            cv2.destroyAllWindows()
+            print(pipeline.report())
+            for state in self.cameras:
+                if state.scheduler is not None:
+                    print(f"Detector ran on {state.scheduler.detect_fraction:.0%} of frames from {state.source} "
+                          f"(K = {state.scheduler.every})")
 
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Predictive Crowd Flow Analysis")
-    parser.add_argument("--source", type=str, default="0", help="Video source (0 for webcam, path or RTSP URL)")
+    parser.add_argument("--source", type=str, nargs="+", default=["0"],
+                        help="Video source(s) (0 for webcam, path or RTSP URL); several share one model")
     parser.add_argument("--model", type=str, default="yolov8n.pt", help="YOLOv8 model path")
+    parser.add_argument("--half-life", type=float, default=2.0, help="Heatmap half-life in seconds")
+    parser.add_argument("--flow-mode", choices=["dense", "pyramid", "sparse"], default="dense",
+                        help="Optical flow mode (pyramid/sparse are cheaper on CPU)")
+    parser.add_argument("--flow-levels", type=int, default=1, help="pyrDown steps for the pyramid mode")
+    parser.add_argument("--flow-skip", type=int, default=1, help="Measure flow every N frames, interpolating in between")
+    parser.add_argument("--flow-hold", action="store_true",
+                        help="With --flow-skip, hold the last measured flow instead of interpolating")
+    parser.add_argument("--capacity", type=float, default=None,
+                        help="People per 32px cell flagged when forecast to exceed it")
+    parser.add_argument("--policy", choices=["newest", "every"], default="newest",
+                        help="Process the newest frame (live) or every frame (recorded video)")
+    parser.add_argument("--detect-every", type=int, default=1,
+                        help="Run the detector every K frames, propagating people by optical flow in between")
+    parser.add_argument("--target-fps", type=float, default=None, help="Adapt K to keep this frame rate")
+    parser.add_argument("--flow-threshold", type=float, default=None,
+                        help="Mean flow (px/frame) that forces a detection")
+    parser.add_argument("--render-scale", type=float, default=1.0,
+                        help="Display at this fraction of the 1280x720 analysis resolution")
     return parser.parse_args()
 
 
 if __name__ == "__main__":
     args = parse_args()
-    source = int(args.source) if args.source.isdigit() else args.source
-    predictor = CrowdFlowPredictor(source=source, model_path=args.model)
-    predictor.run()
+    sources = [int(s) if s.isdigit() else s for s in args.source]
+    predictor = CrowdFlowPredictor(source=sources if len(sources) > 1 else sources[0], model_path=args.model, density_half_life=args.half_life,
+                                   flow_mode=args.flow_mode, flow_levels=args.flow_levels, flow_skip=args.flow_skip,
+                                   flow_interpolate=not args.flow_hold,
+                                   capacity=args.capacity, detect_every=args.detect_every,
+                                   target_fps=args.target_fps, flow_threshold=args.flow_threshold,
+                                   render_scale=args.render_scale)
+    predictor.run(policy=args.policy)
@@ -1,13 +1,14 @@
+import argparse
 import cv2
 import numpy as np
-from ultralytics import YOLO
 import os
-import datetime
-import csv
 import time
 
-# --- Video and Display Configuration ---
-VIDEO_FILE_PATH = r"C:\Users\Administrator\Downloads\DJI_0887.MP4"
+from event_sink import CsvBackend, EventSink, HourlyColumnarBackend, SqliteBackend
+from snapshot_writer import SnapshotWriter
+from traffic_counter import DEFAULTS, count_video, load_config, recording_start, save_config
+
+# --- Display Configuration ---
 DISPLAY_WIDTH = 1280
 DISPLAY_HEIGHT = 720
 
@@ -16,45 +17,31 @@ SNAPSHOT_IN_DIR = "snapshots_in2"
 SNAPSHOT_OUT_DIR = "snapshots_out2"
 CSV_IN_FILE = "vehicle_log_in2.csv"
 CSV_OUT_FILE = "vehicle_log_out2.csv"
+LOG_BACKEND = "csv"  # "csv", "sqlite" or "hourly"
+SQLITE_FILE = "vehicle_log2.db"
+HOURLY_LOG_DIR = "vehicle_log2"
+SNAPSHOT_FORMAT = "jpg"  # "jpg", "png" or "webp"
+SNAPSHOT_QUALITY = 90  # JPEG/WebP quality, or PNG compression level (0-9)
+SNAPSHOT_WORKERS = 2
 
 # Create snapshot directories if they don't exist
 os.makedirs(SNAPSHOT_IN_DIR, exist_ok=True)
 os.makedirs(SNAPSHOT_OUT_DIR, exist_ok=True)
 
-# COCO class names for vehicles
-# Class IDs: 2: car, 3: motorcycle, 5: bus, 7: truck
-CLASS_NAMES = {
-    2: 'car',
-    3: 'motorcycle',
-    5: 'bus',
-    7: 'truck'
-}
-
 # --- Helper Functions ---
 
-# Line intersection function
-def intersect(A, B, C, D):
-    """Check if line segments AB and CD intersect."""
-    def ccw(A, B, C):
-        return (C[1] - A[1]) * (B[0] - A[0]) > (B[1] - A[1]) * (C[0] - A[0])
-    return ccw(A, C, D) != ccw(B, C, D) and ccw(A, B, C) != ccw(A, B, D)
-
-# Function to initialize CSV files with headers
-def initialize_csv():
-    """Creates the CSV files and writes the headers if the files don't exist."""
-    for csv_file in [CSV_IN_FILE, CSV_OUT_FILE]:
-        if not os.path.exists(csv_file):
-            with open(csv_file, mode='w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['timestamp', 'vehicle_id', 'vehicle_type', 'image_path', 'direction'])
-
-# Function to log data to CSV
-def log_to_csv(timestamp, vehicle_id, vehicle_type, image_path, direction):
-    """Appends a new row of data to the appropriate CSV file."""
-    csv_file = CSV_IN_FILE if direction == "in" else CSV_OUT_FILE
-    with open(csv_file, mode='a', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([timestamp, vehicle_id, vehicle_type, image_path, direction])
+# Function to create the crossing log
+def make_event_sink():
+    """Starts the background writer for the configured log backend."""
+    if LOG_BACKEND == "sqlite":
+        backend = SqliteBackend(SQLITE_FILE)
+    elif LOG_BACKEND == "hourly":
+        backend = HourlyColumnarBackend(HOURLY_LOG_DIR)
+    elif LOG_BACKEND == "csv":
+        backend = CsvBackend(CSV_IN_FILE, CSV_OUT_FILE)
+    else:
+        raise ValueError(f"Unknown LOG_BACKEND: {LOG_BACKEND}")
+    return EventSink(backend)
 
 # ▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼
 # NEW FUNCTION: To draw a prominent, large display for vehicle counts
@@ -129,16 +116,15 @@ def draw_dashboard(frame, in_counts, out_counts):
 # END OF NEW FUNCTION
 # ▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲
 
-# --- Main Application ---
-def main():
-    # Initialize YOLO model
-    model = YOLO("yolo11m-seg.pt")
-
+# --- ROI and Line Setup ---
+def draw_setup(video):
+    """Lets the user click the ROI and counting lines on the first frame.
+    Returns (roi_points, in_line, out_line), or None if they are incomplete."""
     # Open the video file
-    cap = cv2.VideoCapture(VIDEO_FILE_PATH)
+    cap = cv2.VideoCapture(video)
     if not cap.isOpened():
-        print(f"Error: Could not open video file at {VIDEO_FILE_PATH}")
-        return
+        print(f"Error: Could not open video file at {video}")
+        return None
 
     # Get video properties
     W = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
@@ -149,7 +135,7 @@ def main():
     if not ret:
         print("Error: Could not read the first frame of the video.")
         cap.release()
-        return
+        return None
 
     # Calculate resize ratio for display
     resize_ratio = min(DISPLAY_WIDTH / W, DISPLAY_HEIGHT / H)
@@ -213,92 +199,42 @@ def main():
         elif key == ord('c'): roi_points, in_line, out_line = [], [], []
 
     cv2.destroyAllWindows()
+    cap.release()
 
     if len(roi_points) < 3 or len(in_line) != 2 or len(out_line) != 2:
         print("Error: Please define a valid ROI (3+ points), IN line (2 points), and OUT line (2 points).")
-        cap.release()
-        return
-
-    roi_polygon = np.array(roi_points, np.int32)
-    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        return None
+    return roi_points, in_line, out_line
 
-    # --- Tracking and Counting ---
-    initialize_csv()
-    track_history = {}
-    in_counts = {name: 0 for name in CLASS_NAMES.values()}
-    out_counts = {name: 0 for name in CLASS_NAMES.values()}
-    
-    crossed_ids = set()
-
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            print("End of video file.")
-            break
-            
-        original_frame = frame.copy()
-
-        results = model.track(
-            frame, persist=True, tracker="custom_tracker.yaml", device="cuda",
-            classes=list(CLASS_NAMES.keys()), verbose=False, conf = 0.5
-        )
-        
-        if results[0].boxes is not None and results[0].boxes.id is not None:
-            boxes = results[0].boxes.xywh.cpu()
-            track_ids = results[0].boxes.id.int().cpu().tolist()
-            clss = results[0].boxes.cls.int().cpu().tolist()
-            
-            for box, track_id, cls in zip(boxes, track_ids, clss):
-                x, y, w, h = box
-                center = (int(x), int(y))
-                
-                if cv2.pointPolygonTest(roi_polygon, center, False) >= 0:
-                    track_history.setdefault(track_id, []).append(center)
-                    if len(track_history[track_id]) > 30:
-                        track_history[track_id].pop(0)
-                    
-                    if len(track_history[track_id]) > 1:
-                        points = np.array(track_history[track_id], np.int32).reshape((-1, 1, 2))
-                        cv2.polylines(frame, [points], isClosed=False, color=(0, 255, 255), thickness=2)
-                    
-                    if track_id not in crossed_ids:
-                        if len(track_history[track_id]) < 2:
-                            continue
-
-                        prev_point = track_history[track_id][-2]
-                        current_point = track_history[track_id][-1]
-                        direction = None
-                        
-                        if intersect(in_line[0], in_line[1], prev_point, current_point):
-                            direction = "in"
-                        elif intersect(out_line[0], out_line[1], prev_point, current_point):
-                            direction = "out"
-                        
-                        if direction:
-                            crossed_ids.add(track_id)
-                            vehicle_type = CLASS_NAMES.get(cls, 'unknown')
-                            
-                            if direction == "in":
-                                in_counts[vehicle_type] += 1
-                            else:
-                                out_counts[vehicle_type] += 1
-                            
-                            timestamp = datetime.datetime.now()
-                            timestamp_str = timestamp.strftime("%Y%m%d_%H%M%S_%f")
-                            x1, y1 = max(0, int(x - w / 2)), max(0, int(y - h / 2))
-                            x2, y2 = min(W, int(x + w / 2)), min(H, int(y + h / 2))
-                            snapshot = original_frame[y1:y2, x1:x2]
-                            
-                            dir_path = SNAPSHOT_IN_DIR if direction == "in" else SNAPSHOT_OUT_DIR
-                            image_filename = f"{timestamp_str}{vehicle_type}{track_id}.jpg"
-                            image_path = os.path.join(dir_path, image_filename)
-                            
-                            if snapshot.size > 0:
-                                cv2.imwrite(image_path, snapshot)
-                            else:
-                                image_path = "N/A (empty crop)"
-                            
-                            log_to_csv(timestamp.strftime("%Y-%m-%d %H:%M:%S"), track_id, vehicle_type, image_path, direction)
+# --- Main Application ---
+def main(args):
+    if args.config:
+        config = load_config(args.config)
+    elif args.headless:
+        print("Error: --headless needs --config with the ROI and counting lines.")
+        return
+    else:
+        drawn = draw_setup(args.video)
+        if drawn is None:
+            return
+        config = {**DEFAULTS, "roi": drawn[0], "in_line": drawn[1], "out_line": drawn[2]}
+        if args.save_config:
+            save_config(args.save_config, *drawn)
+            print(f"Saved ROI and counting lines to {args.save_config}")
+    if args.device is not None:
+        config["device"] = args.device
+
+    event_sink = make_event_sink()
+    snapshot_writer = SnapshotWriter(SNAPSHOT_WORKERS, image_format=SNAPSHOT_FORMAT, quality=SNAPSHOT_QUALITY)
+    roi_polygon = np.array(config["roi"], np.int32)
+    in_line, out_line = config["in_line"], config["out_line"]
+
+    def show(frame, counter, trails):
+        """Draws the tracks, ROI, lines and dashboard; returns False on ESC."""
+        H, W = frame.shape[:2]
+        resize_ratio = min(DISPLAY_WIDTH / W, DISPLAY_HEIGHT / H)
+        display_dims = (int(W * resize_ratio), int(H * resize_ratio))
+        cv2.polylines(frame, trails, isClosed=False, color=(0, 255, 255), thickness=2)
 
         # ▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼
         # MODIFIED DRAWING SECTION
@@ -311,7 +247,12 @@ def main():
         cv2.line(frame, out_line[0], out_line[1], (0, 0, 255), 2) # OUT line (Red)
 
         # Draw the new, large dashboard for counts
-        draw_dashboard(frame, in_counts, out_counts)
+        draw_dashboard(frame, counter.in_counts, counter.out_counts)
+
+        # Log health: events waiting for the writer and events dropped
+        stats = event_sink.stats()
+        cv2.putText(frame, f"Log queue: {stats['queued']}  dropped: {stats['dropped']}", (20, H - 20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
 
         # --- Display the final frame ---
         display_frame = cv2.resize(frame, display_dims)
@@ -321,11 +262,33 @@ def main():
         # END OF MODIFIED DRAWING SECTION
         # ▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲
         
-        if cv2.waitKey(1) == 27:  # Press ESC to exit
-            break
-
-    cap.release()
-    cv2.destroyAllWindows()
+        return cv2.waitKey(1) != 27  # Press ESC to exit
+
+    start = time.time()
+    # Leaving the block drains the queued snapshots and events, also on an error or Ctrl-C
+    with event_sink, snapshot_writer:
+        try:
+            counter = count_video(args.video, config, recorded_at=recording_start(config),
+                                  on_frame=None if args.headless else show,
+                                  snapshot_writer=snapshot_writer, event_sink=event_sink,
+                                  snapshot_dirs=(SNAPSHOT_IN_DIR, SNAPSHOT_OUT_DIR))
+        finally:
+            if not args.headless:
+                cv2.destroyAllWindows()
+    print(f"Counted in {time.time() - start:.0f} s - IN: {counter.in_counts}  OUT: {counter.out_counts}")
+    stats = event_sink.stats()
+    print(f"Log: {stats['written']} events written, {stats['dropped']} dropped, {stats['failed']} failed")
+    stats = snapshot_writer.stats()
+    print(f"Snapshots: {stats['saved']} saved, {stats['dropped']} dropped, {stats['failed']} failed")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Vehicle IN/OUT counting on a video")
+    parser.add_argument("--video", type=str, required=True, help="Video file to count")
+    parser.add_argument("--config", type=str, help="JSON with the ROI and counting lines (skips the drawing step)")
+    parser.add_argument("--headless", action="store_true", help="No windows; needs --config")
+    parser.add_argument("--save-config", type=str, help="Save the drawn ROI and lines to this JSON file")
+    parser.add_argument("--device", type=str, default=None, help="Inference device, e.g. cuda:0 or cpu (default: auto)")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(parse_args())
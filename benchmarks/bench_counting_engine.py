@@ -0,0 +1,107 @@
+"""
+Counting Engine Benchmark
+=========================
+Per-frame cost of the ROI and line-crossing tests for 10, 100 and 1000
+tracks on a 1080x1920 frame: the original per-object loop
+(cv2.pointPolygonTest, then intersect() against each line until one
+hits) against CountingEngine's mask lookup and one vectorized pass over
+all gates, with the 2 IN/OUT lines and with 8 gates. The results of both
+are compared on every frame. Run from the repository root:
+
+    python -m benchmarks.bench_counting_engine --frames 200
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from counting_engine import CountingEngine
+
+FRAME = (1920, 1080)
+ROI = [(200, 150), (1700, 100), (1850, 950), (150, 1000)]
+
+
+def intersect(A, B, C, D):
+    """
+    The original line test of the counting scripts, kept as the baseline.
+    """
+    def ccw(A, B, C):
+        return (C[1] - A[1]) * (B[0] - A[0]) > (B[1] - A[1]) * (C[0] - A[0])
+    return ccw(A, C, D) != ccw(B, C, D) and ccw(A, B, C) != ccw(A, B, D)
+
+
+def legacy_frame(roi_polygon, lines, previous, current):
+    gates = []
+    for prev_point, current_point in zip(previous, current):
+        gate = -1
+        if cv2.pointPolygonTest(roi_polygon, current_point, False) >= 0:
+            for g, (a, b) in enumerate(lines):
+                if intersect(a, b, prev_point, current_point):
+                    gate = g
+                    break
+        gates.append(gate)
+    return gates
+
+
+def engine_frame(engine, previous, current):
+    inside = engine.in_roi(current)
+    gates = np.full(len(current), -1)
+    gates[inside], _ = engine.first_gate(previous[inside], current[inside])
+    return gates
+
+
+def gate_lines(count, rng):
+    """
+    IN and OUT lines across the middle, plus random extra gates.
+    """
+    lines = [((300, 520), (1600, 500)), ((300, 600), (1600, 590))]
+    while len(lines) < count:
+        a, b = rng.integers((200, 150), (1700, 950), (2, 2))
+        lines.append((tuple(a.tolist()), tuple(b.tolist())))
+    return lines
+
+
+def tracks(n, frames, rng):
+    """
+    (previous, current) integer centres per frame; some steps land exactly on the lines.
+    """
+    for _ in range(frames):
+        previous = rng.integers((0, 0), FRAME, (n, 2))
+        current = previous + rng.integers(-40, 41, (n, 2))
+        current[: n // 10, 1] = 520  # on the IN line's height
+        yield previous, current
+
+
+def run(frames):
+    rng = np.random.default_rng(0)
+    roi_polygon = np.array(ROI, np.int32)
+    print(f"{'tracks':>7} {'gates':>6} {'loop ms':>8} {'engine ms':>10} {'speed-up':>9} {'crossings':>10} {'match':>6}")
+    for gate_count in (2, 8):
+        lines = gate_lines(gate_count, rng)
+        engine = CountingEngine({str(g): line for g, line in enumerate(lines)}, roi=ROI, frame_size=FRAME)
+        for n in (10, 100, 1000):
+            clip = list(tracks(n, frames, rng))
+            as_tuples = [(list(map(tuple, p.tolist())), list(map(tuple, c.tolist()))) for p, c in clip]
+            start = time.perf_counter()
+            legacy = [legacy_frame(roi_polygon, lines, p, c) for p, c in as_tuples]
+            loop_ms = (time.perf_counter() - start) / frames * 1000
+            start = time.perf_counter()
+            ours = [engine_frame(engine, p, c) for p, c in clip]
+            engine_ms = (time.perf_counter() - start) / frames * 1000
+            match = all(np.array_equal(a, b) for a, b in zip(legacy, ours))
+            crossings = sum(int((g >= 0).sum()) for g in ours)
+            print(f"{n:>7} {gate_count:>6} {loop_ms:>8.3f} {engine_ms:>10.3f} {loop_ms / engine_ms:>8.1f}x "
+                  f"{crossings:>10} {str(match):>6}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Vectorized ROI and line-crossing benchmark")
+    parser.add_argument("--frames", type=int, default=200)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.frames)
@@ -0,0 +1,101 @@
+"""
+Crowd-Aware Routing Benchmark
+=============================
+Assigns 10k evacuees, packed into a few crowded areas of a synthetic floor
+plan, to four exits with limited capacity. The density grid is built the
+way `CrowdFlowPredictor.update_heatmap` builds it (people splatted onto a
+720x1280 grid, then blurred). Reports the cost of each stage and the exit
+loads with and without balancing. Run from the repository root:
+
+    python -m benchmarks.bench_crowd_router --megapixels 4 --evacuees 10000
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.bench_distance_field import synthetic_floor_plan
+from crowd_router import CrowdRouter
+from distance_field import UNREACHABLE, DistanceField
+
+
+def crowd(maze, n, hotspots, rng):
+    """
+    n free cells clustered around a few hotspots.
+    """
+    rows, cols = maze.shape
+    centres = rng.uniform(0.2, 0.8, (hotspots, 2)) * (rows, cols)
+    cells = []
+    while len(cells) < n:
+        pick = centres[rng.integers(0, hotspots, n)] + rng.normal(0, rows * 0.05, (n, 2))
+        pick = np.rint(pick).astype(np.int64)
+        inside = (pick[:, 0] >= 0) & (pick[:, 0] < rows) & (pick[:, 1] >= 0) & (pick[:, 1] < cols)
+        pick = pick[inside]
+        cells.extend(pick[maze[pick[:, 0], pick[:, 1]] == 0].tolist())
+    return np.array(cells[:n])
+
+
+def corner_exits(maze):
+    """
+    The free cell closest to each corner that is connected to the building.
+    """
+    reach = np.argwhere(DistanceField(maze, [(maze.shape[0] // 2, maze.shape[1] // 2)]).distances != UNREACHABLE)
+    corners = [(0, 0), (0, maze.shape[1]), (maze.shape[0], 0), maze.shape]
+    return [tuple(int(v) for v in reach[np.abs(reach - c).sum(axis=1).argmin()]) for c in corners]
+
+
+def heatmap(starts, maze_shape, size=(720, 1280)):
+    """
+    Density grid as update_heatmap accumulates it, in camera resolution.
+    """
+    grid = np.zeros(size, dtype=np.float32)
+    ys = starts[:, 0] * size[0] // maze_shape[0]
+    xs = starts[:, 1] * size[1] // maze_shape[1]
+    np.add.at(grid, (ys, xs), 1)
+    return cv2.GaussianBlur(grid, (35, 35), 0)
+
+
+def timed(label, fn):
+    t = time.perf_counter()
+    out = fn()
+    print(f"{label:<34} {(time.perf_counter() - t) * 1000:>9.1f} ms")
+    return out
+
+
+def run(megapixels, evacuees, hotspots):
+    rng = np.random.default_rng(0)
+    maze = synthetic_floor_plan(megapixels)
+    exits = corner_exits(maze)
+    starts = crowd(maze, evacuees, hotspots, rng)
+    capacities = [evacuees * 0.3] * len(exits)
+    print(f"{megapixels:g} MP, {evacuees} evacuees, exit capacity {capacities[0]:.0f}")
+
+    router = timed("per-exit fields (unit cost)", lambda: CrowdRouter(maze, exits, capacities=capacities))
+    density = heatmap(starts, maze.shape)
+    timed("density refresh (weighted fields)", lambda: router.update_density(density, now=0.0))
+    timed("density refresh within cadence", lambda: router.update_density(density, now=1.0))
+
+    nearest, nearest_cost = timed("assign, nearest exit", lambda: router.assign(starts, balance=False))
+    balanced, balanced_cost = timed("assign, capacity balanced", lambda: router.assign(starts))
+    routes = timed("routes for every evacuee", lambda: router.routes(starts, balanced))
+
+    print(f"{'':<12} {'loads per exit':<28} {'mean cost':>10} {'max cost':>9}")
+    for label, idx, cost in (("nearest", nearest, nearest_cost), ("balanced", balanced, balanced_cost)):
+        finite = cost[np.isfinite(cost)]
+        print(f"{label:<12} {str(router.loads(idx).tolist()):<28} {finite.mean():>10.0f} {finite.max():>9.0f}")
+    print(f"mean route length {np.mean([len(r) for r in routes if r is not None]):.0f} cells")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Crowd-aware routing benchmark")
+    parser.add_argument("--megapixels", type=float, default=4)
+    parser.add_argument("--evacuees", type=int, default=10_000)
+    parser.add_argument("--hotspots", type=int, default=3)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.megapixels, args.evacuees, args.hotspots)
@@ -0,0 +1,102 @@
+"""
+Density Accumulator Benchmark
+=============================
+Per-frame cost of the crowd heatmap at 720x1280 for 10 / 100 / 1000
+people: the original update_heatmap (add +1 per centre, then a 35x35
+GaussianBlur of the whole frame) against the time-decayed accumulator,
+updated every frame and read (rendered) every frame or every 10th frame.
+Also reports how far one stationary person has been smeared after 10 s
+(standard deviation of the heatmap mass, in pixels). Run from the
+repository root:
+
+    python -m benchmarks.bench_density_accumulator
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from density_accumulator import DensityAccumulator
+
+SIZE = (720, 1280)
+
+
+def legacy_update(heatmap, people_centers):
+    """
+    The original CrowdFlowPredictor.update_heatmap, kept as the baseline.
+    """
+    for (x, y) in people_centers:
+        if 0 <= y < SIZE[0] and 0 <= x < SIZE[1]:
+            heatmap[y, x] += 1
+    return cv2.GaussianBlur(heatmap, (35, 35), 0)
+
+
+def walkers(n, frames, rng):
+    """
+    (frames, n, 2) integer (x, y) positions of people wandering around.
+    """
+    start = rng.uniform((0, 0), (SIZE[1], SIZE[0]), (n, 2))
+    steps = rng.normal(0, 2, (frames, n, 2)).cumsum(axis=0)
+    return np.rint(np.clip(start + steps, 0, (SIZE[1] - 1, SIZE[0] - 1))).astype(np.int64)
+
+
+def spread(heatmap):
+    ys, xs = np.indices(heatmap.shape)
+    mass = heatmap.sum()
+    cy, cx = (heatmap * ys).sum() / mass, (heatmap * xs).sum() / mass
+    return float(np.sqrt((heatmap * ((ys - cy) ** 2 + (xs - cx) ** 2)).sum() / mass / 2))
+
+
+def per_frame_ms(update, tracks):
+    start = time.perf_counter()
+    for i, frame in enumerate(tracks):
+        update(i, frame)
+    return (time.perf_counter() - start) / len(tracks) * 1000
+
+
+def run(people, frames, fps):
+    rng = np.random.default_rng(0)
+    print(f"{'people':>7} {'legacy ms':>10} {'acc add ms':>11} {'+render ms':>11} {'+render/10 ms':>14}")
+    for n in people:
+        tracks = walkers(n, frames, rng)
+        centers = [[tuple(p) for p in frame] for frame in tracks]  # the detector's list of tuples
+
+        state = {"heatmap": np.zeros(SIZE, dtype=np.float32)}
+
+        def legacy(i, frame):
+            state["heatmap"] = legacy_update(state["heatmap"], frame)
+
+        def accumulate(render_every):
+            acc = DensityAccumulator(SIZE)
+
+            def update(i, frame):
+                acc.add(frame, i / fps)
+                if render_every and i % render_every == 0:
+                    acc.density()
+            return update
+
+        print(f"{n:>7} {per_frame_ms(legacy, centers):>10.2f} {per_frame_ms(accumulate(0), centers):>11.3f} "
+              f"{per_frame_ms(accumulate(1), centers):>11.3f} {per_frame_ms(accumulate(10), centers):>14.3f}")
+
+    # Smear of one person standing still for 10 s
+    heatmap, acc = np.zeros(SIZE, dtype=np.float32), DensityAccumulator(SIZE)
+    for i in range(int(10 * fps)):
+        heatmap = legacy_update(heatmap, [(640, 360)])
+        acc.add([(640, 360)], i / fps)
+    print(f"Stationary person after 10 s: legacy spread {spread(heatmap):.1f}px, "
+          f"accumulator spread {spread(acc.density()):.1f}px")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Heatmap accumulator benchmark")
+    parser.add_argument("--people", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--fps", type=float, default=30)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.people, args.frames, args.fps)
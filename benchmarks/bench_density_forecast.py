@@ -0,0 +1,92 @@
+"""
+Density Forecast Benchmark
+==========================
+Renders a synthetic 720x1280 clip of people converging on a gathering
+point (where they stop and pile up) and replays it through the forecast
+evaluation harness: forecast error at 5 / 15 / 30 s against what happened,
+compared with persistence, and precision / recall of the over-capacity
+flags. Also reports the cost of one forecast against the frame time.
+Run from the repository root:
+
+    python -m benchmarks.bench_density_forecast --people 150 --seconds 45
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.bench_optical_flow import SIZE, texture
+from density_accumulator import DensityAccumulator
+from density_forecast import DensityForecaster, evaluate, print_scores
+
+
+def gathering_clip(people, seconds, fps, rng):
+    """
+    (t, gray, centers, boxes) samples: people walk at 0.5-1.5 m/s
+    (~25-75 px/s) towards a point near the centre and stop when they reach it.
+    """
+    background = cv2.normalize(texture(SIZE, rng, 4), None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    sizes = rng.integers((30, 70), (50, 110), (people, 2))
+    start = rng.uniform((0, 0), (SIZE[1], SIZE[0]), (people, 2))
+    goal = np.array([SIZE[1] / 2, SIZE[0] / 2]) + rng.normal(0, 40, (people, 2))
+    distance = np.linalg.norm(goal - start, axis=1)
+    speed = rng.uniform(25, 75, people)
+    sprites = [cv2.normalize(texture((h, w), rng, 1.5), None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+               for w, h in sizes]
+    for f in range(int(seconds * fps)):
+        t = f / fps
+        walked = np.minimum(speed * t, distance) / np.maximum(distance, 1e-9)
+        pos = start + (goal - start) * walked[:, None]
+        frame = background.copy()
+        boxes = np.column_stack([pos - sizes / 2, pos + sizes / 2])
+        for (x1, y1, _, _), (w, h), sprite in zip(boxes.astype(int), sizes, sprites):
+            if 0 <= x1 and x1 + w <= SIZE[1] and 0 <= y1 and y1 + h <= SIZE[0]:
+                frame[y1:y1 + h, x1:x1 + w] = sprite
+        yield t, frame, pos.astype(int), boxes
+
+
+def forecast_cost(people, repeats=20):
+    rng = np.random.default_rng(1)
+    accumulator = DensityAccumulator(SIZE)
+    accumulator.add(rng.uniform((0, 0), (SIZE[1], SIZE[0]), (people, 2)), 0.0)
+    flow = np.zeros(SIZE + (2,), dtype=np.float32)
+    flow[..., 0] = 2.0  # 60 px/s at 30 fps: the worst case for step count is the fastest motion
+    forecaster = DensityForecaster(refresh_seconds=0)
+    start = time.perf_counter()
+    for i in range(repeats):
+        forecaster.update(accumulator.density(full_size=False), flow, (i + 1) / 30)
+    update_ms = (time.perf_counter() - start) / repeats * 1000
+    start = time.perf_counter()
+    for _ in range(repeats):
+        forecaster.advect(forecaster.people, forecaster.velocity, forecaster.horizons)
+    return update_ms, (time.perf_counter() - start) / repeats * 1000
+
+
+def run(people, seconds, fps, capacity, flow_mode):
+    update_ms, forecast_ms = forecast_cost(people)
+    print(f"Per frame: update {update_ms:.2f} ms; one 5/15/30 s forecast {forecast_ms:.2f} ms "
+          f"({forecast_ms / (1000 / 30) * 100:.0f}% of a 30 FPS frame, recomputed every 0.5 s by default)")
+
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    scores = evaluate(gathering_clip(people, seconds, fps, rng), SIZE, flow_mode=flow_mode, capacity=capacity)
+    print(f"{people} people gathering, {seconds:g} s at {fps:g} FPS ({flow_mode} flow), "
+          f"replayed in {time.perf_counter() - start:.1f}s:")
+    print_scores(scores)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Crowd density forecast benchmark")
+    parser.add_argument("--people", type=int, default=150)
+    parser.add_argument("--seconds", type=float, default=45)
+    parser.add_argument("--fps", type=float, default=10)
+    parser.add_argument("--capacity", type=float, default=2.0, help="People per 32 px cell")
+    parser.add_argument("--flow-mode", choices=["dense", "pyramid", "sparse"], default="sparse")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.people, args.seconds, args.fps, args.capacity, args.flow_mode)
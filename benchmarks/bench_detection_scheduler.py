@@ -0,0 +1,114 @@
+"""
+Detection Scheduler Benchmark
+=============================
+Renders a synthetic 720x1280 clip of people crossing the view (entering
+and leaving at the sides) and runs detection every frame, every K frames
+with flow propagation in between, and with K adapting to a target FPS.
+The "detector" returns the true boxes after a simulated YOLO delay, so
+the errors are those of skipping detections alone: people count error
+and the distance of each propagated centre from the nearest true one.
+Run from the repository root:
+
+    python -m benchmarks.bench_detection_scheduler --detect-ms 80 --target-fps 20
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.bench_optical_flow import SIZE, texture
+from detection_scheduler import DetectionScheduler, propagate_boxes
+from optical_flow import FlowEstimator
+
+
+def crossing_clip(people, seconds, fps, rng):
+    """
+    (gray, true boxes) per frame: people walk left to right or right to
+    left at 30-90 px/s, entering at random times.
+    """
+    background = cv2.normalize(texture(SIZE, rng, 4), None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    sizes = rng.integers((30, 70), (50, 110), (people, 2))
+    direction = rng.choice([-1, 1], people)
+    speed = rng.uniform(30, 90, people) * direction
+    start_x = np.where(direction > 0, -sizes[:, 0], SIZE[1])
+    enter = rng.uniform(-SIZE[1] / 60, seconds, people)  # some are already on screen at t = 0
+    y = rng.uniform(0, SIZE[0] - sizes[:, 1])
+    sprites = [cv2.normalize(texture((h, w), rng, 1.5), None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+               for w, h in sizes]
+    for f in range(int(seconds * fps)):
+        t = f / fps
+        x = start_x + speed * (t - enter)
+        frame = background.copy()
+        boxes = []
+        for i in np.nonzero(t >= enter)[0]:
+            x0, y0, (w, h) = int(x[i]), int(y[i]), sizes[i]
+            if x0 + w <= 0 or x0 >= SIZE[1]:
+                continue
+            lo, hi = max(x0, 0), min(x0 + w, SIZE[1])
+            frame[y0:y0 + h, lo:hi] = sprites[i][:, lo - x0:hi - x0]
+            if 0 <= x0 + w / 2 < SIZE[1]:
+                boxes.append((x0, y0, x0 + w, y0 + h))
+        yield frame, boxes
+
+
+def replay(clip, detect_ms, scheduler):
+    flow_estimator = FlowEstimator("sparse")
+    boxes, flow, last_flow = [], None, None
+    count_err, center_err = [], []
+    start = time.perf_counter()
+    for gray, truth in clip:
+        frame_start = time.perf_counter()
+        detected = scheduler is None or scheduler.should_detect(gray, last_flow)
+        if detected:
+            time.sleep(detect_ms / 1000)  # the detector
+            boxes = truth
+            flow = flow_estimator.update(gray, boxes)
+            if scheduler is not None:
+                scheduler.detected(gray, detect_ms / 1000)
+        else:
+            flow = flow_estimator.update(gray)
+            _, boxes = propagate_boxes(boxes, flow)
+        last_flow = flow
+        if scheduler is not None:
+            scheduler.frame_done(time.perf_counter() - frame_start - (detect_ms / 1000 if detected else 0))
+        count_err.append(abs(len(boxes) - len(truth)))
+        if len(boxes) and len(truth):
+            ours = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+            real = np.asarray(truth, dtype=np.float64)
+            oc = (ours[:, :2] + ours[:, 2:]) / 2
+            rc = (real[:, :2] + real[:, 2:]) / 2
+            center_err.extend(np.linalg.norm(oc[:, None] - rc[None], axis=2).min(axis=1))
+    elapsed = time.perf_counter() - start
+    return elapsed, float(np.mean(count_err)), float(np.mean(center_err))
+
+
+def run(people, seconds, fps, detect_ms, target_fps):
+    clip = list(crossing_clip(people, seconds, fps, np.random.default_rng(0)))
+    frames = len(clip)
+    print(f"{frames} frames, ~{np.mean([len(b) for _, b in clip]):.0f} people in view, detector {detect_ms:g} ms")
+    print(f"{'schedule':>22} {'FPS':>6} {'detect %':>9} {'count err':>10} {'centre err px':>14}")
+    configs = [("every frame", None), ("K = 3", DetectionScheduler(3)), ("K = 5", DetectionScheduler(5)),
+               ("K = 10", DetectionScheduler(10)),
+               (f"adaptive, {target_fps:g} FPS", DetectionScheduler(1, target_fps=target_fps)),
+               ("K = 10, flow > 1.5 px", DetectionScheduler(10, flow_threshold=1.5))]
+    for name, scheduler in configs:
+        elapsed, count_err, center_err = replay(clip, detect_ms, scheduler)
+        fraction = 1.0 if scheduler is None else scheduler.detect_fraction
+        print(f"{name:>22} {frames / elapsed:>6.1f} {fraction:>9.0%} {count_err:>10.2f} {center_err:>14.1f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Detect-every-K-frames benchmark")
+    parser.add_argument("--people", type=int, default=60)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--detect-ms", type=float, default=80, help="Simulated detector time per frame")
+    parser.add_argument("--target-fps", type=float, default=20)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.people, args.seconds, args.fps, args.detect_ms, args.target_fps)
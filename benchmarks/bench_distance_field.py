@@ -0,0 +1,119 @@
+"""
+Distance Field Benchmark
+========================
+Evacuation routing on synthetic floor plans of 1, 10 and 50 megapixels:
+the original per-query Python BFS from Path Finder against the distance
+field (one-off build + per-query descent). Run from the repository root:
+
+    python -m benchmarks.bench_distance_field --megapixels 1 10 50
+"""
+
+import argparse
+import time
+from collections import deque
+
+import numpy as np
+
+from distance_field import DistanceField
+
+
+def synthetic_floor_plan(megapixels, room=60, wall=3, door=12, seed=0):
+    """
+    Grid of rooms separated by walls, with a random door in every wall.
+    Returns a binary maze (0 = path, 1 = wall).
+    """
+    rng = np.random.default_rng(seed)
+    side = int(np.sqrt(megapixels * 1e6))
+    maze = np.zeros((side, side), np.uint8)
+    for r0 in range(room, side, room):
+        maze[r0:r0 + wall, :] = 1
+        for c0 in range(0, side, room):
+            d = c0 + rng.integers(wall, max(wall + 1, room - door))
+            maze[r0:r0 + wall, d:d + door] = 0
+    for c0 in range(room, side, room):
+        maze[:, c0:c0 + wall] = 1
+        for r0 in range(0, side, room):
+            d = r0 + rng.integers(wall, max(wall + 1, room - door))
+            maze[d:d + door, c0:c0 + wall] = 0
+    return maze
+
+
+def bfs(maze, start, end):
+    """
+    The original Path Finder BFS, kept verbatim as the baseline.
+    """
+    rows, cols = maze.shape
+    visited = np.zeros_like(maze)
+    prev = np.full((rows, cols, 2), -1, dtype=int)
+    queue = deque([start])
+    visited[start] = 1
+    directions = [(-1,0),(1,0),(0,-1),(0,1)]  # up, down, left, right
+
+    while queue:
+        current = queue.popleft()
+        if current == end:
+            break
+        for dr, dc in directions:
+            nr, nc = current[0]+dr, current[1]+dc
+            if 0 <= nr < rows and 0 <= nc < cols and maze[nr, nc] == 0 and not visited[nr, nc]:
+                queue.append((nr, nc))
+                visited[nr, nc] = 1
+                prev[nr, nc] = current
+
+    # Reconstruct path
+    path = []
+    at = end
+    while at != (-1,-1):
+        path.append(at)
+        at = tuple(prev[at])
+    path.reverse()
+
+    if path[0] == start:
+        return path
+    else:
+        return None
+
+
+def random_free_cells(maze, n, rng):
+    free = np.argwhere(maze == 0)
+    return [tuple(int(v) for v in free[i]) for i in rng.integers(0, len(free), n)]
+
+
+def run(megapixels, queries, baseline_limit):
+    rng = np.random.default_rng(1)
+    print(f"{'MP':>4} {'field build s':>14} {'route ms':>9} {'path len':>9} {'BFS s/query':>12}")
+    for mp in megapixels:
+        maze = synthetic_floor_plan(mp)
+        exit_cell = (1, 1)
+        starts = random_free_cells(maze, queries, rng)
+
+        t = time.perf_counter()
+        field = DistanceField(maze, [exit_cell])
+        build = time.perf_counter() - t
+
+        t = time.perf_counter()
+        paths = [field.route(s) for s in starts]
+        route_ms = (time.perf_counter() - t) / queries * 1000
+        mean_len = np.mean([len(p) for p in paths if p])
+
+        bfs_s = "skipped"
+        if mp <= baseline_limit:
+            t = time.perf_counter()
+            legacy = bfs(maze, starts[0], exit_cell)
+            bfs_s = f"{time.perf_counter() - t:.2f}"
+            assert len(legacy) == len(field.route(starts[0]))
+        print(f"{mp:>4g} {build:>14.2f} {route_ms:>9.2f} {mean_len:>9.0f} {bfs_s:>12}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Distance field vs BFS benchmark")
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--baseline-limit", type=float, default=10,
+                        help="Skip the (slow, memory hungry) BFS baseline above this many megapixels")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.megapixels, args.queries, args.baseline_limit)
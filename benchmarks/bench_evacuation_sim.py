@@ -0,0 +1,55 @@
+"""
+Evacuation Simulator Benchmark
+==============================
+Simulates the evacuation of 10k and 50k agents spread over a synthetic
+floor plan with four exits, and reports how much faster than real time
+the simulation runs along with the clearance times and worst bottleneck.
+Run from the repository root:
+
+    python -m benchmarks.bench_evacuation_sim --megapixels 1 --agents 10000 50000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.bench_crowd_router import corner_exits
+from benchmarks.bench_distance_field import synthetic_floor_plan
+from evacuation_sim import EvacuationSim, random_agents
+
+
+def run(megapixels, agents, dt):
+    maze = synthetic_floor_plan(megapixels)
+    exits = corner_exits(maze)
+    t = time.perf_counter()
+    sim = EvacuationSim(maze, exits, dt=dt)
+    print(f"{megapixels:g} MP, {len(exits)} exits: navigation fields {time.perf_counter() - t:.2f}s")
+    print(f"{'agents':>7} {'sim s':>7} {'wall s':>7} {'x real':>7} {'ms/step':>8} {'90% out s':>10} "
+          f"{'all out s':>10} {'worst block (row, col, p*s)':>28}")
+    for n in agents:
+        sim.reset()
+        sim.add_agents(random_agents(maze, n, np.random.default_rng(0)))
+        start = time.perf_counter()
+        simulated = sim.run()
+        wall = time.perf_counter() - start
+        times = sim.clearance_times()
+        out90 = max(t[0.9] for t in times if t[0.9] is not None)
+        out_all = max(t[1.0] for t in times if t[1.0] is not None)
+        worst = sim.bottlenecks(1)
+        worst = f"{worst[0][0]}, {worst[0][1]}, {worst[0][2]:.0f}" if worst else "-"
+        print(f"{n:>7} {simulated:>7.0f} {wall:>7.2f} {simulated / wall:>7.0f} "
+              f"{wall / (simulated / dt) * 1000:>8.2f} {out90:>10.0f} {out_all:>10.0f} {worst:>28}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Evacuation simulator benchmark")
+    parser.add_argument("--megapixels", type=float, default=1)
+    parser.add_argument("--agents", type=int, nargs="+", default=[10_000, 50_000])
+    parser.add_argument("--dt", type=float, default=0.5)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.megapixels, args.agents, args.dt)
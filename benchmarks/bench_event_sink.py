@@ -0,0 +1,118 @@
+"""
+Event Sink Benchmark
+====================
+Cost to the tracking loop of logging vehicle crossings: the original
+log_to_csv (open, append and close the CSV on every event) against
+EventSink.emit with each backend, plus the writer's throughput. A
+"stalled" backend that sleeps on every batch (a slow network share)
+shows that emit stays flat and overflow is dropped, not waited for.
+Run from the repository root:
+
+    python -m benchmarks.bench_event_sink --events 20000
+"""
+
+import argparse
+import csv
+import datetime
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from event_sink import CsvBackend, EventSink, HourlyColumnarBackend, SqliteBackend, read_hour
+
+TYPES = ("car", "motorcycle", "bus", "truck")
+
+
+def legacy_log(paths, timestamp, vehicle_id, vehicle_type, image_path, direction):
+    """
+    The original log_to_csv of Traffic Monitoring.py, kept as the baseline.
+    """
+    csv_file = paths[0] if direction == "in" else paths[1]
+    with open(csv_file, mode='a', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([timestamp, vehicle_id, vehicle_type, image_path, direction])
+
+
+def crossings(n, rng):
+    start = datetime.datetime(2025, 1, 1, 8, 30)
+    seconds = np.sort(rng.uniform(0, 7200, n))  # two hours of traffic
+    for i in range(n):
+        t = start + datetime.timedelta(seconds=float(seconds[i]))
+        direction = "in" if rng.random() < 0.5 else "out"
+        vtype = TYPES[rng.integers(len(TYPES))]
+        yield t, i, vtype, f"snapshots_{direction}2/{t:%Y%m%d_%H%M%S_%f}{vtype}{i}.jpg", direction
+
+
+class StalledBackend:
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def write(self, events):
+        time.sleep(self.seconds)
+
+    def close(self):
+        pass
+
+
+def emit_all(sink, events):
+    latencies = np.empty(len(events))
+    for i, event in enumerate(events):
+        start = time.perf_counter()
+        sink.emit(*event)
+        latencies[i] = time.perf_counter() - start
+    return latencies
+
+
+def report(name, latencies, drain_s=None, stats=None):
+    us = latencies * 1e6
+    drained = f"{len(latencies) / drain_s:>10.0f}" if drain_s else f"{'-':>10}"
+    dropped = f"{stats['dropped']:>8}" if stats else f"{'-':>8}"
+    print(f"{name:>22} {us.mean():>8.1f} {np.percentile(us, 99):>8.1f} {us.max():>9.0f} {drained} {dropped}")
+
+
+def run(events, stall_ms):
+    rng = np.random.default_rng(0)
+    data = list(crossings(events, rng))
+    print(f"{events} events")
+    print(f"{'logger':>22} {'mean us':>8} {'p99 us':>8} {'max us':>9} {'events/s':>10} {'dropped':>8}")
+    with tempfile.TemporaryDirectory() as root:
+        paths = (os.path.join(root, "legacy_in.csv"), os.path.join(root, "legacy_out.csv"))
+        latencies = np.empty(len(data))
+        for i, (t, vid, vtype, path, direction) in enumerate(data):
+            start = time.perf_counter()
+            legacy_log(paths, t.strftime("%Y-%m-%d %H:%M:%S"), vid, vtype, path, direction)
+            latencies[i] = time.perf_counter() - start
+        report("log_to_csv", latencies)
+
+        backends = {"sink: csv": CsvBackend(os.path.join(root, "in.csv"), os.path.join(root, "out.csv")),
+                    "sink: sqlite": SqliteBackend(os.path.join(root, "log.db")),
+                    "sink: hourly columnar": HourlyColumnarBackend(os.path.join(root, "hourly"))}
+        for name, backend in backends.items():
+            sink = EventSink(backend, max_queue=len(data) + 1)
+            start = time.perf_counter()
+            latencies = emit_all(sink, data)
+            sink.close()
+            report(name, latencies, time.perf_counter() - start, sink.stats())
+
+        hours = sorted(os.listdir(os.path.join(root, "hourly")))
+        rows = sum(len(read_hour(os.path.join(root, "hourly", h))["timestamp"]) for h in hours)
+        print(f"hourly columnar: {len(hours)} partitions, {rows} rows read back")
+
+        sink = EventSink(StalledBackend(stall_ms / 1000), max_queue=1000, batch_size=256)
+        latencies = emit_all(sink, data)
+        sink.close()
+        report(f"sink: {stall_ms:g} ms stalls", latencies, None, sink.stats())
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Vehicle event sink benchmark")
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--stall-ms", type=float, default=200, help="Sleep per batch of the stalled backend")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.events, args.stall_ms)
@@ -0,0 +1,64 @@
+"""
+Face Archive Benchmark
+======================
+Append throughput and retroactive search latency over a synthetic archive
+(default: 8 cameras x 4 hours at 20 encoded faces per second each).
+Run from the repository root:
+
+    python -m benchmarks.bench_face_archive --cameras 8 --hours 4
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from face_archive import FaceArchive
+from face_gallery import ENCODING_DIM
+
+
+def run(cameras, hours, faces_per_second, search_minutes):
+    rng = np.random.default_rng(0)
+    total = int(cameras * hours * 3600 * faces_per_second)
+    t0 = 1_700_000_000.0
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = FaceArchive(tmp, flush_every=4096)
+        start = time.perf_counter()
+        batch = 100_000
+        target = None
+        for lo in range(0, total, batch):
+            n = min(batch, total - lo)
+            enc = rng.standard_normal((n, ENCODING_DIM)).astype(np.float32)
+            enc /= np.linalg.norm(enc, axis=1, keepdims=True)
+            stamps = t0 + (lo + np.arange(n)) / (cameras * faces_per_second)
+            cams = (lo + np.arange(n)) % cameras
+            if target is None:
+                target = enc[n // 2].copy()
+            for i in range(n):
+                archive.append(f"cam{cams[i]}", stamps[i], lo + i, (0, 10, 10, 0), enc[i])
+        archive.flush()
+        elapsed = time.perf_counter() - start
+        print(f"archived {total} encodings in {elapsed:.1f}s ({total / elapsed:,.0f} appends/s)")
+
+        end_t = t0 + hours * 3600
+        for minutes in search_minutes:
+            start = time.perf_counter()
+            hits = archive.search(target[None], end_t - minutes * 60, end_t, k=10)
+            scanned = min(total, int(minutes * 60 * cameras * faces_per_second))
+            print(f"search last {minutes:>4g} min ({scanned:>10,} faces): "
+                  f"{time.perf_counter() - start:6.2f}s, best distance {hits[0][0]['distance']:.3f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Face embedding archive benchmark")
+    parser.add_argument("--cameras", type=int, default=8)
+    parser.add_argument("--hours", type=float, default=4)
+    parser.add_argument("--faces-per-second", type=float, default=20, help="Encoded faces per camera per second")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[40, 120, 240])
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.cameras, args.hours, args.faces_per_second, args.minutes)
@@ -0,0 +1,56 @@
+"""
+Face Gallery Benchmark
+======================
+Match latency per frame for galleries of 1k, 10k and 100k identities.
+Run from the repository root:
+
+    python -m benchmarks.bench_face_gallery --faces 10
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from face_gallery import ENCODING_DIM, FaceGallery
+
+
+def synthetic_encodings(n, seed=0):
+    """
+    Random unit-length 128-d vectors, roughly like dlib face encodings.
+    """
+    rng = np.random.default_rng(seed)
+    enc = rng.standard_normal((n, ENCODING_DIM)).astype(np.float32)
+    enc /= np.linalg.norm(enc, axis=1, keepdims=True)
+    return enc
+
+
+def run(sizes, faces, k, repeats):
+    queries = synthetic_encodings(faces, seed=1)
+    print(f"{'identities':>10} {'faces':>6} {'k':>3} {'ms/frame':>10}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            gallery = FaceGallery(tmp)
+            gallery.save(synthetic_encodings(n), [{"person_id": str(i)} for i in range(n)])
+            gallery.match(queries, k=k)  # warm up the memory map
+            start = time.perf_counter()
+            for _ in range(repeats):
+                gallery.match(queries, k=k)
+            ms = (time.perf_counter() - start) / repeats * 1000
+            print(f"{n:>10} {faces:>6} {k:>3} {ms:>10.2f}")
+            del gallery
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Face gallery match benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--faces", type=int, default=10, help="Faces per frame")
+    parser.add_argument("--k", type=int, default=3, help="Candidates per face")
+    parser.add_argument("--repeats", type=int, default=20)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.sizes, args.faces, args.k, args.repeats)
@@ -0,0 +1,84 @@
+"""
+Face Index Benchmark
+====================
+Recall versus latency of the approximate IVF(/PQ) index against exact
+search on synthetic encodings. Run from the repository root:
+
+    python -m benchmarks.bench_face_index --size 200000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from face_gallery import ENCODING_DIM
+from face_index import IVFIndex, squared_distances
+
+
+def synthetic_gallery(n, queries, identities_per_cluster=50, seed=0):
+    """
+    Clustered unit-length encodings (people who look alike end up near
+    each other) and noisy re-captures of random gallery entries as queries.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((max(1, n // identities_per_cluster), ENCODING_DIM))
+    gallery = centres[rng.integers(0, len(centres), n)] + 1.0 * rng.standard_normal((n, ENCODING_DIM))
+    gallery = (gallery / np.linalg.norm(gallery, axis=1, keepdims=True)).astype(np.float32)
+    picks = rng.integers(0, n, queries)
+    probes = gallery[picks] + 0.02 * rng.standard_normal((queries, ENCODING_DIM)).astype(np.float32)
+    return gallery, probes.astype(np.float32)
+
+
+def exact_search(gallery, sq_norms, queries, k):
+    d = squared_distances(queries, gallery, sq_norms)
+    rows = np.argpartition(d, k - 1, axis=1)[:, :k]
+    return rows
+
+
+def recall(approx_rows, exact_rows):
+    hits = sum(len(set(a[a >= 0]) & set(e)) for a, e in zip(approx_rows, exact_rows))
+    return hits / exact_rows.size
+
+
+def timed(fn, repeats):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        out = fn()
+    return out, (time.perf_counter() - start) / repeats * 1000
+
+
+def run(size, faces, k, nlist, pq_m, nprobes, repeats):
+    gallery, queries = synthetic_gallery(size, faces)
+    sq_norms = np.einsum("ij,ij->i", gallery, gallery)
+    exact_rows, exact_ms = timed(lambda: exact_search(gallery, sq_norms, queries, k), repeats)
+    print(f"gallery={size} faces/frame={faces} k={k}")
+    print(f"{'method':>16} {'nprobe':>7} {'recall@k':>9} {'ms/frame':>9}")
+    print(f"{'exact':>16} {'-':>7} {1.0:>9.3f} {exact_ms:>9.2f}")
+
+    for m in sorted({0, pq_m}):
+        start = time.perf_counter()
+        index = IVFIndex(nlist=nlist, pq_m=m).train(gallery).add(gallery)
+        label = f"ivf{nlist}" + (f"+pq{m}" if m else "")
+        print(f"{label:>16} built in {time.perf_counter() - start:.1f}s")
+        for nprobe in nprobes:
+            rows, ms = timed(lambda: index.search(queries, k, gallery, sq_norms, nprobe=nprobe)[0], repeats)
+            print(f"{label:>16} {nprobe:>7} {recall(rows, exact_rows):>9.3f} {ms:>9.2f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Approximate face index benchmark")
+    parser.add_argument("--size", type=int, default=200_000, help="Gallery size")
+    parser.add_argument("--faces", type=int, default=10, help="Faces per frame")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--nlist", type=int, default=512)
+    parser.add_argument("--pq-m", type=int, default=16, help="PQ sub-vectors (0 = IVF only)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--repeats", type=int, default=10)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.size, args.faces, args.k, args.nlist, args.pq_m, args.nprobe, args.repeats)
@@ -0,0 +1,110 @@
+"""
+Frame Pipeline Benchmark
+========================
+Simulates a 30 FPS camera that buffers frames (like an RTSP stream) feeding
+a detector that takes longer than a frame, and compares the original
+sequential loop with the threaded pipeline under both policies: rendered
+FPS, frames skipped and latency from the moment the camera captured the
+frame until it was shown. Stage costs are simulated with sleeps, as a
+GPU detector or I/O-bound stage would spend them. Run from the
+repository root:
+
+    python -m benchmarks.bench_frame_pipeline --seconds 10 --inference-ms 50
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from frame_pipeline import FramePipeline
+
+
+class BufferedCamera:
+    """
+    Frames appear every 1/fps seconds and wait in an unbounded buffer
+    until read, oldest first.
+    """
+    def __init__(self, fps, seconds):
+        self.interval = 1.0 / fps
+        self.frames = int(fps * seconds)
+        self.start = time.perf_counter()
+        self.index = 0
+
+    def read(self):
+        if self.index >= self.frames:
+            return False, None
+        captured = self.start + self.index * self.interval
+        wait = captured - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        self.index += 1
+        return True, {"captured": captured}
+
+
+def stage(ms):
+    def work(packet):
+        time.sleep(ms / 1000)
+        return packet
+    return work
+
+
+def sequential(camera, stages, render_ms):
+    latency = []
+    while True:
+        ok, packet = camera.read()
+        if not ok:
+            break
+        for _, fn in stages:
+            packet = fn(packet)
+        time.sleep(render_ms / 1000)
+        latency.append(time.perf_counter() - packet["captured"])
+    return latency
+
+
+def run(seconds, fps, inference_ms, analytics_ms, render_ms):
+    print(f"{fps:g} FPS camera for {seconds:g}s; inference {inference_ms:g} ms, analytics {analytics_ms:g} ms, "
+          f"render {render_ms:g} ms per frame")
+    print(f"{'loop':>20} {'shown FPS':>10} {'skipped':>8} {'mean latency ms':>16} {'max latency ms':>15}")
+    stages = [("inference", stage(inference_ms)), ("analytics", stage(analytics_ms))]
+    frames = int(fps * seconds)
+
+    start = time.perf_counter()
+    latency = sequential(BufferedCamera(fps, seconds), stages, render_ms)
+    rows = [("sequential", len(latency), time.perf_counter() - start, latency)]
+
+    reports = {}
+    for policy in ("newest", "every"):
+        latency = []
+
+        def render(packet):
+            time.sleep(render_ms / 1000)
+            latency.append(time.perf_counter() - packet["captured"])
+
+        camera = BufferedCamera(fps, seconds)
+        pipeline = FramePipeline(camera.read, stages, render, policy=policy)
+        start = time.perf_counter()
+        pipeline.run()
+        rows.append((f"pipeline ({policy})", len(latency), time.perf_counter() - start, latency))
+        reports[policy] = pipeline.report()
+
+    for name, shown, elapsed, latency in rows:
+        ms = np.array(latency) * 1000
+        print(f"{name:>20} {shown / elapsed:>10.1f} {frames - shown:>8} {ms.mean():>16.0f} {ms.max():>15.0f}")
+    for policy, report in reports.items():
+        print(f"\nPer stage, policy {policy!r}:\n{report}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Threaded frame pipeline benchmark")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--inference-ms", type=float, default=50)
+    parser.add_argument("--analytics-ms", type=float, default=15)
+    parser.add_argument("--render-ms", type=float, default=5)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.seconds, args.fps, args.inference_ms, args.analytics_ms, args.render_ms)
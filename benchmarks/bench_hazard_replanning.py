@@ -0,0 +1,69 @@
+"""
+Hazard Replanning Benchmark
+===========================
+A fire spreads through a synthetic floor plan, updating every second.
+Compares keeping everyone's route current incrementally (field repair +
+re-walking only broken routes) against recomputing the field and every
+route from scratch each second. Run from the repository root:
+
+    python -m benchmarks.bench_hazard_replanning --megapixels 4 --people 10000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.bench_distance_field import random_free_cells, synthetic_floor_plan
+from hazard_planner import BLOCKED, EvacuationPlanner, HazardSpread, IncrementalField
+
+
+def run(megapixels, people, seconds, speed):
+    rng = np.random.default_rng(0)
+    maze = synthetic_floor_plan(megapixels)
+    side = maze.shape[0]
+    exits = [(1, 1), (1, side - 2), (side - 2, 1), (side - 2, side - 2)]
+    fire = random_free_cells(maze, 1, rng)
+    starts = np.array(random_free_cells(maze, people, rng))
+
+    t = time.perf_counter()
+    planner = EvacuationPlanner(maze, exits, HazardSpread(maze, fire, cells_per_second=speed))
+    planner.add_people(range(people), starts)
+    print(f"{megapixels:g} MP, {people} people: initial plan {time.perf_counter() - t:.2f}s")
+
+    # The from-scratch baseline keeps its own copy of the hazard state
+    baseline_hazard = HazardSpread(maze, fire, cells_per_second=speed)
+    costs = np.ones(maze.shape, dtype=np.int64)
+    walls = maze.copy()
+
+    print(f"{'t':>4} {'changed':>8} {'replanned':>10} {'trapped':>8} {'incremental ms':>15} {'full ms':>9}")
+    for second in range(1, seconds + 1):
+        start = time.perf_counter()
+        replanned = planner.tick(second)
+        incremental = (time.perf_counter() - start) * 1000
+
+        rows, cols, new_costs = baseline_hazard.advance(second)
+        start = time.perf_counter()
+        blocked = new_costs == BLOCKED
+        walls[rows[blocked], cols[blocked]] = 1
+        costs[rows[~blocked], cols[~blocked]] = new_costs[~blocked]
+        field = IncrementalField(walls, exits, costs=costs)
+        field.routes_flat(field._flat_many(starts[:, 0], starts[:, 1]))
+        full = (time.perf_counter() - start) * 1000
+
+        trapped = sum(path is None for path in planner.routes.values())
+        print(f"{second:>4} {len(rows):>8} {replanned:>10} {trapped:>8} {incremental:>15.1f} {full:>9.1f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Incremental hazard replanning benchmark")
+    parser.add_argument("--megapixels", type=float, default=4)
+    parser.add_argument("--people", type=int, default=10_000)
+    parser.add_argument("--seconds", type=int, default=10)
+    parser.add_argument("--speed", type=float, default=20, help="Fire front speed in cells per second")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.megapixels, args.people, args.seconds, args.speed)
@@ -0,0 +1,76 @@
+"""
+Hierarchical A* Benchmark
+=========================
+Point-to-point queries on synthetic floor plans: preprocessing cost and
+query latency of HPA* against pixel-level search (the original Path Finder
+BFS and a per-query distance field), plus how much longer HPA* paths are
+than the true shortest paths (mean and worst case over the reference
+queries). Run from the repository root:
+
+    python -m benchmarks.bench_hpa_star --megapixels 1 10 50
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.bench_distance_field import bfs, random_free_cells, synthetic_floor_plan
+from distance_field import DistanceField
+from hpa_star import HierarchicalPlanner
+
+
+def run(megapixels, queries, cluster_size, baseline_limit, reference_queries):
+    rng = np.random.default_rng(2)
+    print(f"{'MP':>4} {'prep s':>7} {'nodes':>7} {'edges':>8} {'HPA* ms':>8} {'abstract ms':>12} "
+          f"{'field ms':>9} {'BFS ms':>8} {'excess %':>9} {'max %':>7}")
+    for mp in megapixels:
+        maze = synthetic_floor_plan(mp)
+        pairs = list(zip(random_free_cells(maze, queries, rng), random_free_cells(maze, queries, rng)))
+
+        t = time.perf_counter()
+        planner = HierarchicalPlanner(maze, cluster_size=cluster_size)
+        prep = time.perf_counter() - t
+
+        t = time.perf_counter()
+        results = [planner.query(s, g) for s, g in pairs]
+        hpa_ms = (time.perf_counter() - t) / queries * 1000
+
+        t = time.perf_counter()
+        for s, g in pairs:
+            planner.query(s, g, refine=False)
+        abstract_ms = (time.perf_counter() - t) / queries * 1000
+
+        # Pixel-level references on a few queries: they take seconds each at scale
+        sample = pairs[:max(1, min(queries, reference_queries))]
+        t = time.perf_counter()
+        optimal = [len(DistanceField(maze, [g]).route(s)) - 1 for s, g in sample]
+        field_ms = (time.perf_counter() - t) / len(sample) * 1000
+        excess = [(cost - best) / max(best, 1) * 100 for (cost, _), best in zip(results, optimal)]
+        for (cost, path), (s, g) in zip(results, sample):
+            assert path[0] == s and path[-1] == g and len(path) - 1 == cost
+
+        bfs_ms = "skipped"
+        if mp <= baseline_limit:
+            t = time.perf_counter()
+            bfs(maze, *sample[0])
+            bfs_ms = f"{(time.perf_counter() - t) * 1000:.0f}"
+        print(f"{mp:>4g} {prep:>7.2f} {planner.num_nodes:>7} {planner.num_edges:>8} {hpa_ms:>8.2f} "
+              f"{abstract_ms:>12.2f} {field_ms:>9.0f} {bfs_ms:>8} {np.mean(excess):>9.2f} {max(excess):>7.1f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="HPA* vs pixel-level search benchmark")
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--cluster-size", type=int, default=64)
+    parser.add_argument("--reference-queries", type=int, default=10,
+                        help="Queries also solved exactly to measure the path length excess")
+    parser.add_argument("--baseline-limit", type=float, default=10,
+                        help="Skip the (slow, memory hungry) BFS baseline above this many megapixels")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.megapixels, args.queries, args.cluster_size, args.baseline_limit, args.reference_queries)
@@ -0,0 +1,60 @@
+"""
+Map Cache Benchmark
+===================
+Start-up cost of Path Finder style routing on synthetic floor plans: a cold
+compile (threshold, dilate, distance field, HPA* graph) against a warm start
+that memory-maps the compiled artifact. Run from the repository root:
+
+    python -m benchmarks.bench_map_cache --megapixels 1 10
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+
+from benchmarks.bench_distance_field import synthetic_floor_plan
+from map_cache import compile_map
+
+
+def start_up(image_path, cache_dir, exits):
+    timings = {}
+    t = time.perf_counter()
+    compiled = compile_map(image_path, cache_dir)
+    timings["maze"] = time.perf_counter() - t
+    t = time.perf_counter()
+    compiled.field(exits)
+    timings["field"] = time.perf_counter() - t
+    t = time.perf_counter()
+    compiled.hierarchical()
+    timings["hpa"] = time.perf_counter() - t
+    return timings
+
+
+def run(megapixels):
+    print(f"{'MP':>4} {'':>5} {'maze ms':>9} {'field ms':>9} {'HPA* ms':>9} {'total ms':>9}")
+    for mp in megapixels:
+        with tempfile.TemporaryDirectory() as tmp:
+            image_path = os.path.join(tmp, "plan.png")
+            maze = synthetic_floor_plan(mp)
+            cv2.imwrite(image_path, (1 - maze) * 255)
+            exits = [(1, 1), (maze.shape[0] - 2, maze.shape[1] - 2)]
+            cache_dir = os.path.join(tmp, "map_cache")
+            for label in ("cold", "warm"):
+                t = start_up(image_path, cache_dir, exits)
+                ms = {k: v * 1000 for k, v in t.items()}
+                print(f"{mp:>4g} {label:>5} {ms['maze']:>9.1f} {ms['field']:>9.1f} {ms['hpa']:>9.1f} "
+                      f"{sum(ms.values()):>9.1f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compiled map cache start-up benchmark")
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[1, 10])
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.megapixels)
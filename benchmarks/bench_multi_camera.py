@@ -0,0 +1,78 @@
+"""
+Multi-Camera Detection Benchmark
+================================
+Aggregate person-detection throughput on CPU for 1 to 10 cameras: one
+YOLO call per camera frame (what one predictor per camera does) against
+one batched call for the frames of all cameras (CrowdFlowPredictor with a
+list of sources). Frames come from a video (each camera starts at a
+different offset) or, without one, from noise, which costs the same to
+run through the network. Run from the repository root:
+
+    python -m benchmarks.bench_multi_camera --video crowd.mp4 --cameras 1 2 4 8 10
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+SIZE = (720, 1280)
+
+
+def camera_frames(video, cameras, rounds, rng):
+    """
+    frames[round][camera] at 720x1280.
+    """
+    if video is None:
+        pool = [rng.integers(0, 256, SIZE + (3,), dtype=np.uint8) for _ in range(cameras + rounds)]
+    else:
+        cap = cv2.VideoCapture(video)
+        pool = []
+        while len(pool) < cameras * 5 + rounds:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            pool.append(cv2.resize(frame, (SIZE[1], SIZE[0])))
+        cap.release()
+        if not pool:
+            raise FileNotFoundError(video)
+    return [[pool[(r + c * 5) % len(pool)] for c in range(cameras)] for r in range(rounds)]
+
+
+def run(model_path, video, cameras, rounds, device):
+    model = YOLO(model_path)
+    rng = np.random.default_rng(0)
+    model(camera_frames(video, 1, 1, rng)[0], classes=[0], verbose=False, device=device)  # warm up
+    print(f"{'cameras':>8} {'per-frame FPS':>14} {'batched FPS':>12} {'speedup':>8} {'batch ms':>9}")
+    for n in cameras:
+        frames = camera_frames(video, n, rounds, rng)
+
+        start = time.perf_counter()
+        for batch in frames:
+            for frame in batch:
+                model(frame, classes=[0], verbose=False, device=device)
+        single = n * rounds / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for batch in frames:
+            model(batch, classes=[0], verbose=False, device=device)
+        elapsed = time.perf_counter() - start
+        batched = n * rounds / elapsed
+        print(f"{n:>8} {single:>14.1f} {batched:>12.1f} {batched / single:>7.2f}x {elapsed / rounds * 1000:>9.0f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Multi-camera batched detection benchmark")
+    parser.add_argument("--model", type=str, default="yolov8n.pt")
+    parser.add_argument("--video", type=str, default=None, help="Video to take camera frames from")
+    parser.add_argument("--cameras", type=int, nargs="+", default=[1, 2, 4, 8, 10])
+    parser.add_argument("--rounds", type=int, default=20, help="Frames per camera")
+    parser.add_argument("--device", type=str, default="cpu")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.model, args.video, args.cameras, args.rounds, args.device)
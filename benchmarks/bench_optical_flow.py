@@ -0,0 +1,120 @@
+"""
+Optical Flow Modes Benchmark
+============================
+Renders a synthetic 720x1280 crowd clip (textured people walking at known
+speeds over a static textured background) and runs every flow mode on it,
+reporting frames per second and the mean endpoint error (px / frame)
+against the original full-resolution Farneback result, over the whole
+frame and inside the person boxes, plus the in-box error against the true
+motion. With flow measured every N frames, "lerp N" rows interpolate
+between the last two measurements and "hold N" rows keep the last one. Run from the repository root:
+
+    python -m benchmarks.bench_optical_flow --people 40 --frames 60
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from optical_flow import FlowEstimator, dense_flow
+
+SIZE = (720, 1280)
+EVAL_STEP = 4  # errors are measured on every 4th pixel
+
+
+def texture(shape, rng, blur=3):
+    noise = rng.integers(0, 256, shape).astype(np.float32)
+    return cv2.GaussianBlur(noise, (0, 0), blur)
+
+
+def synthetic_clip(people, frames, rng):
+    """
+    Gray frames, per-frame person boxes (x1, y1, x2, y2) and the true
+    per-frame motion of each person.
+    """
+    background = cv2.normalize(texture(SIZE, rng, 4), None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    sizes = rng.integers((30, 70), (50, 110), (people, 2))  # (w, h)
+    start = rng.uniform((60, 60), (SIZE[1] - 120, SIZE[0] - 160), (people, 2))
+    velocity = rng.uniform(-3, 3, (people, 2))
+    sprites = [cv2.normalize(texture((h, w), rng, 1.5), None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+               for w, h in sizes]
+    clip, boxes = [], []
+    for f in range(frames):
+        frame = background.copy()
+        pos = start + velocity * f
+        frame_boxes = []
+        for (x, y), (w, h), sprite in zip(pos, sizes, sprites):
+            # Subpixel placement so the motion is exactly `velocity`
+            shift = np.float32([[1, 0, x - int(x)], [0, 1, y - int(y)]])
+            patch = cv2.warpAffine(sprite, shift, (int(w), int(h)), borderMode=cv2.BORDER_REFLECT)
+            x0, y0 = int(x), int(y)
+            if 0 <= x0 and x0 + w <= SIZE[1] and 0 <= y0 and y0 + h <= SIZE[0]:
+                frame[y0:y0 + h, x0:x0 + w] = patch
+            frame_boxes.append((x0, y0, x0 + int(w), y0 + int(h)))
+        clip.append(frame)
+        boxes.append(frame_boxes)
+    return clip, boxes, velocity
+
+
+def box_mask(boxes):
+    mask = np.zeros(SIZE, dtype=bool)
+    for x1, y1, x2, y2 in boxes:
+        mask[max(y1, 0):y2, max(x1, 0):x2] = True
+    return mask[::EVAL_STEP, ::EVAL_STEP]
+
+
+def truth_field(boxes, velocity):
+    flow = np.zeros(SIZE + (2,), dtype=np.float32)
+    for (x1, y1, x2, y2), v in zip(boxes, velocity):
+        flow[max(y1, 0):y2, max(x1, 0):x2] = v
+    return flow[::EVAL_STEP, ::EVAL_STEP]
+
+
+def run(people, frames):
+    rng = np.random.default_rng(0)
+    clip, boxes, velocity = synthetic_clip(people, frames, rng)
+
+    start = time.perf_counter()
+    reference = [dense_flow(a, b)[::EVAL_STEP, ::EVAL_STEP] for a, b in zip(clip, clip[1:])]
+    ref_fps = (frames - 1) / (time.perf_counter() - start)
+    masks = [box_mask(b) for b in boxes[1:]]
+    truths = [truth_field(b, velocity) for b in boxes[1:]]
+
+    def epe(a, b, mask=None):
+        err = np.linalg.norm(a - b, axis=-1)
+        return float(err[mask].mean() if mask is not None else err.mean())
+
+    print(f"{people} people, {frames} frames of {SIZE[1]}x{SIZE[0]}; full-res Farneback {ref_fps:.1f} FPS")
+    print(f"{'mode':>20} {'FPS':>7} {'speedup':>8} {'EPE vs ref':>11} {'box EPE vs ref':>15} {'box EPE vs truth':>17}")
+    configs = [("dense", 1, 1, True), ("pyramid", 1, 1, True), ("pyramid", 2, 1, True), ("sparse", 1, 1, True)]
+    configs += [(mode, 1, 3, interpolate) for mode in ("dense", "pyramid", "sparse") for interpolate in (True, False)]
+    for mode, levels, skip, interpolate in configs:
+        flow = FlowEstimator(mode, levels=levels, skip=skip, interpolate=interpolate)
+        fields = []
+        start = time.perf_counter()
+        for gray, frame_boxes in zip(clip, boxes):
+            field = flow.update(gray, frame_boxes)
+            if field is not None:
+                fields.append(field[::EVAL_STEP, ::EVAL_STEP])
+        fps = frames / (time.perf_counter() - start)
+        # With skip, the first skip-1 frames have no flow yet
+        pairs = list(zip(fields, reference[-len(fields):], masks[-len(fields):], truths[-len(fields):]))
+        err = np.mean([epe(f, r) for f, r, _, _ in pairs])
+        box_err = np.mean([epe(f, r, m) for f, r, m, _ in pairs])
+        truth_err = np.mean([epe(f, t, m) for f, _, m, t in pairs])
+        name = mode + (f" L{levels}" if mode == "pyramid" else "") + (f" {'lerp' if interpolate else 'hold'} {skip}" if skip > 1 else "")
+        print(f"{name:>20} {fps:>7.1f} {fps / ref_fps:>7.1f}x {err:>11.3f} {box_err:>15.3f} {truth_err:>17.3f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Optical flow modes benchmark")
+    parser.add_argument("--people", type=int, default=40)
+    parser.add_argument("--frames", type=int, default=60)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.people, args.frames)
@@ -0,0 +1,91 @@
+"""
+Path Service Load Test
+======================
+Starts the path query service on a synthetic floor plan and fires
+concurrent HTTP queries at it (half to the nearest exit, half between two
+random cells), reporting queries per second and latency percentiles for
+in-process answering and for a pool of worker processes. Run from the
+repository root:
+
+    python -m benchmarks.bench_path_service --megapixels 4 --clients 16 --workers 0 4
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import cv2
+import numpy as np
+
+from benchmarks.bench_crowd_router import corner_exits
+from benchmarks.bench_distance_field import random_free_cells, synthetic_floor_plan
+from path_service import PathServer
+
+
+def load_test(url, queries, clients):
+    def one(query):
+        start = time.perf_counter()
+        try:
+            with urlopen(url + query) as response:
+                response.read()
+        except HTTPError as e:  # 404 = no path, still a valid answer
+            if e.code != 404:
+                raise
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = np.array(list(pool.map(one, queries)))
+    return len(queries) / (time.perf_counter() - start), latencies * 1000
+
+
+def run(megapixels, n_queries, clients, workers):
+    rng = np.random.default_rng(0)
+    maze = synthetic_floor_plan(megapixels)
+    exits = corner_exits(maze)
+    starts = random_free_cells(maze, n_queries, rng)
+    goals = random_free_cells(maze, n_queries, rng)
+    queries = [f"/route?start={s[0]},{s[1]}" + (f"&goal={g[0]},{g[1]}" if i % 2 else "")
+               for i, (s, g) in enumerate(zip(starts, goals))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image_path = os.path.join(tmp, "plan.png")
+        cv2.imwrite(image_path, (1 - maze) * 255)
+        kwargs = {"image_path": image_path, "exits": exits, "cache_dir": os.path.join(tmp, "map_cache"),
+                  "dilate_kernel": 0}
+        print(f"{megapixels:g} MP, {n_queries} queries, {clients} concurrent clients")
+        print(f"{'workers':>8} {'start s':>8} {'QPS':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for n in workers:
+            t = time.perf_counter()
+            server = PathServer(("127.0.0.1", 0), kwargs, workers=n)
+            ready = time.perf_counter() - t
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            url = f"http://127.0.0.1:{server.server_address[1]}"
+            try:
+                load_test(url, queries[:clients * 2], clients)  # warm up the workers
+                qps, ms = load_test(url, queries, clients)
+            finally:
+                server.shutdown()
+                server.server_close()
+            print(f"{n:>8} {ready:>8.2f} {qps:>7.1f} {np.percentile(ms, 50):>8.1f} "
+                  f"{np.percentile(ms, 99):>8.1f} {ms.max():>8.1f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Path query service load test")
+    parser.add_argument("--megapixels", type=float, default=4)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, os.cpu_count() or 1])
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.megapixels, args.queries, args.clients, args.workers)
@@ -0,0 +1,115 @@
+"""
+Snapshot Writer Benchmark
+=========================
+Per-frame cost of Traffic Monitoring's snapshot path on 4K (2160x3840)
+frames, detector excluded: the original loop (a full-frame copy every
+frame and a synchronous cv2.imwrite of the crop on crossing frames)
+against cropping the untouched frame before drawing and handing the crop
+to the SnapshotWriter pool, for each format. Both loops draw the same
+trails and overlays. Run from the repository root:
+
+    python -m benchmarks.bench_snapshot_writer --frames 300 --crossing-every 5
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.bench_optical_flow import texture
+from snapshot_writer import SnapshotWriter
+
+SIZE_4K = (2160, 3840)
+
+
+def drone_frame(rng):
+    gray = cv2.normalize(texture(SIZE_4K, rng, 3), None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+
+def draw_overlays(frame, trails):
+    cv2.polylines(frame, trails, isClosed=False, color=(0, 255, 255), thickness=2)
+    cv2.line(frame, (0, 1000), (3840, 1000), (255, 0, 0), 2)
+    cv2.line(frame, (0, 1200), (3840, 1200), (0, 0, 255), 2)
+
+
+def crops(frames, every, rng):
+    """
+    Crop box per frame (None when no vehicle crosses): 250-450 px vehicles.
+    """
+    for f in range(frames):
+        if f % every:
+            yield None
+            continue
+        w, h = rng.integers(250, 450, 2)
+        x, y = rng.integers(0, SIZE_4K[1] - w), rng.integers(0, SIZE_4K[0] - h)
+        yield x, y, x + w, y + h
+
+
+def legacy_loop(source, boxes, trails, folder):
+    times = []
+    for i, box in enumerate(boxes):
+        frame = source.copy()  # stands in for cap.read()
+        start = time.perf_counter()
+        original_frame = frame.copy()
+        draw_overlays(frame, trails)
+        if box is not None:
+            x1, y1, x2, y2 = box
+            cv2.imwrite(os.path.join(folder, f"{i}.jpg"), original_frame[y1:y2, x1:x2])
+        times.append(time.perf_counter() - start)
+    return np.array(times)
+
+
+def writer_loop(source, boxes, trails, folder, writer):
+    times = []
+    for i, box in enumerate(boxes):
+        frame = source.copy()
+        start = time.perf_counter()
+        if box is not None:
+            x1, y1, x2, y2 = box
+            writer.save(os.path.join(folder, f"{i}{writer.extension}"), frame[y1:y2, x1:x2].copy())
+        draw_overlays(frame, trails)
+        times.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    writer.close()
+    return np.array(times), time.perf_counter() - start
+
+
+def report(name, times, drain=None, stats=None):
+    ms = times * 1000
+    drained = f"{drain * 1000:>9.0f}" if drain is not None else f"{'-':>9}"
+    saved = f"{stats['saved']:>6}/{stats['dropped']:<4}" if stats else f"{'-':>11}"
+    print(f"{name:>18} {ms.mean():>8.2f} {np.percentile(ms, 99):>8.2f} {ms.max():>8.2f} {drained} {saved}")
+
+
+def run(frames, every, workers):
+    rng = np.random.default_rng(0)
+    source = drone_frame(rng)
+    boxes = list(crops(frames, every, rng))
+    # 40 tracked vehicles, 30 points of history each
+    starts = rng.integers(0, (3840, 2160), (40, 1, 1, 2))
+    trails = list((starts + np.cumsum(rng.normal(0, 8, (40, 30, 1, 2)), axis=1)).astype(np.int32))
+    print(f"{frames} 4K frames, a crossing every {every} frames, {workers} workers")
+    print(f"{'snapshot path':>18} {'mean ms':>8} {'p99 ms':>8} {'max ms':>8} {'drain ms':>9} {'saved/drop':>11}")
+    with tempfile.TemporaryDirectory() as folder:
+        report("copy + imwrite", legacy_loop(source, boxes, trails, folder))
+        for image_format, quality in (("jpg", 90), ("jpg", 75), ("webp", 80), ("png", 1)):
+            writer = SnapshotWriter(workers, image_format=image_format, quality=quality)
+            times, drain = writer_loop(source, boxes, trails, folder, writer)
+            report(f"pool {image_format} q{quality}", times, drain, writer.stats())
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Snapshot encoding benchmark on 4K frames")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--crossing-every", type=int, default=5, help="Frames between crossings")
+    parser.add_argument("--workers", type=int, default=2)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.frames, args.crossing_every, args.workers)
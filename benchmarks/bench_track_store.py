@@ -0,0 +1,128 @@
+"""
+Track Store Soak Benchmark
+==========================
+Replays hours of tracker output (people or vehicles entering, staying
+`dwell` seconds and leaving, with new track ids throughout) through the
+original dict-of-lists history with a crossed-ID set and through
+TrackStore, and prints the memory held by each (tracemalloc) at every
+simulated hour plus the cost per update. The original grows with every
+track ever seen; the store stays flat. Run from the repository root:
+
+    python -m benchmarks.bench_track_store --hours 6 --fps 5 --in-view 30
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from track_store import TrackStore
+
+
+class LegacyHistory:
+    """
+    The original track_history / crossed_ids bookkeeping, kept as the baseline.
+    """
+
+    def __init__(self, history=30):
+        self.history = history
+        self.track_history = {}
+        self.crossed_ids = set()
+
+    def update(self, track_id, point, t):
+        self.track_history.setdefault(track_id, []).append(point)
+        if len(self.track_history[track_id]) > self.history:
+            self.track_history[track_id].pop(0)
+        if len(self.track_history[track_id]) >= 2 and track_id % 3 == 0:
+            self.crossed_ids.add(track_id)
+
+    def end_frame(self, t):
+        pass
+
+    def __len__(self):
+        return len(self.track_history)
+
+
+class StoreHistory:
+    def __init__(self, history=30, ttl=10.0):
+        self.store = TrackStore(history, ttl=ttl)
+
+    def update(self, track_id, point, t):
+        self.store.append(track_id, point, t)
+        if self.store.previous(track_id) is not None and track_id % 3 == 0:
+            self.store.set_flags(track_id, 1)
+
+    def end_frame(self, t):
+        self.store.evict(t)
+
+    def __len__(self):
+        return len(self.store)
+
+
+def soak(make_tracker, hours, fps, in_view, dwell, rng, trace=True):
+    """
+    Memory held after every simulated hour and seconds per update.
+    """
+    frames_per_hour = int(3600 * fps)
+    lifetimes = np.maximum(1, rng.exponential(dwell * fps, in_view)).astype(int)
+    ids = np.arange(in_view)
+    next_id = in_view
+    positions = rng.uniform(0, 1000, (in_view, 2))
+    updates, update_seconds, checkpoints = 0, 0.0, []
+    if trace:
+        tracemalloc.start()
+    tracker = make_tracker()
+    for f in range(hours * frames_per_hour):
+        t = f / fps
+        positions += rng.normal(0, 3, positions.shape)
+        points = positions.astype(int).tolist()
+        start = time.perf_counter()
+        for track_id, point in zip(ids.tolist(), points):
+            tracker.update(track_id, tuple(point), t)
+        tracker.end_frame(t)
+        update_seconds += time.perf_counter() - start
+        updates += in_view
+        # Tracks that leave are replaced by new ids
+        lifetimes -= 1
+        gone = np.nonzero(lifetimes <= 0)[0]
+        if len(gone):
+            ids[gone] = np.arange(next_id, next_id + len(gone))
+            next_id += len(gone)
+            lifetimes[gone] = np.maximum(1, rng.exponential(dwell * fps, len(gone))).astype(int)
+            positions[gone] = rng.uniform(0, 1000, (len(gone), 2))
+        if trace and (f + 1) % frames_per_hour == 0:
+            checkpoints.append((tracemalloc.get_traced_memory()[0], len(tracker), next_id))
+    if trace:
+        tracemalloc.stop()
+    return checkpoints, update_seconds / updates
+
+
+def run(hours, fps, in_view, dwell):
+    print(f"{hours} h at {fps:g} FPS, {in_view} tracks in view, {dwell:g} s average dwell")
+    results = {}
+    for name, make_tracker in (("dict of lists", LegacyHistory), ("TrackStore", StoreHistory)):
+        checkpoints, _ = soak(make_tracker, hours, fps, in_view, dwell, np.random.default_rng(0))
+        # Timed separately: tracemalloc slows down allocation-heavy code unevenly
+        _, per_update = soak(make_tracker, 1, fps, in_view, dwell, np.random.default_rng(1), trace=False)
+        results[name] = checkpoints, per_update
+    print(f"{'hour':>5} {'tracks seen':>12} | {'dict MB':>8} {'kept':>7} | {'store MB':>9} {'kept':>6}")
+    legacy, store = results["dict of lists"][0], results["TrackStore"][0]
+    for hour, ((lm, lk, seen), (sm, sk, _)) in enumerate(zip(legacy, store), 1):
+        print(f"{hour:>5} {seen:>12} | {lm / 1e6:>8.1f} {lk:>7} | {sm / 1e6:>9.2f} {sk:>6}")
+    for name, (_, per_update) in results.items():
+        print(f"{name}: {per_update * 1e6:.2f} us per update")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Track history memory soak test")
+    parser.add_argument("--hours", type=int, default=6, help="Simulated hours")
+    parser.add_argument("--fps", type=float, default=5)
+    parser.add_argument("--in-view", type=int, default=30, help="Tracks in view at any time")
+    parser.add_argument("--dwell", type=float, default=20, help="Average seconds a track stays in view")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.hours, args.fps, args.in_view, args.dwell)
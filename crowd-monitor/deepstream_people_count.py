@@ -1,31 +1,36 @@
 #!/usr/bin/env python3
-import sys, gi
+import os, sys, gi
 gi.require_version('Gst', '1.0')
 from gi.repository import Gst, GLib
 import pyds
 import math
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from counting_engine import CountingEngine
+from track_store import TrackStore
 Gst.init(None)
-def intersect(A, B, C, D):
-    def ccw(A, B, C):
-        return (C[1]-A[1]) * (B[0]-A[0]) > (B[1]-A[1]) * (C[0]-A[0])
-    return ccw(A, C, D) != ccw(B, C, D) and ccw(A, B, C) != ccw(A, B, D)
 
-# Track center points of each person
-track_history = {}
-crossed_ids = {}
+# Track center points of each person (last 30, forgotten 10 s after they leave)
+tracks = TrackStore(history=30, capacity=4096, ttl=10.0)
+CROSSED_IN = 1
+CROSSED_OUT = 2
+# object_id of objects the tracker has not assigned yet (guint64; 32-bit on old DeepStream)
+UNTRACKED_OBJECT_IDS = (0xFFFFFFFFFFFFFFFF, 0xFFFFFFFF)
 
 IN_COUNT = 0
 OUT_COUNT = 0
 # Define line coordinates (replace with your actual config_nvdsanalytics.txt line values)
 OUT_LINE = [(737, 328), (1018, 328)]
 IN_LINE = [(740, 300), (1012, 296)]
+# Both lines tested for all people of a frame at once; IN takes priority
+counting = CountingEngine({"IN": (IN_LINE[0], IN_LINE[1]), "OUT": (OUT_LINE[0], OUT_LINE[1])})
+CROSSED_FLAGS = {"IN": CROSSED_IN, "OUT": CROSSED_OUT}
 
 # --- Put this at top of your file (if not already) ---
 # Some pyds builds don't expose analytics meta constants; we'll detect by cast instead.
 # NVDSANALYTICS_FRAME_META = 100  # optional fallback, not used below
 
 def osd_sink_pad_buffer_probe(pad, info, u_data):
-    global IN_COUNT, OUT_COUNT, crossed_ids, track_history
+    global IN_COUNT, OUT_COUNT
 
     # Per-frame display text (always start defined)
     try:
@@ -47,37 +52,40 @@ def osd_sink_pad_buffer_probe(pad, info, u_data):
             # --- initialize display_text for this frame ---
             display_text = f"IN: {IN_COUNT}  |  OUT: {OUT_COUNT}"
             crowd_alerted = False
+            frame_time = frame_meta.buf_pts / 1e9
 
             # ---- 1) IN/OUT counting ----
+            candidates, previous, current = [], [], []  # uncounted people with a previous point
             obj_meta_list = frame_meta.obj_meta_list
             while obj_meta_list:
                 obj_meta = pyds.NvDsObjectMeta.cast(obj_meta_list.data)
-                if obj_meta and obj_meta.class_id == 0 and obj_meta.object_id != 0xFFFFFFFF:
+                if obj_meta and obj_meta.class_id == 0 and obj_meta.object_id not in UNTRACKED_OBJECT_IDS:
                     tracking_id = obj_meta.object_id
                     x_center = int(obj_meta.rect_params.left + obj_meta.rect_params.width / 2)
                     y_center = int(obj_meta.rect_params.top + obj_meta.rect_params.height / 2)
                     current_point = (x_center, y_center)
 
-                    if tracking_id not in track_history:
-                        track_history[tracking_id] = []
-                    track_history[tracking_id].append(current_point)
-                    if len(track_history[tracking_id]) > 30:
-                        track_history[tracking_id].pop(0)
+                    tracks.append(tracking_id, current_point, frame_time)
 
-                    if tracking_id not in crossed_ids:
-                        crossed_ids[tracking_id] = set()
-
-                    if len(track_history[tracking_id]) >= 2 and not crossed_ids[tracking_id]:
-                        prev_point = track_history[tracking_id][-2]
-                        if intersect(IN_LINE[0], IN_LINE[1], prev_point, current_point):
-                            IN_COUNT += 1
-                            crossed_ids[tracking_id].add("IN")
-                        elif intersect(OUT_LINE[0], OUT_LINE[1], prev_point, current_point):
-                            OUT_COUNT += 1
-                            crossed_ids[tracking_id].add("OUT")
+                    if tracks.length(tracking_id) >= 2 and not tracks.get_flags(tracking_id):
+                        candidates.append(tracking_id)
+                        previous.append(tracks.previous(tracking_id))
+                        current.append(current_point)
 
                 obj_meta_list = obj_meta_list.next
 
+            gates, _ = counting.first_gate(previous, current)
+            for tracking_id, gate in zip(candidates, gates.tolist()):
+                if gate < 0:
+                    continue
+                name = counting.names[gate]
+                if name == "IN":
+                    IN_COUNT += 1
+                else:
+                    OUT_COUNT += 1
+                tracks.set_flags(tracking_id, CROSSED_FLAGS[name])
+            tracks.evict(frame_time)
+
             # ---- 2) Overcrowding detection (robust) ----
             # Choose a safe default threshold (overrideable)
             FRAME_OVERCROWD_THRESHOLD = 50  # change this to what you consider "crowd"
@@ -0,0 +1,176 @@
+"""
+Crowd-Aware Evacuation Routing
+==============================
+Spreads evacuees over exits and corridors instead of sending everyone down
+the single shortest corridor:
+- Cell costs come from the crowd density grid that
+  `CrowdFlowPredictor.update_heatmap` maintains, mapped onto the floor plan
+  (homography or plain resize): a crowded cell costs up to
+  `1 + crowd_weight` steps to cross, an empty one costs 1.
+- Costs are refreshed at most once per `refresh_seconds`, rebuilding one
+  weighted field per exit. (Incremental repair does not pay off here: a
+  density change shifts the distance of every cell behind it.)
+- `assign` routes a whole batch of evacuees at once with capacity-aware
+  balancing: an exit over its capacity raises a price until just enough
+  people switch to their next-best exit (an auction over exits).
+
+    router = CrowdRouter(maze, exits, capacities=[4000, 4000, 2000])
+    router.update_density(predictor.heatmap)
+    exit_index, cost = router.assign(starts)
+    routes = router.routes(starts, exit_index)
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+from distance_field import UNREACHABLE
+from hazard_planner import IncrementalField
+
+
+class CrowdRouter:
+    def __init__(self, maze, exits, capacities=None, crowd_weight=4, saturation=None,
+                 refresh_seconds=5.0, homography=None):
+        """
+        maze:             2D array, 0 = path, nonzero = wall.
+        exits:            list of (row, col) exit cells.
+        capacities:       evacuees each exit can take (None = unlimited).
+        crowd_weight:     extra crossing cost of a cell at full density.
+        saturation:       density counted as full (default: the grid's maximum).
+        refresh_seconds:  minimum interval between cost refreshes.
+        homography:       3x3 camera -> floor plan transform for the density grid;
+                          without one the grid is resized onto the maze.
+        """
+        self.maze = np.ascontiguousarray(maze)
+        self.exits = [tuple(e) for e in exits]
+        self.capacities = None if capacities is None else np.asarray(capacities, dtype=np.float64)
+        self.crowd_weight = crowd_weight
+        self.saturation = saturation
+        self.refresh_seconds = refresh_seconds
+        self.homography = homography
+        self._free = self.maze == 0
+        self.costs = np.ones(self.maze.shape, dtype=np.int32)
+        self._refreshed = None
+        self._fields = [IncrementalField(self.maze, [e]) for e in self.exits]
+
+    # --- Density ---
+    def density_costs(self, density):
+        """
+        Integer crossing cost per maze cell for a density grid.
+        """
+        density = np.asarray(density, dtype=np.float32)
+        rows, cols = self.maze.shape
+        if self.homography is not None:
+            density = cv2.warpPerspective(density, self.homography, (cols, rows))
+        elif density.shape != self.maze.shape:
+            density = cv2.resize(density, (cols, rows), interpolation=cv2.INTER_LINEAR)
+        saturation = self.saturation or float(density.max())
+        if saturation <= 0:
+            return np.ones(self.maze.shape, dtype=np.int32)
+        level = np.clip(density / saturation, 0.0, 1.0)
+        return 1 + np.rint(self.crowd_weight * level).astype(np.int32)
+
+    def update_density(self, density, now=None):
+        """
+        Refresh the cell costs from a density grid, at most once per
+        refresh_seconds. Returns True if the costs were refreshed.
+        """
+        now = time.monotonic() if now is None else now
+        if self._refreshed is not None and now - self._refreshed < self.refresh_seconds:
+            return False
+        self._refreshed = now
+        costs = self.density_costs(density)
+        if ((costs != self.costs) & self._free).any():
+            self.costs = costs
+            self._fields = [IncrementalField(self.maze, [e], costs=costs) for e in self.exits]
+        return True
+
+    # --- Assignment ---
+    def exit_costs(self, starts):
+        """
+        (N, exits) weighted walking cost from each start to each exit (inf if unreachable).
+        """
+        starts = np.asarray(starts, dtype=np.int64).reshape(-1, 2)
+        d = np.stack([f.distances_at(starts[:, 0], starts[:, 1]) for f in self._fields], axis=1)
+        d = d.astype(np.float64)
+        d[d == UNREACHABLE] = np.inf
+        return d
+
+    def assign(self, starts, capacities=None, balance=True, tolerance=0.005, max_rounds=1000):
+        """
+        Exit for every start cell, balanced against the exit capacities
+        (balance=False sends everyone to their cheapest exit).
+        Returns (exit_index, cost): -1 / inf for evacuees who cannot reach any exit.
+        Balancing stops once every exit is within `tolerance` (a fraction) of
+        its capacity: with integer costs, many evacuees tie and an exact fit
+        can take many rounds for no practical gain. When the capacities of the
+        reachable exits add up to fewer people than can leave, they are
+        scaled up proportionally.
+        """
+        d = self.exit_costs(starts)
+        n, n_exits = d.shape
+        exit_index = np.full(n, -1, dtype=np.int64)
+        cost = np.full(n, np.inf)
+        ok = np.nonzero(np.isfinite(d).any(axis=1))[0]
+        if not len(ok):
+            return exit_index, cost
+        d = d[ok]
+
+        caps = self.capacities if capacities is None else np.asarray(capacities, dtype=np.float64)
+        prices = np.zeros(n_exits)
+        choice = d.argmin(axis=1)
+        if balance and caps is not None:
+            caps = np.where(np.isfinite(d).any(axis=0), caps, 0.0)  # exits nobody can reach
+            if caps.sum() < len(ok):
+                caps = caps * len(ok) / max(caps.sum(), 1)
+            caps = np.ceil(caps)
+            for _ in range(max_rounds):
+                reduced = d + prices
+                choice = reduced.argmin(axis=1)
+                over = np.bincount(choice, minlength=n_exits) - caps
+                # One exit per round: raising several at once just shuffles
+                # people between them
+                e = int(over.argmax())
+                if over[e] <= tolerance * caps[e]:
+                    break
+                r = reduced[choice == e]
+                own = r[:, e].copy()
+                r[:, e] = np.inf
+                regret = r.min(axis=1) - own
+                regret = regret[np.isfinite(regret)]  # people with no other exit stay
+                if not len(regret):
+                    caps[e] = np.inf
+                    continue
+                k = min(int(over[e]), len(regret))
+                # Just enough to push the k cheapest-to-move evacuees elsewhere
+                prices[e] += np.partition(regret, k - 1)[k - 1] + 1e-6
+            choice = (d + prices).argmin(axis=1)
+
+        exit_index[ok] = choice
+        cost[ok] = d[np.arange(len(ok)), choice]
+        return exit_index, cost
+
+    def routes(self, starts, exit_index):
+        """
+        Route for every start to its assigned exit: (k, 2) arrays of (row, col), or None.
+        """
+        starts = np.asarray(starts, dtype=np.int64).reshape(-1, 2)
+        exit_index = np.asarray(exit_index)
+        routes = [None] * len(starts)
+        for e, field in enumerate(self._fields):
+            who = np.nonzero(exit_index == e)[0]
+            if not len(who):
+                continue
+            flat = field._flat_many(starts[who, 0], starts[who, 1])
+            for i, path in zip(who.tolist(), field.routes_flat(flat)):
+                if path is not None:
+                    routes[i] = np.stack([path // field._cols - 1, path % field._cols - 1], axis=1)
+        return routes
+
+    def loads(self, exit_index):
+        """
+        Evacuees assigned to each exit.
+        """
+        exit_index = np.asarray(exit_index)
+        return np.bincount(exit_index[exit_index >= 0], minlength=len(self.exits))
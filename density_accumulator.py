@@ -0,0 +1,102 @@
+"""
+Crowd Density Accumulator
+=========================
+Replaces the add-then-blur-the-whole-frame heatmap of CrowdFlowPredictor:
+- Detections are added as single impulses on a low-resolution grid
+  (`scale` pixels per cell), so an update costs time proportional to the
+  number of people, not the frame size.
+- Time decay is exponential with a half-life in seconds. It is applied
+  lazily through a global scale factor, so old detections fade without
+  touching the grid every frame. The map is an exponential moving average
+  of occupancy: a person standing still for a while contributes exactly 1.
+- The Gaussian spread is applied once, only when the map is read (e.g.
+  when a frame is rendered), and the result is cached until the next
+  update. Repeated blurring no longer smears the map without bound.
+Values are people per pixel of the full-size frame.
+"""
+
+import math
+import time
+
+import cv2
+import numpy as np
+
+# The old 35x35 GaussianBlur (sigma 0) has this sigma in pixels
+DEFAULT_SIGMA = 0.3 * ((35 - 1) * 0.5 - 1) + 0.8
+
+
+class DensityAccumulator:
+    def __init__(self, size=(720, 1280), half_life=2.0, sigma=DEFAULT_SIGMA, scale=4):
+        """
+        size:      (height, width) of the frame the detections come from.
+        half_life: seconds after which a detection counts half.
+        sigma:     Gaussian spread of one person, in frame pixels.
+        scale:     frame pixels per grid cell (1 = full resolution).
+        """
+        self.size = tuple(size)
+        self.half_life = half_life
+        self.sigma = sigma
+        self.scale = scale
+        self.grid_shape = (-(-self.size[0] // scale), -(-self.size[1] // scale))
+        self._rate = math.log(2) / half_life
+        self.reset()
+
+    def reset(self):
+        self._grid = np.zeros(self.grid_shape, dtype=np.float64)
+        self._origin = None  # time at which the stored grid is unscaled
+        self.time = None
+        self._cache = {}
+
+    def _gain(self, t):
+        return math.exp(self._rate * (t - self._origin))
+
+    def add(self, centers, t=None):
+        """
+        Add one frame of detections: (x, y) centres in frame pixels, at time t
+        (seconds; defaults to now).
+        """
+        t = time.monotonic() if t is None else t
+        if self.time is None:
+            self._origin = self.time = t
+            weight = 1.0  # the first frame starts the average
+        else:
+            # EMA: D = a * D + (1 - a) * X with a = exp(-rate * dt). The grid
+            # stores D * gain(t), so the decay of old mass is implicit.
+            weight = -math.expm1(-self._rate * max(t - self.time, 0.0))
+            self.time = max(t, self.time)
+        gain = self._gain(self.time)
+        if gain > 1e12:
+            # Rebase before the stored values overflow
+            self._grid /= gain
+            self._origin, gain = self.time, 1.0
+
+        pts = np.asarray(centers, dtype=np.int64).reshape(-1, 2)
+        inside = (pts[:, 0] >= 0) & (pts[:, 0] < self.size[1]) & (pts[:, 1] >= 0) & (pts[:, 1] < self.size[0])
+        pts = pts[inside] // self.scale
+        np.add.at(self._grid.ravel(), pts[:, 1] * self.grid_shape[1] + pts[:, 0], weight * gain)
+        self._cache = {}
+
+    def counts(self):
+        """
+        Decayed people count per grid cell, before spreading.
+        """
+        if self._origin is None:
+            return np.zeros(self.grid_shape, dtype=np.float32)
+        return (self._grid / self._gain(self.time)).astype(np.float32)
+
+    def density(self, full_size=True):
+        """
+        Spread density (people per frame pixel), computed lazily and cached
+        until the next add(). full_size=False returns the grid resolution.
+        """
+        if full_size not in self._cache:
+            if "grid" not in self._cache:
+                grid_sigma = self.sigma / self.scale
+                spread = cv2.GaussianBlur(self.counts(), (0, 0), grid_sigma, borderType=cv2.BORDER_CONSTANT)
+                self._cache["grid"] = spread / (self.scale * self.scale)
+            grid = self._cache["grid"]
+            if full_size:
+                self._cache[True] = cv2.resize(grid, (self.size[1], self.size[0]), interpolation=cv2.INTER_LINEAR)
+            else:
+                self._cache[False] = grid
+        return self._cache[full_size]
@@ -0,0 +1,299 @@
+"""
+Crowd Density Forecasting
+=========================
+Predicts where the crowd will be a few seconds ahead by moving the current
+density along the measured flow:
+- The density (from DensityAccumulator) and the optical flow are pooled
+  onto a coarse grid of `cell`-pixel cells; the velocity is smoothed over
+  time with a half-life.
+- The forecast carries density and momentum together (each group keeps
+  walking at its own speed; opposing streams that meet cancel out and
+  stop). Each step is one vectorized forward remap of the whole grid:
+  every cell's people are pushed along the velocity and split bilinearly
+  over the destination cells, so converging flows pile people up and
+  nobody is created or lost. Steps are small enough that nobody moves
+  more than one cell per step; motion fades with a half-life over the
+  horizon, since people rarely keep walking straight for long.
+- Cells forecast above `capacity` people are flagged per horizon.
+- Forecasts are recomputed lazily, at most once per `refresh_seconds`.
+- `evaluate` replays a recorded video and scores each forecast against
+  the density actually observed when its horizon came.
+
+    forecaster = DensityForecaster(capacity=3)
+    forecaster.update(accumulator.density(full_size=False), flow, accumulator.time)
+    forecaster.forecast()[15]          # people per cell, 15 s ahead
+    forecaster.alerts()                # [(horizon, row, col, people), ...]
+
+    python density_forecast.py clip.mp4 --detections clip_people.npz --capacity 3
+"""
+
+import argparse
+import math
+import os
+
+import cv2
+import numpy as np
+
+from density_accumulator import DensityAccumulator
+from optical_flow import FlowEstimator
+
+
+class DensityForecaster:
+    def __init__(self, frame_size=(720, 1280), cell=32, horizons=(5, 15, 30), capacity=None,
+                 flow_half_life=1.0, motion_half_life=5.0, sigma=1.0, refresh_seconds=0.5):
+        """
+        frame_size:      (height, width) of the video frames.
+        cell:            forecast cell size in frame pixels.
+        horizons:        seconds ahead to forecast.
+        capacity:        people per cell above which a cell is flagged.
+        flow_half_life:  seconds for the velocity smoothing.
+        motion_half_life: forecast seconds after which people have slowed to
+                         half their speed (None = constant velocity).
+        sigma:           spatial smoothing of the velocity, in cells.
+        refresh_seconds: minimum interval between forecast recomputations.
+        """
+        self.frame_size = tuple(frame_size)
+        self.grid_shape = (max(1, round(frame_size[0] / cell)), max(1, round(frame_size[1] / cell)))
+        # Exact cell size in frame pixels (the frame need not be a multiple of `cell`)
+        self.cell_size = (frame_size[0] / self.grid_shape[0], frame_size[1] / self.grid_shape[1])
+        self.horizons = tuple(sorted(horizons))
+        self.capacity = capacity
+        self.sigma = sigma
+        self.refresh_seconds = refresh_seconds
+        self._rate = math.log(2) / flow_half_life
+        self._motion_rate = 0.0 if motion_half_life is None else math.log(2) / motion_half_life
+        self._gx, self._gy = np.meshgrid(np.arange(self.grid_shape[1], dtype=np.float32),
+                                         np.arange(self.grid_shape[0], dtype=np.float32))
+        self.reset()
+
+    def reset(self):
+        self.people = np.zeros(self.grid_shape, dtype=np.float32)
+        self.velocity = np.zeros(self.grid_shape + (2,), dtype=np.float32)  # cells per second
+        self.time = None
+        self._forecast = None
+        self._forecast_time = None
+
+    def _pool(self, grid):
+        if grid.shape[0] >= 4 * self.grid_shape[0] and grid.shape[1] >= 4 * self.grid_shape[1]:
+            grid = np.ascontiguousarray(grid[::4, ::4])  # full-frame flow: subsample before averaging
+        return cv2.resize(grid, (self.grid_shape[1], self.grid_shape[0]), interpolation=cv2.INTER_AREA)
+
+    def update(self, density, flow=None, t=None):
+        """
+        Feed the current density (people per frame pixel, any resolution
+        covering the frame) and the per-frame flow field from the previous
+        frame to this one (None to keep the last velocity), at time t.
+        """
+        self.people = self._pool(np.asarray(density, dtype=np.float32)) * np.float32(
+            self.cell_size[0] * self.cell_size[1])
+        if flow is not None and self.time is not None and t is not None and t > self.time:
+            dt = t - self.time
+            velocity = self._pool(np.asarray(flow, dtype=np.float32))
+            velocity[..., 0] /= self.cell_size[1] * dt
+            velocity[..., 1] /= self.cell_size[0] * dt
+            self.velocity += np.float32(-math.expm1(-self._rate * dt)) * (velocity - self.velocity)
+        if t is not None:
+            self.time = t
+
+    # --- Forecast ---
+    def forecast(self):
+        """
+        {horizon: people per cell} for every horizon, recomputed at most once
+        per refresh_seconds.
+        """
+        if (self._forecast is None or self.time is None or self._forecast_time is None
+                or self.time - self._forecast_time >= self.refresh_seconds):
+            self._forecast = self.advect(self.people, self.velocity, self.horizons)
+            self._forecast_time = self.time
+        return self._forecast
+
+    def advect(self, people, velocity, horizons):
+        """
+        Move people (per cell) along velocity (cells/s) and return the
+        grids at each horizon. Each group keeps its own velocity.
+        """
+        state = np.stack([people, people * velocity[..., 0], people * velocity[..., 1]], axis=-1)
+        eps = np.float32(1e-6)
+        result, elapsed = {}, 0.0
+        for horizon in horizons:
+            while elapsed < horizon - 1e-9:
+                # Velocity where the people are, spread a little ahead of them
+                smooth = cv2.GaussianBlur(state, (0, 0), self.sigma, borderType=cv2.BORDER_CONSTANT)
+                weight = np.maximum(smooth[..., 0], eps)
+                vx, vy = smooth[..., 1] / weight, smooth[..., 2] / weight
+                fastest = max(float(np.abs(vx).max()), float(np.abs(vy).max()), 1e-6)
+                dt = min(horizon - elapsed, 1.0 / fastest)
+                state = self._push(state, vx * dt, vy * dt)
+                if self._motion_rate:
+                    state[..., 1:] *= np.float32(math.exp(-self._motion_rate * dt))
+                elapsed += dt
+            result[horizon] = state[..., 0].copy()
+        return result
+
+    def _push(self, state, dx, dy):
+        """
+        Move every cell's contents by (dx, dy) cells, split bilinearly over the
+        four cells around its destination. Nothing is created or lost except
+        what leaves the frame.
+        """
+        rows, cols = self.grid_shape
+        x, y = (self._gx + dx).ravel(), (self._gy + dy).ravel()
+        x0, y0 = np.floor(x), np.floor(y)
+        fx, fy = x - x0, y - y0
+        x0, y0 = x0.astype(np.int64), y0.astype(np.int64)
+        values = state.reshape(-1, 3)
+        index, weight = [], []
+        for ox, oy, w in ((0, 0, (1 - fx) * (1 - fy)), (1, 0, fx * (1 - fy)),
+                          (0, 1, (1 - fx) * fy), (1, 1, fx * fy)):
+            cx, cy = x0 + ox, y0 + oy
+            inside = (cx >= 0) & (cx < cols) & (cy >= 0) & (cy < rows)
+            index.append(np.where(inside, cy * cols + cx, 0))
+            weight.append(np.where(inside, w, 0))
+        index, weight = np.concatenate(index), np.concatenate(weight)
+        moved = [np.bincount(index, weight * np.tile(values[:, c], 4), minlength=rows * cols) for c in range(3)]
+        return np.stack(moved, axis=-1).reshape(rows, cols, 3).astype(np.float32)
+
+    def overloaded(self, capacity=None):
+        """
+        {horizon: boolean grid} of cells forecast above capacity.
+        """
+        capacity = self.capacity if capacity is None else capacity
+        if capacity is None:
+            raise ValueError("No capacity configured")
+        return {h: grid > capacity for h, grid in self.forecast().items()}
+
+    def alerts(self, capacity=None):
+        """
+        (horizon, row, col, people) for every flagged cell, soonest first.
+        """
+        alerts = []
+        flagged = self.overloaded(capacity)
+        for horizon, grid in self.forecast().items():
+            for r, c in zip(*np.nonzero(flagged[horizon])):
+                alerts.append((horizon, int(r), int(c), float(grid[r, c])))
+        return alerts
+
+    def cell_rect(self, row, col):
+        """
+        (x1, y1, x2, y2) of a cell in frame pixels.
+        """
+        h, w = self.cell_size
+        return int(col * w), int(row * h), int((col + 1) * w), int((row + 1) * h)
+
+
+# --- Offline evaluation ---
+def evaluate(samples, frame_size=(720, 1280), every=1.0, half_life=2.0, flow_mode="pyramid", **forecaster_kwargs):
+    """
+    Replay (t, gray, centers, boxes) samples of a recorded video, issue a
+    forecast every `every` seconds and score it against the density observed
+    at t + horizon. Returns {horizon: metrics}, comparing against
+    persistence (the crowd stays where it is):
+    - mae / persistence_mae: mean absolute error in people per cell.
+    - skill: 1 - mae / persistence_mae (> 0 beats persistence).
+    - precision / recall of the over-capacity flags, when a capacity is set.
+    """
+    accumulator = DensityAccumulator(frame_size, half_life=half_life)
+    flow = FlowEstimator(flow_mode)
+    forecaster = DensityForecaster(frame_size, refresh_seconds=0, **forecaster_kwargs)
+    issued, observed = [], []
+    next_issue = None
+    for t, gray, centers, boxes in samples:
+        accumulator.add(centers, t)
+        field = flow.update(gray, boxes)
+        forecaster.update(accumulator.density(full_size=False), field, t)
+        observed.append((t, forecaster.people.copy()))
+        if field is not None and (next_issue is None or t >= next_issue):
+            issued.append((t, forecaster.people.copy(), forecaster.forecast()))
+            next_issue = t + every
+
+    times = np.array([t for t, _ in observed])
+    frame_dt = np.median(np.diff(times)) if len(times) > 1 else 0
+    capacity = forecaster.capacity
+    scores = {}
+    for horizon in forecaster.horizons:
+        err, base, hits, flagged, actual = [], [], 0, 0, 0
+        for t, now, forecast in issued:
+            i = int(np.searchsorted(times, t + horizon))
+            if i >= len(times) or times[i] - (t + horizon) > frame_dt:
+                continue
+            truth = observed[i][1]
+            err.append(np.abs(forecast[horizon] - truth).mean())
+            base.append(np.abs(now - truth).mean())
+            if capacity is not None:
+                hits += int(((forecast[horizon] > capacity) & (truth > capacity)).sum())
+                flagged += int((forecast[horizon] > capacity).sum())
+                actual += int((truth > capacity).sum())
+        if not err:
+            continue
+        mae, persistence = float(np.mean(err)), float(np.mean(base))
+        scores[horizon] = {"forecasts": len(err), "mae": mae, "persistence_mae": persistence,
+                           "skill": 1 - mae / persistence if persistence > 0 else 0.0}
+        if capacity is not None:
+            scores[horizon]["precision"] = hits / flagged if flagged else None
+            scores[horizon]["recall"] = hits / actual if actual else None
+    return scores
+
+
+def video_samples(video_path, detections_path, model_path="yolov8n.pt", frame_size=(720, 1280)):
+    """
+    (t, gray, centers, boxes) per frame of a recorded video. Person boxes
+    are read from detections_path (.npz) or detected with YOLO once and
+    saved there, so later evaluations replay without a model.
+    """
+    if not os.path.exists(video_path):
+        raise FileNotFoundError(video_path)
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    if os.path.exists(detections_path):
+        saved = np.load(detections_path)
+        frame_index, all_boxes = saved["frame"], saved["boxes"]
+        model = None
+    else:
+        from ultralytics import YOLO
+        model, detected = YOLO(model_path), []
+    i = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frame = cv2.resize(frame, (frame_size[1], frame_size[0]))
+        if model is None:
+            boxes = all_boxes[frame_index == i]
+        else:
+            result = model(frame, classes=[0], verbose=False)[0]
+            boxes = result.boxes.xyxy.cpu().numpy()[:, :4]
+            detected.extend((i, *box) for box in boxes)
+        centers = np.column_stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2]).astype(int)
+        yield i / fps, cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), centers, boxes
+        i += 1
+    cap.release()
+    if model is not None:
+        detected = np.asarray(detected, dtype=np.float32).reshape(-1, 5)
+        np.savez(detections_path, frame=detected[:, 0].astype(np.int64), boxes=detected[:, 1:])
+
+
+def print_scores(scores):
+    print(f"{'horizon s':>9} {'forecasts':>9} {'MAE':>8} {'persist MAE':>12} {'skill':>7} {'precision':>10} {'recall':>7}")
+    for horizon, s in scores.items():
+        precision, recall = s.get("precision"), s.get("recall")
+        print(f"{horizon:>9g} {s['forecasts']:>9} {s['mae']:>8.4f} {s['persistence_mae']:>12.4f} {s['skill']:>7.2f} "
+              f"{'-' if precision is None else f'{precision:.2f}':>10} {'-' if recall is None else f'{recall:.2f}':>7}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Evaluate crowd density forecasts on a recorded video")
+    parser.add_argument("video", type=str, help="Recorded video")
+    parser.add_argument("--detections", type=str, default=None,
+                        help="Person boxes (.npz); created with YOLO if missing (default: <video>_people.npz)")
+    parser.add_argument("--model", type=str, default="yolov8n.pt", help="YOLOv8 model for missing detections")
+    parser.add_argument("--capacity", type=float, default=None, help="People per cell flagged as over capacity")
+    parser.add_argument("--cell", type=int, default=32, help="Forecast cell size in pixels")
+    parser.add_argument("--flow-mode", choices=["dense", "pyramid", "sparse"], default="pyramid")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    detections = args.detections or os.path.splitext(args.video)[0] + "_people.npz"
+    samples = video_samples(args.video, detections, args.model)
+    print_scores(evaluate(samples, flow_mode=args.flow_mode, capacity=args.capacity, cell=args.cell))
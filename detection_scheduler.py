@@ -0,0 +1,142 @@
+"""
+Detection Scheduler
+===================
+Runs the person detector only every K frames and moves the last detections
+along the optical flow in between:
+- A detection is due after `every` frames, when the scene changed (mean
+  difference of a 64x36 thumbnail since the last detection), or when the
+  crowd moves fast (mean flow magnitude of the moving pixels), since fast
+  motion makes the propagated boxes drift.
+- With a target FPS, K adapts so that the rest of the frame's work plus
+  the detector's average cost per frame (detection time / K) fits the
+  frame budget. In a threaded pipeline the detector has its own stage and
+  the rest overlaps with it; sequential loops report the rest of each
+  frame's time with `frame_done`.
+- `propagate_boxes` moves each box by the mean flow inside it, using an
+  integral image of the flow so all boxes cost one pass over the frame.
+  Boxes whose centre leaves the frame are dropped.
+
+    scheduler = DetectionScheduler(every=5, target_fps=25)
+    if scheduler.should_detect(gray, last_flow):
+        start = time.perf_counter()
+        centers, boxes = detect(frame)
+        scheduler.detected(gray, time.perf_counter() - start)
+    else:
+        centers, boxes = propagate_boxes(boxes, flow)
+"""
+
+import math
+
+import cv2
+import numpy as np
+
+THUMBNAIL = (64, 36)
+
+
+class DetectionScheduler:
+    def __init__(self, every=5, target_fps=None, max_every=30, scene_change=12.0, flow_threshold=None):
+        """
+        every:          frames between detections (the initial value with a target FPS).
+        target_fps:     adapt `every` so the detector fits this frame rate.
+        max_every:      upper bound for the adaptive `every`.
+        scene_change:   mean gray-level difference that forces a detection (None = off).
+        flow_threshold: mean flow (px/frame) of moving pixels that forces a detection (None = off).
+        """
+        if every < 1:
+            raise ValueError("every must be at least 1")
+        self.every = every
+        self.target_fps = target_fps
+        self.max_every = max_every
+        self.scene_change = scene_change
+        self.flow_threshold = flow_threshold
+        self.detections = 0
+        self.frames = 0
+        self.detect_seconds = None  # smoothed cost of one detection
+        self.other_seconds = 0.0  # smoothed per-frame cost besides detection (sequential loops)
+        self._since = 0
+        self._reference = None
+
+    @staticmethod
+    def _thumbnail(gray):
+        return cv2.resize(gray, THUMBNAIL, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def should_detect(self, gray, flow=None):
+        """
+        True if the detector should run on this frame.
+        """
+        self.frames += 1
+        self._since += 1
+        if self._reference is None or self._since >= self.every:
+            return True
+        if self.scene_change is not None:
+            if np.abs(self._thumbnail(gray) - self._reference).mean() > self.scene_change:
+                return True
+        if self.flow_threshold is not None and flow is not None:
+            sample = flow[::8, ::8]
+            magnitude = np.hypot(sample[..., 0], sample[..., 1])
+            moving = magnitude[magnitude > 0.5]
+            if moving.size and moving.mean() > self.flow_threshold:
+                return True
+        return False
+
+    def detected(self, gray, seconds=None):
+        """
+        Record that the detector ran on this frame (taking `seconds`).
+        """
+        self.detections += 1
+        self._since = 0
+        self._reference = self._thumbnail(gray)
+        if seconds is not None:
+            if self.detect_seconds is None:
+                self.detect_seconds = seconds
+            else:
+                self.detect_seconds += 0.2 * (seconds - self.detect_seconds)
+            self._adapt()
+
+    def frame_done(self, seconds):
+        """
+        Record the frame's processing time other than detection.
+        """
+        self.other_seconds += 0.2 * (seconds - self.other_seconds)
+        self._adapt()
+
+    def _adapt(self):
+        if not self.target_fps or self.detect_seconds is None:
+            return
+        # other + detect / every <= 1 / target_fps
+        budget = 1.0 / self.target_fps - self.other_seconds
+        if budget <= 0:
+            self.every = self.max_every
+        else:
+            self.every = int(min(self.max_every, max(1, math.ceil(self.detect_seconds / budget))))
+
+    @property
+    def detect_fraction(self):
+        """
+        Fraction of frames the detector ran on.
+        """
+        return self.detections / self.frames if self.frames else 0.0
+
+
+def propagate_boxes(boxes, flow):
+    """
+    Move (x1, y1, x2, y2) boxes by the mean flow inside each. Returns
+    (centers, boxes) of the boxes whose centre stays in the frame.
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    cx, cy = (boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2
+    if flow is not None and len(boxes):
+        h, w = flow.shape[:2]
+        x1 = np.clip(np.rint(boxes[:, 0]).astype(np.int64), 0, w - 1)
+        y1 = np.clip(np.rint(boxes[:, 1]).astype(np.int64), 0, h - 1)
+        x2 = np.clip(np.rint(boxes[:, 2]).astype(np.int64), x1 + 1, w)
+        y2 = np.clip(np.rint(boxes[:, 3]).astype(np.int64), y1 + 1, h)
+        total = cv2.integral(flow)
+        area = ((x2 - x1) * (y2 - y1))[:, None]
+        mean = (total[y2, x2] - total[y1, x2] - total[y2, x1] + total[y1, x1]) / area
+        boxes = boxes + np.tile(mean, 2).astype(np.float32)
+        cx, cy = (boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2
+        keep = (cx >= 0) & (cx < w) & (cy >= 0) & (cy < h)
+        boxes, cx, cy = boxes[keep], cx[keep], cy[keep]
+    centers = [(int(x), int(y)) for x, y in zip(cx, cy)]
+    return centers, [tuple(b) for b in boxes]
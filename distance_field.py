@@ -0,0 +1,134 @@
+"""
+Distance-Field Evacuation Routing
+=================================
+Replaces the per-query Python BFS of Path Finder:
+- Once per map, a vectorized BFS wavefront computes the walking distance
+  (4-connected steps) from every free cell to the nearest exit. Each
+  wavefront step is a handful of NumPy operations on the whole frontier.
+- A route from any start cell then follows the field downhill, one step
+  per cell, so a query costs time proportional to the path length.
+Cells are (row, col), as in Path Finder.
+"""
+
+import numpy as np
+
+UNREACHABLE = -1
+
+
+def wavefront(free, dist, frontier, offsets, step=0):
+    """
+    Vectorized BFS on a padded, flattened grid, expanding in place.
+    free:     flat bool array (walls False, with a wall border around the map).
+    dist:     flat int32 distances; UNREACHABLE cells get filled in.
+    frontier: flat indices of the cells at distance `step`.
+    offsets:  flat neighbour offsets.
+    """
+    frontier = np.unique(np.asarray(frontier, dtype=np.int64))
+    dist[frontier] = step
+    while frontier.size:
+        step += 1
+        nb = (frontier[:, None] + offsets[None, :]).ravel()
+        nb = nb[free[nb] & (dist[nb] == UNREACHABLE)]
+        # Deduplicate without sorting: the last write of a unique tag wins
+        tags = -2 - np.arange(nb.size, dtype=np.int32)
+        dist[nb] = tags
+        frontier = nb[dist[nb] == tags]
+        dist[frontier] = step
+    return dist
+
+
+class DistanceField:
+    def __init__(self, maze, exits):
+        """
+        maze:  2D array, 0 = path, nonzero = wall (e.g. the dilated maze).
+        exits: list of (row, col) exit cells.
+        """
+        self._init_grid(maze, exits)
+        self._build(self._sources)
+
+    @classmethod
+    def from_distances(cls, maze, exits, dist):
+        """
+        Field from precomputed padded, flat distances (see `padded_distances`),
+        e.g. memory-mapped from the map cache, without running the wavefront.
+        """
+        field = cls.__new__(cls)
+        field._init_grid(maze, exits)
+        if dist.shape != field._free.shape:
+            raise ValueError("Distance array does not match the maze shape")
+        field._dist = dist
+        return field
+
+    @property
+    def padded_distances(self):
+        return self._dist
+
+    def _init_grid(self, maze, exits):
+        self.shape = maze.shape
+        rows, cols = maze.shape
+        self._cols = cols + 2
+        # A one-cell wall border means flat neighbour offsets never wrap around
+        padded = np.zeros((rows + 2, cols + 2), dtype=bool)
+        padded[1:-1, 1:-1] = maze == 0
+        self._free = padded.ravel()
+        self._offsets = np.array([-self._cols, self._cols, -1, 1], dtype=np.int64)
+        self.exits = [tuple(e) for e in exits]
+        # Exits on walls are ignored; with none left every cell is unreachable
+        self._sources = [self._flat(e) for e in self.exits if self.is_free(e)]
+
+    def _build(self, sources):
+        self._dist = np.full(self._free.shape, UNREACHABLE, dtype=np.int32)
+        wavefront(self._free, self._dist, sources, self._offsets)
+
+    def _flat(self, cell):
+        return (cell[0] + 1) * self._cols + (cell[1] + 1)
+
+    def _flat_many(self, rows, cols):
+        return (np.asarray(rows, dtype=np.int64) + 1) * self._cols + (np.asarray(cols, dtype=np.int64) + 1)
+
+    def is_free(self, cell):
+        r, c = cell
+        return 0 <= r < self.shape[0] and 0 <= c < self.shape[1] and bool(self._free[self._flat(cell)])
+
+    @property
+    def distances(self):
+        """
+        (rows, cols) view of the step distance to the nearest exit.
+        """
+        return self._dist.reshape(self.shape[0] + 2, self._cols)[1:-1, 1:-1]
+
+    def distance(self, cell):
+        if not self.is_free(cell):
+            return UNREACHABLE
+        return int(self._dist[self._flat(cell)])
+
+    def distances_at(self, rows, cols):
+        """
+        distance() for many cells at once; walls and cells off the map are UNREACHABLE.
+        """
+        rows, cols = np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+        out = np.full(rows.shape, UNREACHABLE, dtype=np.int64)
+        inside = (rows >= 0) & (rows < self.shape[0]) & (cols >= 0) & (cols < self.shape[1])
+        flat = self._flat_many(rows[inside], cols[inside])
+        out[inside] = np.where(self._free[flat], self._dist[flat], UNREACHABLE)
+        return out
+
+    def route(self, start):
+        """
+        Shortest path from `start` to the nearest exit as a list of (row, col),
+        or None if start is a wall or cannot reach any exit.
+        """
+        d = self.distance(start)
+        if d == UNREACHABLE:
+            return None
+        dist, offsets, cols = self._dist, self._offsets.tolist(), self._cols
+        at = self._flat(start)
+        path = [at]
+        while d > 0:
+            for off in offsets:
+                if dist[at + off] == d - 1:
+                    at += off
+                    break
+            path.append(at)
+            d -= 1
+        return [(int(p // cols) - 1, int(p % cols) - 1) for p in path]
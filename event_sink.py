@@ -0,0 +1,244 @@
+"""
+Vehicle Event Sink
+==================
+Takes the crossing log off the tracking loop:
+- `EventSink.emit` only puts the event on a bounded queue and never
+  blocks; when the queue is full the event is dropped and counted.
+- A background writer thread drains the queue and hands the backend
+  batches of up to `batch_size` events, at least every `flush_seconds`.
+- Backends (all opened in the writer thread):
+  - `CsvBackend`: the original layout, one CSV per direction, opened once.
+  - `SqliteBackend`: an append-only table indexed on timestamp, vehicle
+    type and direction, one transaction per batch.
+  - `HourlyColumnarBackend`: one directory per hour (named by its start in
+    epoch seconds) with one append-only binary file per column, readable
+    with `read_hour` as NumPy arrays.
+- `stats()` reports events queued, written, dropped and failed.
+
+    with EventSink(SqliteBackend("vehicle_log.db")) as sink:
+        sink.emit(datetime.datetime.now(), 17, "car", "snapshots_in2/x.jpg", "in")
+"""
+
+import csv
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+FIELDS = ("timestamp", "vehicle_id", "vehicle_type", "image_path", "direction")
+_STOP = object()
+
+
+# --- Backends ---
+class CsvBackend:
+    def __init__(self, in_path="vehicle_log_in2.csv", out_path="vehicle_log_out2.csv"):
+        """
+        in_path / out_path: CSV files for "in" and "out" crossings.
+        """
+        self.paths = {"in": in_path, "out": out_path}
+        self._files = {}
+
+    def _writer(self, direction):
+        path = self.paths["in" if direction == "in" else "out"]
+        if path not in self._files:
+            new = not os.path.exists(path)
+            f = open(path, mode="a", newline="")
+            if new:
+                csv.writer(f).writerow(list(FIELDS))
+            self._files[path] = (f, csv.writer(f))
+        return self._files[path]
+
+    def write(self, events):
+        touched = set()
+        for timestamp, vehicle_id, vehicle_type, image_path, direction in events:
+            f, writer = self._writer(direction)
+            writer.writerow([timestamp.strftime("%Y-%m-%d %H:%M:%S"), vehicle_id, vehicle_type, image_path,
+                             direction])
+            touched.add(f)
+        for f in touched:
+            f.flush()
+
+    def close(self):
+        for f, _ in self._files.values():
+            f.close()
+        self._files = {}
+
+
+class SqliteBackend:
+    def __init__(self, path="vehicle_log.db", table="vehicle_events"):
+        """
+        path:  SQLite database file.
+        table: append-only events table (created if missing).
+        """
+        self.path = path
+        self.table = table
+        self._db = None
+
+    def _connect(self):
+        db = sqlite3.connect(self.path)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(f"CREATE TABLE IF NOT EXISTS {self.table} (timestamp TEXT NOT NULL, vehicle_id INTEGER, "
+                   f"vehicle_type TEXT, image_path TEXT, direction TEXT)")
+        for column in ("timestamp", "vehicle_type", "direction"):
+            db.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_{column} ON {self.table} ({column})")
+        db.commit()
+        return db
+
+    def write(self, events):
+        if self._db is None:
+            self._db = self._connect()
+        rows = [(t.isoformat(sep=" "), int(vid), vtype, path, direction)
+                for t, vid, vtype, path, direction in events]
+        with self._db:  # one transaction per batch
+            self._db.executemany(f"INSERT INTO {self.table} VALUES (?, ?, ?, ?, ?)", rows)
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+COLUMN_DTYPES = {"timestamp": np.dtype("<f8"),  # epoch seconds
+                 "vehicle_id": np.dtype("<i8"),
+                 "vehicle_type": np.dtype("S16"),
+                 "image_path": np.dtype("S256"),
+                 "direction": np.dtype("S4")}
+
+
+class HourlyColumnarBackend:
+    def __init__(self, directory="vehicle_log"):
+        """
+        directory: root of the hourly partitions.
+        """
+        self.directory = directory
+
+    def write(self, events):
+        hours = {}
+        for event in events:
+            epoch = event[0].timestamp()
+            hours.setdefault(int(epoch // 3600) * 3600, []).append((epoch,) + tuple(event[1:]))
+        for hour, rows in hours.items():
+            folder = os.path.join(self.directory, str(hour))
+            os.makedirs(folder, exist_ok=True)
+            for i, name in enumerate(FIELDS):
+                values = [row[i] for row in rows]
+                if COLUMN_DTYPES[name].kind == "S":
+                    values = [str(v).encode() for v in values]
+                with open(os.path.join(folder, name + ".col"), "ab") as f:
+                    f.write(np.array(values, dtype=COLUMN_DTYPES[name]).tobytes())
+
+    def close(self):
+        pass
+
+
+def read_hour(folder):
+    """
+    {column: array} of one hourly partition. Only rows present in every
+    column are returned (a crash can leave a torn tail).
+    """
+    paths = {name: os.path.join(folder, name + ".col") for name in FIELDS}
+    if not all(os.path.exists(p) for p in paths.values()):
+        return {name: np.zeros(0, dtype=COLUMN_DTYPES[name]) for name in FIELDS}
+    n = min(os.path.getsize(p) // COLUMN_DTYPES[name].itemsize for name, p in paths.items())
+    return {name: np.fromfile(p, dtype=COLUMN_DTYPES[name], count=n) for name, p in paths.items()}
+
+
+# --- Sink ---
+class EventSink:
+    def __init__(self, backend, max_queue=10000, batch_size=256, flush_seconds=1.0):
+        """
+        backend:       object with write(events) and close().
+        max_queue:     events waiting for the writer; more are dropped.
+        batch_size:    events per backend write.
+        flush_seconds: longest time an event waits for its batch to fill.
+        """
+        self.backend = backend
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def emit(self, timestamp, vehicle_id, vehicle_type, image_path, direction):
+        """
+        Queue one crossing; never blocks. Returns False if it was dropped.
+        """
+        try:
+            self._queue.put_nowait((timestamp, vehicle_id, vehicle_type, image_path, direction))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def _write(self, batch):
+        try:
+            self.backend.write(batch)
+            with self._lock:
+                self.written += len(batch)
+                self.batches += 1
+        except Exception as e:  # keep the writer alive; the batch is counted as failed
+            with self._lock:
+                self.failed += len(batch)
+                self.last_error = e
+
+    def _run(self):
+        batch, deadline = [], None
+        while True:
+            timeout = self.flush_seconds if not batch else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            stop = item is _STOP
+            if item is not None and not stop:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_seconds
+                # Take whatever else is already waiting, up to a full batch
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stop = True
+                        break
+                    batch.append(item)
+            if batch and (stop or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(batch)
+                batch, deadline = [], None
+            if stop:
+                break
+        self.backend.close()
+
+    def stats(self):
+        with self._lock:
+            return {"queued": self._queue.qsize(), "written": self.written, "dropped": self.dropped,
+                    "failed": self.failed, "batches": self.batches}
+
+    def close(self, timeout=None):
+        """
+        Write everything still queued, then close the backend.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,246 @@
+"""
+Face Embedding Archive
+======================
+Remembers every face the cameras encoded, so a child reported missing
+40 minutes late can be searched for in what the cameras already saw:
+- During normal processing each encoding is appended with its camera ID,
+  timestamp, frame offset and bounding box.
+- Records go to compact, time-partitioned segments: one directory per
+  partition (named by its start time in epoch seconds), one pair of
+  append-only files per camera: `<camera>.enc` (float16 encodings) and
+  `<camera>.meta` (timestamp, frame offset, box).
+- Buffered records are written every `flush_every` records, once the
+  oldest has waited `max_age` seconds, and when a camera moves on to the
+  next partition. Before appending, both files are cut back to the rows
+  they have in common, so a crash between the two writes cannot shift
+  encodings against their metadata.
+- `search` memory-maps only the partitions overlapping the requested time
+  range and scans them in parallel for the nearest matches.
+
+    python face_archive.py --image child.jpg --minutes 60
+"""
+
+import argparse
+import heapq
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from face_gallery import ENCODING_DIM
+
+META_DTYPE = np.dtype([("timestamp", "<f8"), ("frame", "<i8"), ("box", "<i4", 4)])
+ENCODING_DTYPE = np.dtype("<f2")
+ENCODING_ROW_SIZE = ENCODING_DIM * ENCODING_DTYPE.itemsize
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def _valid_rows(enc_path, meta_path):
+    """
+    Rows fully present in both files of a segment.
+    """
+    if not (os.path.exists(enc_path) and os.path.exists(meta_path)):
+        return 0
+    return min(os.path.getsize(enc_path) // ENCODING_ROW_SIZE, os.path.getsize(meta_path) // META_DTYPE.itemsize)
+
+
+class FaceArchive:
+    def __init__(self, directory="face_archive", partition_seconds=3600, flush_every=256, max_age=30.0):
+        """
+        partition_seconds: time span of one on-disk partition.
+        flush_every:       buffered records per camera before they are written.
+        max_age:           seconds a record may stay buffered before it is written.
+        """
+        self.directory = directory
+        self.partition_seconds = partition_seconds
+        self.flush_every = flush_every
+        self.max_age = max_age
+        self._buffers = {}  # (partition, camera) -> list of (meta, encoding)
+        self._since = {}  # (partition, camera) -> monotonic time of its oldest buffered record
+        os.makedirs(directory, exist_ok=True)
+
+    def _partition(self, timestamp):
+        return int(timestamp // self.partition_seconds) * self.partition_seconds
+
+    def _segment_paths(self, partition, camera_id):
+        folder = os.path.join(self.directory, str(partition))
+        name = _SAFE_NAME.sub("_", str(camera_id))
+        return os.path.join(folder, name + ".enc"), os.path.join(folder, name + ".meta")
+
+    # --- Writing ---
+    def append(self, camera_id, timestamp, frame_offset, box, encoding):
+        """
+        Archive one face encoding. `box` is (top, right, bottom, left).
+        """
+        key = (self._partition(timestamp), camera_id)
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            # A camera moving on to a new partition closes its previous one
+            for old in [k for k in self._buffers if k[1] == camera_id and k[0] < key[0]]:
+                self._flush(old)
+            buffer = self._buffers[key] = []
+            self._since[key] = time.monotonic()
+        buffer.append(((timestamp, frame_offset, box), np.asarray(encoding, dtype=ENCODING_DTYPE)))
+        if len(buffer) >= self.flush_every:
+            self._flush(key)
+        self.flush_stale()
+
+    def flush_stale(self):
+        """
+        Write the buffers whose oldest record has waited `max_age` seconds.
+        Called on every append; a processing loop should also call it while
+        no faces are seen, so a quiet camera's records still reach disk.
+        """
+        now = time.monotonic()
+        for key in [k for k, since in self._since.items() if now - since >= self.max_age]:
+            self._flush(key)
+
+    def _flush(self, key):
+        self._since.pop(key, None)
+        buffer = self._buffers.pop(key, None)
+        if not buffer:
+            return
+        enc_path, meta_path = self._segment_paths(*key)
+        os.makedirs(os.path.dirname(enc_path), exist_ok=True)
+        meta = np.array([m for m, _ in buffer], dtype=META_DTYPE)
+        encodings = np.stack([e for _, e in buffer])
+        # Drop the rows an earlier crash left in only one file (or half
+        # written), or every record appended after them would be misaligned
+        n = _valid_rows(enc_path, meta_path)
+        for path, row_size in ((enc_path, ENCODING_ROW_SIZE), (meta_path, META_DTYPE.itemsize)):
+            if os.path.exists(path) and os.path.getsize(path) != n * row_size:
+                os.truncate(path, n * row_size)
+        with open(enc_path, "ab") as f:
+            f.write(encodings.tobytes())
+        with open(meta_path, "ab") as f:
+            f.write(meta.tobytes())
+
+    def flush(self):
+        for key in list(self._buffers):
+            self._flush(key)
+
+    def close(self):
+        self.flush()
+
+    # --- Searching ---
+    def partitions(self, start, end):
+        """
+        Partition directories overlapping [start, end] (epoch seconds).
+        """
+        first, last = self._partition(start), self._partition(end)
+        found = []
+        for name in os.listdir(self.directory):
+            if name.isdigit() and first <= int(name) <= last:
+                found.append(os.path.join(self.directory, name))
+        return sorted(found)
+
+    @staticmethod
+    def _open_segment(enc_path):
+        meta_path = enc_path[:-len(".enc")] + ".meta"
+        if not os.path.exists(meta_path):
+            return None, None
+        # Only rows fully present in both files are valid (crash-torn tails are skipped)
+        n = _valid_rows(enc_path, meta_path)
+        if n == 0:
+            return None, None
+        encodings = np.memmap(enc_path, dtype=ENCODING_DTYPE, mode="r", shape=(n, ENCODING_DIM))
+        meta = np.memmap(meta_path, dtype=META_DTYPE, mode="r", shape=(n,))
+        return encodings, meta
+
+    def _search_segment(self, enc_path, queries, q_sq, start, end, k, chunk):
+        encodings, meta = self._open_segment(enc_path)
+        if encodings is None:
+            return []
+        camera_id = os.path.basename(enc_path)[:-len(".enc")]
+        in_range = np.nonzero((meta["timestamp"] >= start) & (meta["timestamp"] <= end))[0]
+        hits = [[] for _ in queries]  # kept per query, so one query cannot crowd out another
+        for lo in range(0, len(in_range), chunk):
+            rows = in_range[lo:lo + chunk]
+            # Rows are sorted, so this reads the segment sequentially
+            block = np.asarray(encodings[rows[0]:rows[-1] + 1], dtype=np.float32)[rows - rows[0]]
+            d = q_sq[:, None] + np.einsum("ij,ij->i", block, block)[None, :] - 2.0 * (queries @ block.T)
+            kk = min(k, d.shape[1])
+            best = np.argpartition(d, kk - 1, axis=1)[:, :kk]
+            for qi in range(len(queries)):
+                hits[qi].extend((float(d[qi, j]), int(rows[j])) for j in best[qi])
+        # Resolve metadata only for each query's survivors
+        return [(sq, qi, camera_id, meta[row])
+                for qi, query_hits in enumerate(hits) for sq, row in heapq.nsmallest(k, query_hits)]
+
+    def search(self, encodings, start, end, k=10, max_distance=None, cameras=None,
+               workers=None, chunk=65536):
+        """
+        Nearest archived faces to each query encoding within [start, end].
+        Returns one list of hits per query, sorted by distance; each hit is
+        a dict with camera_id, timestamp, frame, box and distance.
+        """
+        self.flush()
+        queries = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        q_sq = np.einsum("ij,ij->i", queries, queries)
+        segments = []
+        for folder in self.partitions(start, end):
+            for name in sorted(os.listdir(folder)):
+                camera = name[:-len(".enc")]
+                if name.endswith(".enc") and (cameras is None or camera in cameras):
+                    segments.append(os.path.join(folder, name))
+
+        # NumPy releases the GIL in the distance GEMMs, so segments scan in parallel
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            parts = pool.map(lambda p: self._search_segment(p, queries, q_sq, start, end, k, chunk), segments)
+            found = [[] for _ in queries]
+            for part in parts:
+                for sq, qi, camera_id, meta in part:
+                    found[qi].append((sq, camera_id, meta))
+
+        results = []
+        for hits in found:
+            hits.sort(key=lambda h: h[0])
+            out = []
+            for sq, camera_id, meta in hits[:k]:
+                distance = float(np.sqrt(max(sq, 0.0)))
+                if max_distance is not None and distance > max_distance:
+                    break
+                out.append({"camera_id": camera_id, "timestamp": float(meta["timestamp"]),
+                            "frame": int(meta["frame"]), "box": tuple(int(v) for v in meta["box"]),
+                            "distance": distance})
+            results.append(out)
+        return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Search archived face embeddings")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--image", type=str, help="Photo of the person to look for")
+    group.add_argument("--person-id", type=str, help="Person already registered in the gallery")
+    parser.add_argument("--archive", type=str, default="face_archive", help="Archive directory")
+    parser.add_argument("--gallery", type=str, default="face_gallery", help="Gallery directory (--person-id)")
+    parser.add_argument("--minutes", type=float, default=60, help="Search this far back from now")
+    parser.add_argument("--k", type=int, default=20, help="Matches to report")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Maximum face distance")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.image:
+        import face_recognition
+        image = face_recognition.load_image_file(args.image)
+        query = face_recognition.face_encodings(image)[:1]
+    else:
+        from face_gallery import FaceGallery
+        query = FaceGallery(args.gallery).encodings_for(args.person_id)
+    if len(query) == 0:
+        raise SystemExit("No face encoding to search for.")
+
+    now = time.time()
+    archive = FaceArchive(args.archive)
+    start = time.perf_counter()
+    hits = archive.search(query, now - args.minutes * 60, now, k=args.k, max_distance=args.tolerance)
+    merged = sorted((h for per_query in hits for h in per_query), key=lambda h: h["distance"])[:args.k]
+    print(f"Searched the last {args.minutes:g} minutes in {time.perf_counter() - start:.2f}s")
+    for hit in merged:
+        seen = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(hit["timestamp"]))
+        print(f"{seen}  camera {hit['camera_id']}  frame {hit['frame']}  "
+              f"box {hit['box']}  distance {hit['distance']:.3f}")
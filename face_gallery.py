@@ -0,0 +1,464 @@
+"""
+Face Gallery
+============
+Registry of every missing person's face encoding:
+- All encodings live in one contiguous float32 matrix (`encodings.npy`),
+  memory-mapped from disk so large galleries load instantly.
+- A side table (`people.json`) holds the person ID and metadata per row.
+- Every face in a frame is matched against the whole gallery with one
+  batched distance computation that returns the top-k candidates.
+- An optional approximate index (`face_index.IVFIndex`) sits behind the
+  same `match` call for very large registries.
+
+Updates are incremental and crash-safe:
+- Registrations and "found" tombstones are appended to a checksummed
+  journal next to the snapshot (O(1) amortized) and replayed on open.
+  Other processes pick up new records with `refresh()`.
+- Writes hold an exclusive lock on `<directory>/LOCK` and first replay
+  whatever other writers appended, so only a torn tail is ever cut off.
+- `compact()` folds the journal into a new snapshot directory and swaps
+  the `CURRENT` pointer atomically, so a crash at any point leaves either
+  the old or the new snapshot intact and readers never see a partial one.
+Any number of processes can read and write the same gallery at once.
+
+    <directory>/CURRENT                  -> "snapshot-000004"
+    <directory>/snapshot-000004/encodings.npy, people.json, index.npz, journal.log
+"""
+
+import contextlib
+import json
+import os
+import shutil
+import struct
+import zlib
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from face_index import IVFIndex
+
+ENCODING_DIM = 128  # face_recognition / dlib embedding size
+
+SNAPSHOT_PREFIX = "snapshot-"
+_RECORD_HEADER = struct.Struct("<II")  # payload length, crc32 of payload
+
+
+def _fsync_dir(path):
+    # Make renames durable; not supported on Windows, where it is a no-op.
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _lock_file(f, lock=True):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX if lock else fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if lock else msvcrt.LK_UNLCK, 1)
+
+
+def _encode_record(record, encoding=None):
+    payload = json.dumps(record).encode()
+    if encoding is not None:
+        # JSON never contains a raw NUL byte, so it separates the encoding bytes
+        payload += b"\0" + np.asarray(encoding, dtype=np.float32).tobytes()
+    return _RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _read_records(path, offset):
+    """
+    Yield (record, encoding, end_offset) for every complete, valid journal
+    record after `offset`. Stops at the first torn or corrupt record.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            header = f.read(_RECORD_HEADER.size)
+            if len(header) < _RECORD_HEADER.size:
+                return
+            length, crc = _RECORD_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return
+            offset += _RECORD_HEADER.size + length
+            text, _, raw = payload.partition(b"\0")
+            encoding = np.frombuffer(raw, dtype=np.float32) if raw else None
+            yield json.loads(text), encoding, offset
+
+
+class FaceGallery:
+    def __init__(self, directory="face_gallery", durable=True, auto_compact=True,
+                 compact_min_records=1024, compact_ratio=0.25):
+        """
+        Open (or create) the gallery stored in `directory`.
+        durable:      fsync the journal after every write.
+        auto_compact: compact once the journal holds more than
+                      max(compact_min_records, compact_ratio * snapshot size) records.
+        """
+        self.directory = directory
+        self.current_path = os.path.join(directory, "CURRENT")
+        self.durable = durable
+        self.auto_compact = auto_compact
+        self.compact_min_records = compact_min_records
+        self.compact_ratio = compact_ratio
+        self._locked = False
+        os.makedirs(directory, exist_ok=True)
+        self._migrate_legacy()
+        self.load()
+
+    # --- Snapshot / journal state ---
+    def _snapshot_dir(self, generation):
+        return os.path.join(self.directory, f"{SNAPSHOT_PREFIX}{generation:06d}")
+
+    @property
+    def snapshot_dir(self):
+        return self._snapshot_dir(self.generation)
+
+    @property
+    def journal_path(self):
+        return os.path.join(self.snapshot_dir, "journal.log")
+
+    @property
+    def index_path(self):
+        return os.path.join(self.snapshot_dir, "index.npz")
+
+    def _read_current(self):
+        if not os.path.exists(self.current_path):
+            return None
+        with open(self.current_path) as f:
+            return int(f.read().strip()[len(SNAPSHOT_PREFIX):])
+
+    def _migrate_legacy(self):
+        # Galleries written before the journal existed kept their files at the top level
+        legacy = os.path.join(self.directory, "encodings.npy")
+        if os.path.exists(legacy) and self._read_current() is None:
+            with open(os.path.join(self.directory, "people.json")) as f:
+                people = json.load(f)
+            self._write_snapshot(0, np.load(legacy), people)
+            for name in ("encodings.npy", "people.json", "index.npz"):
+                path = os.path.join(self.directory, name)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def __len__(self):
+        return self._n_base + self._n_delta - self._n_dead
+
+    @property
+    def size(self):
+        """
+        Rows in the current view, including tombstoned ones.
+        """
+        return self._n_base + self._n_delta
+
+    @property
+    def people(self):
+        """
+        Side-table entries of everyone still registered (not found).
+        """
+        return [p for row, p in enumerate(self._people) if not self._dead[row]]
+
+    def person(self, row):
+        """
+        Side-table entry (person ID + metadata) for a gallery row.
+        Rows are stable until the next compaction.
+        """
+        return self._people[row]
+
+    def encodings_for(self, person_id):
+        """
+        All live encodings registered under person_id, as an (n, 128) array.
+        """
+        rows = [r for r in self._rows_by_person.get(person_id, []) if not self._dead[r]]
+        return np.array([self.encodings[r] if r < self._n_base else self._delta[r - self._n_base]
+                         for r in rows], dtype=np.float32).reshape(-1, ENCODING_DIM)
+
+    def load(self):
+        """
+        Memory-map the current snapshot and replay its journal.
+        """
+        self.generation = self._read_current()
+        if self.generation is None:
+            self._write_snapshot(0, np.zeros((0, ENCODING_DIM), np.float32), [])
+            self.generation = 0
+
+        snapshot = self.snapshot_dir
+        self.encodings = np.load(os.path.join(snapshot, "encodings.npy"), mmap_mode="r")
+        with open(os.path.join(snapshot, "people.json")) as f:
+            base_people = json.load(f)
+        if len(base_people) != len(self.encodings):
+            raise ValueError(f"Gallery is corrupt: {len(self.encodings)} encodings "
+                             f"but {len(base_people)} people in {snapshot}")
+        # Squared norms are reused by every match call
+        self._base_sq = np.einsum("ij,ij->i", self.encodings, self.encodings)
+        self._n_base = len(self.encodings)
+
+        self.index = None
+        if os.path.exists(self.index_path):
+            index = IVFIndex.load(self.index_path)
+            if len(index) == self._n_base:
+                self.index = index
+            else:
+                print(f"Ignoring stale face index in {snapshot}; rebuild it with build_index().")
+
+        # Journal-backed delta, grown by doubling so appends are O(1) amortized
+        self._people = list(base_people)
+        self._delta = np.zeros((0, ENCODING_DIM), dtype=np.float32)
+        self._delta_sq = np.zeros(0, dtype=np.float32)
+        self._n_delta = 0
+        self._dead = np.zeros(self._n_base, dtype=bool)
+        self._n_dead = 0
+        self._n_dead_base = 0
+        self._rows_by_person = {}
+        for row, p in enumerate(base_people):
+            self._rows_by_person.setdefault(p["person_id"], []).append(row)
+        self._journal_offset = 0
+        self._journal_records = 0
+        self._replay_journal()
+
+    def refresh(self):
+        """
+        Catch up with another process's writes: tail the journal, or reload
+        if a compaction swapped in a new snapshot. Cheap when nothing changed.
+        """
+        if self._read_current() != self.generation:
+            self.load()
+        else:
+            self._replay_journal()
+
+    def _replay_journal(self):
+        for record, encoding, offset in _read_records(self.journal_path, self._journal_offset):
+            self._apply(record, encoding)
+            self._journal_offset = offset
+            self._journal_records += 1
+
+    def _apply(self, record, encoding):
+        if record["op"] == "add":
+            if self._n_delta == len(self._delta):
+                capacity = max(64, 2 * len(self._delta))
+                self._delta = np.resize(self._delta, (capacity, ENCODING_DIM))
+                self._delta_sq = np.resize(self._delta_sq, capacity)
+            if self.size == len(self._dead):
+                self._dead = np.concatenate([self._dead, np.zeros(max(64, len(self._dead)), bool)])
+            row = self.size
+            self._delta[self._n_delta] = encoding
+            self._delta_sq[self._n_delta] = encoding @ encoding
+            self._people.append(record["person"])
+            self._rows_by_person.setdefault(record["person"]["person_id"], []).append(row)
+            self._n_delta += 1
+        elif record["op"] == "remove":
+            for row in self._rows_by_person.pop(record["person_id"], []):
+                if not self._dead[row]:
+                    self._dead[row] = True
+                    self._n_dead += 1
+                    self._n_dead_base += row < self._n_base
+
+    @contextlib.contextmanager
+    def _write_lock(self):
+        """
+        Exclusive across processes (and re-entrant within this gallery):
+        held for every journal append, compaction and save.
+        """
+        if self._locked:
+            yield
+            return
+        with open(os.path.join(self.directory, "LOCK"), "a+b") as f:
+            _lock_file(f)
+            self._locked = True
+            try:
+                yield
+            finally:
+                self._locked = False
+                _lock_file(f, lock=False)
+
+    def _append(self, entries):
+        data = b"".join(_encode_record(record, encoding) for record, encoding in entries)
+        with self._write_lock():
+            # Catch up with other writers first: afterwards anything past the
+            # offset is a torn tail left by a crash, never a committed record
+            self.refresh()
+            with open(self.journal_path, "ab") as f:
+                if f.tell() != self._journal_offset:
+                    f.truncate(self._journal_offset)
+                f.write(data)
+                f.flush()
+                if self.durable:
+                    os.fsync(f.fileno())
+            for record, encoding in entries:
+                self._apply(record, encoding)
+                self._journal_records += 1
+            self._journal_offset += len(data)
+            if self.auto_compact and self._journal_records > max(self.compact_min_records,
+                                                                 self.compact_ratio * self._n_base):
+                self.compact()
+
+    # --- Writing ---
+    def _write_snapshot(self, generation, encodings, people, index=None):
+        final = self._snapshot_dir(generation)
+        tmp = final + ".tmp"
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp)
+        os.makedirs(tmp)
+        with open(os.path.join(tmp, "encodings.npy"), "wb") as f:
+            np.save(f, np.ascontiguousarray(encodings, dtype=np.float32))
+            f.flush()
+            os.fsync(f.fileno())
+        with open(os.path.join(tmp, "people.json"), "w") as f:
+            json.dump(people, f)
+            f.flush()
+            os.fsync(f.fileno())
+        if index is not None:
+            index.save(os.path.join(tmp, "index.npz"))
+        open(os.path.join(tmp, "journal.log"), "wb").close()
+        _fsync_dir(tmp)
+        if os.path.exists(final):
+            shutil.rmtree(final)
+        os.rename(tmp, final)
+
+        # Atomically point readers at the new snapshot
+        current_tmp = self.current_path + ".tmp"
+        with open(current_tmp, "w") as f:
+            f.write(os.path.basename(final))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(current_tmp, self.current_path)
+        _fsync_dir(self.directory)
+        self._remove_old_snapshots(generation)
+
+    def _remove_old_snapshots(self, keep):
+        for name in os.listdir(self.directory):
+            if name.startswith(SNAPSHOT_PREFIX) and name != os.path.basename(self._snapshot_dir(keep)):
+                # Readers may still have the old files mapped (Windows refuses
+                # to delete them); they are retried on the next compaction.
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    def save(self, encodings, people):
+        """
+        Replace the gallery contents with `encodings` (N x 128) and `people`.
+        """
+        encodings = np.ascontiguousarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        if len(encodings) != len(people):
+            raise ValueError("Need exactly one people entry per encoding")
+        with self._write_lock():
+            self._write_snapshot(self._read_current() + 1, encodings, people)
+            self.load()
+
+    def compact(self):
+        """
+        Fold the journal into a new snapshot without the tombstoned rows.
+        The approximate index, if any, is rebuilt with its trained quantizers.
+        """
+        with self._write_lock():
+            self.refresh()
+            live = ~self._dead[:self.size]
+            encodings = np.vstack([self.encodings[live[:self._n_base]],
+                                   self._delta[:self._n_delta][live[self._n_base:]]])
+            people = [p for row, p in enumerate(self._people) if live[row]]
+            index = self.index.empty_like().add(encodings) if self.index is not None else None
+            self._write_snapshot(self.generation + 1, encodings, people, index)
+            self.load()
+
+    def add(self, person_id, encoding, **metadata):
+        """
+        Register one person. Appends to the journal.
+        """
+        return self.add_many([person_id], [encoding], [metadata])[0]
+
+    def add_many(self, person_ids, encodings, metadata=None):
+        """
+        Register several people with a single journal write.
+        Returns their gallery rows (valid until the next compaction).
+        """
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        metadata = metadata or [{} for _ in person_ids]
+        self._append([({"op": "add", "person": dict(meta, person_id=pid)}, enc)
+                      for pid, enc, meta in zip(person_ids, encodings, metadata)])
+        # New rows are always the last ones, even after an auto-compaction
+        return list(range(self.size - len(person_ids), self.size))
+
+    def remove(self, person_id):
+        """
+        Mark a person as found: tombstones every row registered under person_id.
+        """
+        self._append([({"op": "remove", "person_id": person_id}, None)])
+
+    def build_index(self, **params):
+        """
+        Compact, then train and save an approximate index over the gallery.
+        Parameters are passed to `face_index.IVFIndex`.
+        """
+        # One lock for all three steps, so the index always describes the
+        # snapshot it is saved in
+        with self._write_lock():
+            self.refresh()
+            if self._journal_records:
+                self.compact()
+            index = IVFIndex(**params).train(self.encodings).add(self.encodings)
+            # Readers never map a half-written index
+            tmp = self.index_path[:-len(".npz")] + ".tmp.npz"
+            index.save(tmp)
+            os.replace(tmp, self.index_path)
+            self.index = index
+        return index
+
+    # --- Matching ---
+    def match(self, face_encodings, k=1, nprobe=None, exact=False):
+        """
+        Match every face encoding against the whole gallery.
+        Returns (rows, distances), both of shape (num_faces, k), sorted by
+        Euclidean distance. k is capped at the number of registered people.
+        When an index is built the search is approximate: `nprobe` overrides
+        its recall/speed knob, unfilled slots have row -1 and distance inf.
+        `exact=True` forces the brute-force scan.
+        """
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        # Take one consistent view; appends only ever write past n_delta
+        base, base_sq, index = self.encodings, self._base_sq, self.index
+        n_base, n_delta, dead = self._n_base, self._n_delta, self._dead
+        delta, delta_sq = self._delta[:n_delta], self._delta_sq[:n_delta]
+        k = min(k, len(self))
+        if k == 0 or len(queries) == 0:
+            return (np.zeros((len(queries), 0), dtype=np.int64),
+                    np.zeros((len(queries), 0), dtype=np.float32))
+
+        # ||q - g||^2 = ||q||^2 + ||g||^2 - 2 q.g, one GEMM for all pairs
+        q_sq = np.einsum("ij,ij->i", queries, queries)
+        delta_d = q_sq[:, None] + delta_sq[None, :] - 2.0 * (queries @ delta.T)
+        if index is not None and not exact:
+            # Ask for extra candidates so tombstoned rows can be dropped
+            rows, dist = index.search(queries, min(k + self._n_dead_base, n_base), base, base_sq, nprobe=nprobe)
+            sq_dist = np.where(rows >= 0, dist.astype(np.float32) ** 2, np.inf)
+            cand = np.hstack([rows, np.broadcast_to(np.arange(n_base, n_base + n_delta), delta_d.shape)])
+            sq_dist = np.hstack([sq_dist, delta_d])
+        else:
+            base_d = q_sq[:, None] + base_sq[None, :] - 2.0 * (queries @ base.T)
+            sq_dist = np.hstack([base_d, delta_d])
+            cand = np.broadcast_to(np.arange(n_base + n_delta), sq_dist.shape)
+        np.maximum(sq_dist, 0, out=sq_dist)
+        sq_dist[(cand >= 0) & dead[np.maximum(cand, 0)]] = np.inf
+
+        if k < sq_dist.shape[1]:
+            top = np.argpartition(sq_dist, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(sq_dist.shape[1]), sq_dist.shape)
+        top_d = np.take_along_axis(sq_dist, top, axis=1)
+        order = np.argsort(top_d, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        rows = np.take_along_axis(cand, top, axis=1).astype(np.int64)
+        distances = np.sqrt(np.take_along_axis(top_d, order, axis=1))
+        rows[~np.isfinite(distances)] = -1
+        return rows, distances
@@ -0,0 +1,258 @@
+"""
+Approximate Face Index
+======================
+Pure NumPy inverted-file (IVF) index for 128-d face encodings:
+- k-means centroids split the gallery into `nlist` inverted lists.
+- A query only scans the `nprobe` lists with the nearest centroids;
+  `nprobe` is the recall/speed knob (nprobe = nlist is exact search).
+- Optional product quantization (PQ) stores each encoding as `pq_m`
+  one-byte codes of its residual, scanned with per-query lookup tables,
+  followed by an exact re-rank of the best candidates.
+"""
+
+import numpy as np
+
+
+def squared_distances(a, b, b_sq=None):
+    """
+    Pairwise squared Euclidean distances between rows of a and rows of b.
+    """
+    a_sq = np.einsum("ij,ij->i", a, a)
+    if b_sq is None:
+        b_sq = np.einsum("ij,ij->i", b, b)
+    d = a_sq[:, None] + b_sq[None, :] - 2.0 * (a @ b.T)
+    return np.maximum(d, 0, out=d)
+
+
+def nearest_centroid(vectors, centroids, chunk=65536):
+    """
+    Index of the nearest centroid for every vector, in bounded-memory chunks.
+    """
+    c_sq = np.einsum("ij,ij->i", centroids, centroids)
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk):
+        block = np.asarray(vectors[start:start + chunk], dtype=np.float32)
+        labels[start:start + chunk] = squared_distances(block, centroids, c_sq).argmin(axis=1)
+    return labels
+
+
+def kmeans(vectors, k, iterations=20, max_samples=None, seed=0):
+    """
+    Lloyd's k-means on (a sample of) vectors. Returns a (k, dim) float32 array.
+    """
+    rng = np.random.default_rng(seed)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if max_samples is not None and len(vectors) > max_samples:
+        vectors = vectors[np.sort(rng.choice(len(vectors), max_samples, replace=False))]
+    k = min(k, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = nearest_centroid(vectors, centroids)
+        counts = np.bincount(labels, minlength=k).astype(np.float32)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        # Re-seed empty clusters from random points
+        if empty.any():
+            centroids[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+    return centroids
+
+
+class IVFIndex:
+    def __init__(self, nlist=256, nprobe=8, pq_m=0, rerank=4, seed=0):
+        """
+        nlist:  number of inverted lists (k-means centroids).
+        nprobe: lists scanned per query; higher = better recall, slower.
+        pq_m:   PQ sub-vectors per encoding (0 disables PQ; must divide 128).
+        rerank: with PQ, exactly re-rank the best `rerank * k` candidates.
+        """
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.pq_m = pq_m
+        self.rerank = rerank
+        self.seed = seed
+
+        self.centroids = None
+        self.codebooks = None  # (pq_m, codes, dim / pq_m); codes <= 256, fewer on small training sets
+        self.list_tables = None  # (nlist, pq_m, codes) query-independent ADC terms
+
+        # Inverted lists, stored contiguously in list order: entries of list c
+        # are [offsets[c], offsets[c + 1]); `rows` maps them to gallery rows.
+        self.rows = np.zeros(0, dtype=np.int64)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.list_labels = np.zeros(0, dtype=np.int32)
+        self.list_vectors = None  # IVF-Flat: full encodings
+        self.list_sq = None
+        self.list_codes = None    # IVF-PQ: one byte per sub-vector
+
+    def __len__(self):
+        return len(self.rows)
+
+    # --- Building ---
+    def train(self, vectors):
+        """
+        Learn the coarse centroids (and PQ codebooks) from vectors.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.centroids = kmeans(vectors, self.nlist, max_samples=256 * self.nlist, seed=self.seed)
+        self.nlist = len(self.centroids)
+        if self.pq_m:
+            dim = vectors.shape[1]
+            if dim % self.pq_m:
+                raise ValueError(f"pq_m={self.pq_m} must divide the encoding size {dim}")
+            residuals = vectors - self.centroids[nearest_centroid(vectors, self.centroids)]
+            sub = dim // self.pq_m
+            self.codebooks = np.stack([
+                kmeans(residuals[:, m * sub:(m + 1) * sub], 256, iterations=10,
+                       max_samples=256 * 64, seed=self.seed + m)
+                for m in range(self.pq_m)
+            ])
+            self._build_list_tables()
+        return self
+
+    def _build_list_tables(self):
+        # ||q - c - b||^2 = ||q - c||^2 + (2 c.b + ||b||^2) - 2 q.b per sub-vector;
+        # the middle term only depends on the list and the code.
+        sub = self.codebooks.shape[2]
+        centroids = self.centroids.reshape(self.nlist, self.pq_m, sub)
+        self.list_tables = (2.0 * np.einsum("cms,mjs->cmj", centroids, self.codebooks)
+                            + np.einsum("mjs,mjs->mj", self.codebooks, self.codebooks)[None])
+
+    def empty_like(self):
+        """
+        New empty index sharing this one's trained centroids and codebooks.
+        """
+        index = IVFIndex(self.nlist, self.nprobe, self.pq_m, self.rerank, self.seed)
+        index.centroids = self.centroids
+        index.codebooks = self.codebooks
+        index.list_tables = self.list_tables
+        return index
+
+    def add(self, vectors):
+        """
+        Append vectors; their gallery rows continue from the current size.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        labels = nearest_centroid(vectors, self.centroids)
+        rows = np.arange(len(self), len(self) + len(vectors))
+
+        # Merge the new entries into the list-ordered arrays with one stable sort
+        all_labels = np.concatenate([self.list_labels, labels])
+        perm = np.argsort(all_labels, kind="stable")
+        self.list_labels = all_labels[perm]
+        self.rows = np.concatenate([self.rows, rows])[perm]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(all_labels, minlength=self.nlist))])
+        if self.pq_m:
+            codes = self._encode(vectors - self.centroids[labels])
+            if self.list_codes is not None:
+                codes = np.vstack([self.list_codes, codes])
+            self.list_codes = codes[perm]
+        else:
+            if self.list_vectors is not None:
+                vectors = np.vstack([self.list_vectors, vectors])
+            self.list_vectors = vectors[perm]
+            self.list_sq = np.einsum("ij,ij->i", self.list_vectors, self.list_vectors)
+        return self
+
+    def _encode(self, residuals):
+        sub = residuals.shape[1] // self.pq_m
+        codes = np.empty((len(residuals), self.pq_m), dtype=np.uint8)
+        for m in range(self.pq_m):
+            codes[:, m] = nearest_centroid(residuals[:, m * sub:(m + 1) * sub], self.codebooks[m])
+        return codes
+
+    # --- Searching ---
+    def search(self, queries, k, vectors=None, vector_sq_norms=None, nprobe=None):
+        """
+        Approximate top-k search. `vectors` / `vector_sq_norms` are the full
+        gallery encodings and their squared norms, used to re-rank PQ results.
+        Returns (rows, distances) of shape (num_queries, k), padded with -1/inf.
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        rows = np.full((len(queries), k), -1, dtype=np.int64)
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        if len(queries) == 0 or len(self) == 0:
+            return rows, distances
+
+        coarse = squared_distances(queries, self.centroids)
+        probes = np.argpartition(coarse, nprobe - 1, axis=1)[:, :nprobe]
+        if self.pq_m:
+            sub = self.codebooks.shape[2]
+            query_tables = -2.0 * np.einsum("qms,mjs->qmj",
+                                            queries.reshape(len(queries), self.pq_m, sub), self.codebooks)
+
+        # List-major scan: each probed list is read once, contiguously, for
+        # all the queries that probe it.
+        cand_rows = [[] for _ in queries]
+        cand_dist = [[] for _ in queries]
+        for c in np.unique(probes):
+            start, end = self.offsets[c], self.offsets[c + 1]
+            if start == end:
+                continue
+            qs = np.nonzero((probes == c).any(axis=1))[0]
+            if self.pq_m:
+                d = self._adc_distances(query_tables[qs], coarse[qs, c], c, start, end)
+            else:
+                d = squared_distances(queries[qs], self.list_vectors[start:end], self.list_sq[start:end])
+            for j, qi in enumerate(qs):
+                cand_rows[qi].append(self.rows[start:end])
+                cand_dist[qi].append(d[j])
+
+        for qi, query in enumerate(queries):
+            if not cand_rows[qi]:
+                continue
+            cand = np.concatenate(cand_rows[qi])
+            cand_d = np.concatenate(cand_dist[qi])
+            if self.pq_m and vectors is not None and self.rerank:
+                keep = min(len(cand), self.rerank * k)
+                cand = np.sort(cand[np.argpartition(cand_d, keep - 1)[:keep]])  # sequential memmap reads
+                sq = vector_sq_norms[cand] if vector_sq_norms is not None else None
+                cand_d = squared_distances(query[None, :], np.asarray(vectors[cand], dtype=np.float32), sq)[0]
+
+            kk = min(k, len(cand))
+            best = np.argpartition(cand_d, kk - 1)[:kk]
+            best = best[np.argsort(cand_d[best])]
+            rows[qi, :kk] = cand[best]
+            # ADC sums can round below zero when a code reproduces its vector exactly
+            distances[qi, :kk] = np.sqrt(np.maximum(cand_d[best], 0))
+        return rows, distances
+
+    def _adc_distances(self, query_tables, coarse, c, start, end):
+        # Asymmetric distance: per-query and per-list lookup tables summed
+        # over the list's codes, plus the query's distance to the centroid.
+        tables = (query_tables + self.list_tables[c][None]).reshape(len(query_tables), -1)
+        # Tables are flattened with a stride of the codebook size, which k-means
+        # caps at the number of training vectors
+        stride = self.codebooks.shape[1]
+        flat_codes = self.list_codes[start:end] + (np.arange(self.pq_m) * stride)[None, :]
+        return tables[:, flat_codes].sum(axis=2) + coarse[:, None]
+
+    # --- Persistence ---
+    def save(self, path):
+        empty = np.zeros(0, np.float32)
+        np.savez(path, nlist=self.nlist, nprobe=self.nprobe, pq_m=self.pq_m, rerank=self.rerank,
+                 seed=self.seed, centroids=self.centroids, rows=self.rows, offsets=self.offsets,
+                 list_labels=self.list_labels,
+                 codebooks=self.codebooks if self.pq_m else empty,
+                 list_codes=self.list_codes if self.pq_m else empty,
+                 list_vectors=empty if self.pq_m else self.list_vectors)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        index = cls(nlist=int(data["nlist"]), nprobe=int(data["nprobe"]), pq_m=int(data["pq_m"]),
+                    rerank=int(data["rerank"]), seed=int(data["seed"]))
+        index.centroids = data["centroids"]
+        index.rows = data["rows"]
+        index.offsets = data["offsets"]
+        index.list_labels = data["list_labels"]
+        if index.pq_m:
+            index.codebooks = data["codebooks"]
+            index.list_codes = data["list_codes"]
+            index._build_list_tables()
+        else:
+            index.list_vectors = data["list_vectors"]
+            index.list_sq = np.einsum("ij,ij->i", index.list_vectors, index.list_vectors)
+        return index
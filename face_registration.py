@@ -0,0 +1,197 @@
+"""
+Bulk Face Registration
+======================
+Registers a folder of help-desk photos into the face gallery:
+- Image decoding and face encoding fan out across a process pool.
+- Encodings are cached by the SHA-256 of the image bytes, one cache per
+  (detector model, max side) setting, so re-submitted or duplicate photos
+  are never encoded twice with the same settings.
+- Photos with no face or several faces are reported per file (and cached);
+  photos that fail with an error are reported but retried on the next run.
+- The person ID is the file name without extension (or its folder name).
+
+    python face_registration.py uploads/ --workers 8
+"""
+
+import argparse
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import cv2
+import face_recognition
+import numpy as np
+
+from face_gallery import FaceGallery
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def encode_photo(path, max_side=1600, model="hog"):
+    """
+    Worker: decode one photo and encode its single face.
+    Returns (encoding or None, error message or None).
+    """
+    image = face_recognition.load_image_file(path)
+    scale = max_side / max(image.shape[:2])
+    if scale < 1:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    locations = face_recognition.face_locations(image, model=model)
+    if not locations:
+        return None, "no face found"
+    if len(locations) > 1:
+        return None, f"{len(locations)} faces found"
+    return face_recognition.face_encodings(image, locations)[0].astype(np.float32), None
+
+
+def _encode_job(job):
+    """
+    Returns (encoding, error, cacheable): detection results are cached,
+    failures (corrupt file, out of memory, GPU errors) are not.
+    """
+    path, max_side, model = job
+    try:
+        return encode_photo(path, max_side, model) + (True,)
+    except Exception as e:
+        return None, f"error: {e}", False
+
+
+class EncodingCache:
+    """
+    Content-addressed cache: <dir>/<hash[:2]>/<hash>.npy for encodings,
+    <hash>.err for photos with no usable face. Use one directory per
+    encoding setting (see cache_directory).
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, digest, ext):
+        return os.path.join(self.directory, digest[:2], digest + ext)
+
+    def get(self, digest):
+        """
+        Returns (hit, encoding, error).
+        """
+        npy = self._path(digest, ".npy")
+        if os.path.exists(npy):
+            return True, np.load(npy), None
+        err = self._path(digest, ".err")
+        if os.path.exists(err):
+            with open(err) as f:
+                return True, None, f.read()
+        return False, None, None
+
+    def put(self, digest, encoding, error):
+        os.makedirs(os.path.dirname(self._path(digest, "")), exist_ok=True)
+        if encoding is not None:
+            np.save(self._path(digest, ".npy"), encoding)
+        else:
+            with open(self._path(digest, ".err"), "w") as f:
+                f.write(error)
+
+
+def cache_directory(gallery_directory, max_side, model):
+    return os.path.join(gallery_directory, "encoding_cache", f"{model}_{max_side}")
+
+
+def find_photos(folder):
+    photos = []
+    for root, _, files in os.walk(folder):
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                photos.append(os.path.join(root, name))
+    return sorted(photos)
+
+
+def register_folder(folder, gallery, workers=None, id_from="file", max_side=1600, model="hog"):
+    """
+    Encode and register every photo in `folder`. Returns a per-file report
+    {path: "registered" | "duplicate" | "already registered" | error}.
+    """
+    start = time.perf_counter()
+    photos = find_photos(folder)
+    cache = EncodingCache(cache_directory(gallery.directory, max_side, model))
+
+    # Hashing is I/O bound and hashlib releases the GIL
+    with ThreadPoolExecutor() as pool:
+        digests = list(pool.map(file_sha256, photos))
+
+    first_path = {}
+    for path, digest in zip(photos, digests):
+        first_path.setdefault(digest, path)
+
+    results = {}
+    todo = []
+    for digest, path in first_path.items():
+        hit, encoding, error = cache.get(digest)
+        if hit:
+            results[digest] = (encoding, error)
+        else:
+            todo.append(digest)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = [(first_path[d], max_side, model) for d in todo]
+        for digest, (encoding, error, cacheable) in zip(todo, pool.map(_encode_job, jobs, chunksize=4)):
+            if cacheable:
+                cache.put(digest, encoding, error)
+            results[digest] = (encoding, error)
+
+    registered = {p.get("sha256") for p in gallery.people}
+    report, new_ids, new_encodings, new_meta = {}, [], [], []
+    for path, digest in zip(photos, digests):
+        encoding, error = results[digest]
+        if error:
+            report[path] = error
+        elif first_path[digest] != path:
+            report[path] = f"duplicate of {first_path[digest]}"
+        elif digest in registered:
+            report[path] = "already registered"
+        else:
+            if id_from == "folder":
+                person_id = os.path.basename(os.path.dirname(path))
+            else:
+                person_id = os.path.splitext(os.path.basename(path))[0]
+            new_ids.append(person_id)
+            new_encodings.append(encoding)
+            new_meta.append({"source": path, "sha256": digest})
+            report[path] = "registered"
+    if new_ids:
+        gallery.add_many(new_ids, new_encodings, new_meta)
+
+    elapsed = time.perf_counter() - start
+    print(f"{len(photos)} photos ({len(todo)} encoded, {len(first_path) - len(todo)} cached) "
+          f"in {elapsed:.1f}s = {len(photos) / max(elapsed, 1e-9):.1f} photos/s, "
+          f"{len(todo) / max(elapsed, 1e-9):.1f} encodings/s with {workers or os.cpu_count()} workers")
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bulk face registration")
+    parser.add_argument("folder", help="Folder of photos (searched recursively)")
+    parser.add_argument("--gallery", type=str, default="face_gallery", help="Gallery directory")
+    parser.add_argument("--workers", type=int, default=None, help="Encoding processes (default: all cores)")
+    parser.add_argument("--id-from", choices=["file", "folder"], default="file",
+                        help="Take the person ID from the file name or its folder name")
+    parser.add_argument("--max-side", type=int, default=1600, help="Downscale larger photos before encoding")
+    parser.add_argument("--model", choices=["hog", "cnn"], default="hog", help="face_recognition detector")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = register_folder(args.folder, FaceGallery(args.gallery), args.workers,
+                             args.id_from, args.max_side, args.model)
+    failures = {p: r for p, r in report.items() if r != "registered"}
+    print(f"Registered {len(report) - len(failures)} people.")
+    for path, reason in failures.items():
+        print(f"  {path}: {reason}")
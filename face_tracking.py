@@ -0,0 +1,146 @@
+"""
+Face Tracking
+=============
+Follows faces between (expensive) dlib detections in a video stream:
+- On detection frames, new boxes are associated to existing tracks by IoU.
+- Between detections, every track is moved by the median Lucas-Kanade
+  flow of feature points inside its box (one batched LK call per frame).
+- A track asks for a (re-)encoding only when it is new or its crop
+  quality (size x sharpness) has clearly improved.
+Boxes use face_recognition's (top, right, bottom, left) order.
+"""
+
+import itertools
+
+import cv2
+import numpy as np
+
+
+def box_iou(a, b):
+    """
+    Intersection over union of two (top, right, bottom, left) boxes.
+    """
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    inter = max(0, bottom - top) * max(0, right - left)
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+
+def crop_quality(gray, box):
+    """
+    Face crop quality: pixel area times sharpness (variance of the Laplacian).
+    """
+    top, right, bottom, left = box
+    crop = gray[max(0, top):max(0, bottom), max(0, left):max(0, right)]
+    if crop.size == 0:
+        return 0.0
+    return float(crop.size * cv2.Laplacian(crop, cv2.CV_32F).var())
+
+
+class FaceTrack:
+    def __init__(self, track_id, box, quality):
+        self.track_id = track_id
+        self.box = box
+        self.quality = quality        # quality of the pending/last encoded crop
+        self.encoded_quality = 0.0    # quality of the crop behind `encoding`
+        self.encoding = None
+        self.label = None             # gallery entry of the matched person, if any
+        self.distance = float("inf")
+        self.misses = 0               # consecutive detection rounds without a match
+
+
+class FaceTracker:
+    def __init__(self, iou_threshold=0.3, max_misses=2, quality_gain=1.5, max_corners=20):
+        """
+        iou_threshold: minimum IoU to associate a detection with a track.
+        max_misses:    detection rounds a track survives without a detection.
+        quality_gain:  re-encode when crop quality exceeds the encoded one by this factor.
+        """
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.quality_gain = quality_gain
+        self.max_corners = max_corners
+        self.tracks = []
+        self._ids = itertools.count()
+        self._prev_gray = None
+
+    def update(self, boxes, gray):
+        """
+        Associate detected boxes with tracks. Returns the tracks that need
+        an encoding (new, or their crop is clearly better than last time).
+        """
+        pairs = sorted(((box_iou(t.box, b), ti, bi)
+                        for ti, t in enumerate(self.tracks) for bi, b in enumerate(boxes)),
+                       reverse=True)
+        used_tracks, used_boxes = set(), set()
+        needs_encoding = []
+        for iou, ti, bi in pairs:
+            if iou < self.iou_threshold:
+                break
+            if ti in used_tracks or bi in used_boxes:
+                continue
+            used_tracks.add(ti)
+            used_boxes.add(bi)
+            track = self.tracks[ti]
+            track.box = boxes[bi]
+            track.misses = 0
+            track.quality = crop_quality(gray, track.box)
+            if track.quality > track.encoded_quality * self.quality_gain:
+                needs_encoding.append(track)
+
+        for ti, track in enumerate(self.tracks):
+            if ti not in used_tracks:
+                track.misses += 1
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+
+        for bi, box in enumerate(boxes):
+            if bi not in used_boxes:
+                track = FaceTrack(next(self._ids), box, crop_quality(gray, box))
+                self.tracks.append(track)
+                needs_encoding.append(track)
+
+        self._prev_gray = gray
+        return needs_encoding
+
+    def set_encoding(self, track, encoding, label, distance):
+        track.encoding = encoding
+        track.encoded_quality = track.quality
+        track.label = label
+        track.distance = distance
+
+    def propagate(self, gray):
+        """
+        Move every track by the median optical flow inside its box.
+        """
+        if self._prev_gray is None or not self.tracks:
+            self._prev_gray = gray
+            return
+
+        points, owners = [], []
+        for i, track in enumerate(self.tracks):
+            top, right, bottom, left = (max(0, v) for v in track.box)
+            crop = self._prev_gray[top:bottom, left:right]
+            if crop.shape[0] < 3 or crop.shape[1] < 3:
+                continue
+            corners = cv2.goodFeaturesToTrack(crop, self.max_corners, 0.01, 3)
+            if corners is not None:
+                points.append(corners.reshape(-1, 2) + (left, top))
+                owners.append(np.full(len(corners), i))
+
+        if points:
+            points = np.concatenate(points).astype(np.float32)
+            owners = np.concatenate(owners)
+            moved, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, points.reshape(-1, 1, 2), None)
+            shift = moved.reshape(-1, 2) - points
+            ok = status.ravel() == 1
+            for i, track in enumerate(self.tracks):
+                sel = ok & (owners == i)
+                if sel.any():
+                    dx, dy = np.median(shift[sel], axis=0)
+                    top, right, bottom, left = track.box
+                    track.box = (int(round(top + dy)), int(round(right + dx)),
+                                 int(round(bottom + dy)), int(round(left + dx)))
+        self._prev_gray = gray
@@ -0,0 +1,68 @@
+"""
+Floor Plan
+==========
+Loading helpers shared by Path Finder and the routing modules:
+- The floor plan image is thresholded to a binary maze (0 = path, 1 = wall).
+- Walls are optionally dilated so routes stay away from them.
+- Icons without an alpha channel get one (black background made transparent)
+  and are alpha-blended onto frames with `blend_icon`.
+"""
+
+import cv2
+import numpy as np
+
+
+def binarize_maze(gray, dilate_kernel=3, dilate_iterations=1):
+    """
+    Threshold a grayscale floor plan to 0 = path, 1 = wall (dark pixels are walls).
+    """
+    _, maze = cv2.threshold(gray, 127, 1, cv2.THRESH_BINARY_INV)
+    if dilate_kernel and dilate_iterations:
+        kernel = np.ones((dilate_kernel, dilate_kernel), np.uint8)
+        maze = cv2.dilate(maze, kernel, iterations=dilate_iterations)
+    return maze
+
+
+def load_maze(path, dilate_kernel=3, dilate_iterations=1):
+    """
+    Returns (grayscale image, binary maze) for a floor plan image.
+    """
+    maze_img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if maze_img is None:
+        raise FileNotFoundError("Maze image not found!")
+    return maze_img, binarize_maze(maze_img, dilate_kernel, dilate_iterations)
+
+
+def load_icon(path):
+    """
+    Load an icon as BGRA; without an alpha channel, near-black pixels become transparent.
+    """
+    icon = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if icon is None:
+        raise FileNotFoundError(f"Icon not found: {path}")
+
+    # If no alpha channel, create one (make black background transparent)
+    if icon.shape[2] == 3:
+        gray = cv2.cvtColor(icon, cv2.COLOR_BGR2GRAY)
+        _, alpha = cv2.threshold(gray, 10, 255, cv2.THRESH_BINARY)
+        icon = np.dstack([icon, alpha])
+    return icon
+
+
+def blend_icon(bg, icon, x, y):
+    """
+    Alpha-blend a BGRA icon onto a BGR image in place with its top-left at
+    (x, y); parts outside the image are clipped.
+    """
+    h, w = icon.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, bg.shape[1]), min(y + h, bg.shape[0])
+    if x0 >= x1 or y0 >= y1:
+        return bg
+    patch = np.ascontiguousarray(icon[y0 - y:y1 - y, x0 - x:x1 - x])
+    alpha = cv2.merge([patch[:, :, 3]] * 3)
+    region = bg[y0:y1, x0:x1]
+    # Whole-patch saturating uint8 arithmetic instead of a per-channel float loop
+    region[:] = cv2.add(cv2.multiply(region, 255 - alpha, scale=1 / 255),
+                        cv2.multiply(patch[:, :, :3], alpha, scale=1 / 255))
+    return bg
@@ -0,0 +1,233 @@
+"""
+Frame Pipeline
+==============
+Runs a video loop as concurrent stages instead of one sequential loop,
+so a slow detector no longer makes the camera buffer back up:
+- A capture thread reads frames; each processing stage (e.g. inference,
+  analytics) runs in its own thread; the last stage (render) runs in the
+  calling thread, because GUI calls such as cv2.imshow belong there.
+- Stages are connected by bounded queues. Policy "newest" drops the
+  oldest waiting frame when a queue is full, so every stage always works
+  on the most recent frame (live cameras). Policy "every" blocks instead,
+  so every frame is processed (recorded files).
+- Per stage: frames processed and dropped, throughput, time busy and mean /
+  p95 processing time; end to end: latency from capture to render.
+OpenCV and the detectors release the GIL while they work, so the stages
+really overlap.
+
+    pipeline = FramePipeline(cap.read, [("inference", detect), ("analytics", analyze)], render)
+    pipeline.run()
+    print(pipeline.report())
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+POLICIES = ("newest", "every")
+_END = object()
+
+
+class StageStats:
+    def __init__(self, name, window=1000):
+        """
+        name:   stage name in reports.
+        window: most recent frames kept for the timing percentiles.
+        """
+        self.name = name
+        self.processed = 0
+        self.dropped = 0
+        self.busy = 0.0
+        self.durations = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.processed += 1
+            self.busy += seconds
+            self.durations.append(seconds)
+
+    def drop(self):
+        with self._lock:
+            self.dropped += 1
+
+    def summary(self, elapsed):
+        with self._lock:
+            durations = np.array(self.durations) * 1000
+        return {"processed": self.processed, "dropped": self.dropped,
+                "fps": self.processed / elapsed if elapsed > 0 else 0.0,
+                "busy": self.busy / elapsed if elapsed > 0 else 0.0,
+                "mean_ms": float(durations.mean()) if len(durations) else 0.0,
+                "p95_ms": float(np.percentile(durations, 95)) if len(durations) else 0.0}
+
+
+class FramePipeline:
+    def __init__(self, source, stages, sink, policy="newest", queue_size=2):
+        """
+        source:     callable returning (ok, frame), e.g. cv2.VideoCapture.read.
+        stages:     list of (name, fn); each fn takes the previous stage's
+                    output (the frame for the first) and returns its own.
+        sink:       render callable run in the calling thread; return False to stop.
+        policy:     "newest" (drop stale frames) or "every" (process all frames).
+        queue_size: frames waiting between two stages.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}, expected one of {POLICIES}")
+        self.source = source
+        self.stages = list(stages)
+        self.sink = sink
+        self.policy = policy
+        self.queue_size = queue_size
+        names = ["capture"] + [name for name, _ in self.stages] + ["render"]
+        self.stats = {name: StageStats(name) for name in names}
+        self.latency = deque(maxlen=1000)
+        self._stop = threading.Event()
+        self._error = None
+        self._started = None
+        self._finished = None
+
+    # --- Queues ---
+    def _put(self, q, item, stats):
+        while not self._stop.is_set():
+            try:
+                if self.policy == "every":
+                    q.put(item, timeout=0.1)
+                else:
+                    q.put_nowait(item)
+                return
+            except queue.Full:
+                if self.policy == "newest":
+                    try:
+                        q.get_nowait()
+                        stats.drop()
+                    except queue.Empty:
+                        pass
+
+    def _finish(self, q):
+        # The end marker waits behind the last frames, unless the pipeline is stopping
+        while True:
+            try:
+                q.put(_END, timeout=0.1)
+                return
+            except queue.Full:
+                if self._stop.is_set():
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def _get(self, q):
+        while True:
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return _END
+
+    # --- Threads ---
+    def _capture(self, out):
+        stats = self.stats["capture"]
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                ok, frame = self.source()
+                if not ok:
+                    break
+                stats.record(time.perf_counter() - start)
+                self._put(out, (stats.processed, time.perf_counter(), frame), stats)
+        except Exception as e:  # surfaced by run()
+            self._error = e
+            self._stop.set()
+        finally:
+            self._finish(out)
+
+    def _stage(self, name, fn, inp, out):
+        stats = self.stats[name]
+        try:
+            while True:
+                item = self._get(inp)
+                if item is _END:
+                    break
+                index, captured, data = item
+                start = time.perf_counter()
+                data = fn(data)
+                stats.record(time.perf_counter() - start)
+                self._put(out, (index, captured, data), stats)
+        except Exception as e:
+            self._error = e
+            self._stop.set()
+        finally:
+            self._finish(out)
+
+    def run(self):
+        """
+        Run until the source ends, the sink returns False, or a stage fails
+        (its exception is re-raised here).
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(target=self._capture, args=(queues[0],), daemon=True)]
+        for i, (name, fn) in enumerate(self.stages):
+            threads.append(threading.Thread(target=self._stage, args=(name, fn, queues[i], queues[i + 1]),
+                                            daemon=True))
+        self._stop.clear()
+        self._error = None
+        self._started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        stats = self.stats["render"]
+        try:
+            while True:
+                item = self._get(queues[-1])
+                if item is _END:
+                    break
+                _, captured, data = item
+                start = time.perf_counter()
+                keep_going = self.sink(data)
+                end = time.perf_counter()
+                stats.record(end - start)
+                self.latency.append(end - captured)
+                if keep_going is False:
+                    break
+        finally:
+            self._stop.set()
+            for q in queues:  # unblock producers waiting on full queues
+                try:
+                    while True:
+                        q.get_nowait()
+                except queue.Empty:
+                    pass
+            for thread in threads:
+                thread.join(timeout=1.0)
+            self._finished = time.perf_counter()
+        if self._error is not None:
+            raise self._error
+
+    # --- Reporting ---
+    def summary(self):
+        """
+        {stage: stats} plus "end_to_end" latency (ms) and throughput.
+        """
+        end = self._finished or time.perf_counter()
+        elapsed = end - self._started if self._started else 0.0
+        result = {name: s.summary(elapsed) for name, s in self.stats.items()}
+        latency = np.array(self.latency) * 1000
+        result["end_to_end"] = {"fps": result["render"]["fps"],
+                                "mean_ms": float(latency.mean()) if len(latency) else 0.0,
+                                "p95_ms": float(np.percentile(latency, 95)) if len(latency) else 0.0}
+        return result
+
+    def report(self):
+        lines = [f"{'stage':>10} {'frames':>7} {'dropped':>8} {'FPS':>7} {'busy':>6} {'mean ms':>8} {'p95 ms':>8}"]
+        summary = self.summary()
+        for name in self.stats:
+            s = summary[name]
+            lines.append(f"{name:>10} {s['processed']:>7} {s['dropped']:>8} {s['fps']:>7.1f} {s['busy']:>6.0%} "
+                         f"{s['mean_ms']:>8.1f} {s['p95_ms']:>8.1f}")
+        e2e = summary["end_to_end"]
+        lines.append(f"{'end to end':>10} {'':>7} {'':>8} {e2e['fps']:>7.1f} {'':>6} "
+                     f"{e2e['mean_ms']:>8.1f} {e2e['p95_ms']:>8.1f}")
+        return "\n".join(lines)
@@ -0,0 +1,334 @@
+"""
+Hazard-Aware Incremental Replanning
+===================================
+Keeps thousands of evacuation routes current while a fire spreads:
+- `IncrementalField` is a weighted distance-to-exit field (integer cost to
+  cross each cell; hazard cells can be blocked outright). When costs
+  change it repairs itself LPA*-style instead of recomputing: cells whose
+  shortest path ran through a worsened cell are orphaned, then re-seeded
+  from their still-valid boundary and re-expanded with a vectorized
+  bucket (Dial) Dijkstra. Improvements propagate the same way.
+- `HazardSpread` grows fire zones (blocked) and a smoke margin around them
+  (high cost) through the walkable space from the ignition points.
+- `EvacuationPlanner` owns everyone's routes and, after each hazard
+  update, re-walks only the routes that cross cells whose distance changed.
+"""
+
+import heapq
+
+import numpy as np
+
+from distance_field import UNREACHABLE, DistanceField, wavefront
+
+BLOCKED = -1
+_INF = 2 ** 30  # larger than any reachable distance
+
+
+class IncrementalField(DistanceField):
+    def __init__(self, maze, exits, costs=None):
+        """
+        maze:  2D array, 0 = path, nonzero = wall.
+        exits: list of (row, col) exit cells.
+        costs: optional 2D int array, cost of crossing each cell (default 1).
+        """
+        self._init_grid(maze, exits)
+        self._cost = np.ones(self._free.shape, dtype=np.int32)
+        if costs is not None:
+            self._cost.reshape(self.shape[0] + 2, self._cols)[1:-1, 1:-1] = np.maximum(costs, 1)
+        self._build(self._sources)
+
+    def _build(self, sources):
+        self._walkable = self._free.copy()  # the static walls never change
+        self._exit = np.zeros(self._free.shape, dtype=bool)
+        self._exit[sources] = True
+        self._orphan = np.zeros(self._free.shape, dtype=bool)  # scratch mask
+        self._tag = np.zeros(self._free.shape, dtype=np.int64)  # scratch for _dedup
+        self._dist = np.full(self._free.shape, _INF, dtype=np.int32)
+        # Next hop towards the exit for every cell (itself at exits / dead ends)
+        self._next = np.arange(self._free.size, dtype=np.int64)
+        if sources and (self._cost[self._free] == 1).all():
+            # Unit costs: the plain BFS wavefront is much cheaper than Dijkstra
+            self._dist.fill(UNREACHABLE)
+            wavefront(self._free, self._dist, sources, self._offsets)
+            self._dist[self._dist == UNREACHABLE] = _INF
+        elif sources:
+            sources = np.unique(np.asarray(sources, dtype=np.int64))
+            self._dist[sources] = 0
+            self._relax(sources)
+        self._update_next(np.nonzero(self._free)[0])
+
+    def _update_next(self, cells):
+        cells = cells[self._free[cells] & (self._dist[cells] > 0) & (self._dist[cells] < _INF)]
+        around = cells[:, None] + self._offsets[None, :]
+        self._next[cells] = around[np.arange(len(cells)), self._dist[around].argmin(axis=1)]
+
+    # --- Accessors (unreachable cells are reported as UNREACHABLE) ---
+    @property
+    def distances(self):
+        d = self._dist.reshape(self.shape[0] + 2, self._cols)[1:-1, 1:-1]
+        return np.where(d >= _INF, UNREACHABLE, d)
+
+    def distance(self, cell):
+        if not self.is_free(cell):
+            return UNREACHABLE
+        d = int(self._dist[self._flat(cell)])
+        return UNREACHABLE if d >= _INF else d
+
+    def distances_at(self, rows, cols):
+        d = super().distances_at(rows, cols)
+        d[d >= _INF] = UNREACHABLE
+        return d
+
+    def route(self, start):
+        """
+        Cheapest path from `start` to the nearest usable exit, or None.
+        """
+        path = self.route_flat(self._flat(start)) if self.is_free(start) else None
+        if path is None:
+            return None
+        return [(int(p // self._cols) - 1, int(p % self._cols) - 1) for p in path]
+
+    def route_flat(self, at):
+        """
+        Same as route() on padded flat indices; returns an int64 array or None.
+        """
+        return self.routes_flat(np.array([at]))[0]
+
+    def routes_flat(self, starts, chunk=4096):
+        """
+        Routes for many start cells (padded flat indices) at once: all walkers
+        follow their next hops in lockstep, one NumPy step per path cell.
+        Returns a list of int64 arrays (None where trapped).
+        """
+        starts = np.asarray(starts, dtype=np.int64)
+        routes = []
+        for lo in range(0, len(starts), chunk):
+            at = starts[lo:lo + chunk]
+            ok = self._free[at] & (self._dist[at] < _INF)
+            steps = [at]
+            while True:
+                moving = self._dist[at] > 0
+                if not (moving & ok).any():
+                    break
+                at = np.where(moving & ok, self._next[at], at)
+                steps.append(at)
+            steps = np.stack(steps, axis=1)
+            lengths = (self._dist[steps] > 0).sum(axis=1) + 1
+            routes.extend(steps[i, :n] if ok[i] else None for i, n in enumerate(lengths))
+        return routes
+
+    def is_shortest(self, path):
+        """
+        True if a flat path is still a cheapest route: every step is tight
+        against the current field and it still ends at a usable exit.
+        """
+        d = self._dist[path]
+        return bool(d[-1] == 0 and self._free[path].all()
+                    and (d[:-1] == self._cost[path[:-1]] + d[1:]).all())
+
+    # --- Incremental repair ---
+    def update(self, rows, cols, costs):
+        """
+        Set the crossing cost of cells (BLOCKED = impassable) and repair the
+        field. Returns the flat indices of cells whose distance changed.
+        """
+        idx = self._flat_many(rows, cols)
+        costs = np.asarray(costs, dtype=np.int64)
+        old_free, old_cost = self._free[idx], self._cost[idx]
+        new_free = (costs != BLOCKED) & self._walkable[idx]
+        new_cost = np.where(new_free, np.maximum(costs, 1), old_cost)
+        worse = (old_free & ~new_free) | (old_free & new_free & (new_cost > old_cost))
+        better = (~old_free & new_free) | (old_free & new_free & (new_cost < old_cost))
+        self._free[idx] = new_free
+        self._cost[idx] = new_cost
+
+        orphans = self._orphans(idx[worse])
+        old_orphan_dist = self._dist[orphans].copy()
+        self._dist[orphans] = _INF
+
+        # Re-seed orphans (and improved cells) from their valid neighbours
+        seeds = np.unique(np.concatenate([orphans, idx[better]]))
+        seeds = seeds[self._free[seeds]]
+        nb_best = self._dist[seeds[:, None] + self._offsets[None, :]].min(axis=1)
+        tentative = np.where(self._exit[seeds], 0,
+                             np.where(nb_best >= _INF, _INF, nb_best + self._cost[seeds]))
+        improve = tentative < self._dist[seeds]
+        seeds, tentative = seeds[improve], tentative[improve]
+        self._dist[seeds] = tentative
+        relaxed = self._relax(seeds)
+
+        changed = np.unique(np.concatenate([orphans[self._dist[orphans] != old_orphan_dist], seeds, relaxed]))
+        # A cell's next hop can only change if it or a neighbour changed
+        self._update_next(np.unique(np.concatenate([(changed[:, None] + self._offsets[None, :]).ravel(),
+                                                    changed, idx])))
+        return changed
+
+    def _orphans(self, worsened):
+        """
+        Cells that lose every shortest-path support once `worsened` do:
+        the worsened cells themselves plus their dependants, level by level.
+        """
+        orphan, dist, cost, offsets = self._orphan, self._dist, self._cost, self._offsets
+        frontier = np.unique(worsened[dist[worsened] < _INF])
+        orphan[frontier] = True
+        found = [frontier]
+        while frontier.size:
+            nb = np.unique((frontier[:, None] + offsets[None, :]).ravel())
+            nb = nb[~orphan[nb] & (dist[nb] < _INF) & (dist[nb] > 0)]
+            around = nb[:, None] + offsets[None, :]
+            d_around = dist[around]
+            supported = (~orphan[around] & (d_around < _INF)
+                         & (d_around + cost[nb][:, None] == dist[nb][:, None])).any(axis=1)
+            frontier = nb[~supported]
+            orphan[frontier] = True
+            found.append(frontier)
+        found = np.concatenate(found)
+        orphan[found] = False
+        return found
+
+    def _dedup(self, cells):
+        """
+        Unique cells without sorting: the last write of a unique tag wins.
+        """
+        tags = np.arange(cells.size)
+        self._tag[cells] = tags
+        return cells[self._tag[cells] == tags]
+
+    def _relax(self, seeds):
+        """
+        Bucketed Dijkstra (integer costs) from seeds whose distances are set.
+        Returns every cell whose distance it lowered.
+        """
+        dist, free, cost, offsets = self._dist, self._free, self._cost, self._offsets
+        buckets, keys = {}, []
+
+        def push(cells, values):
+            order = np.argsort(values, kind="stable")
+            cells, values = cells[order], values[order]
+            levels, starts = np.unique(values, return_index=True)
+            for level, part in zip(levels.tolist(), np.split(cells, starts[1:])):
+                if level not in buckets:
+                    buckets[level] = []
+                    heapq.heappush(keys, level)
+                buckets[level].append(part)
+
+        improved = []
+        if len(seeds):
+            push(seeds, dist[seeds])
+        while keys:
+            d = heapq.heappop(keys)
+            cells = np.concatenate(buckets.pop(d))
+            cells = self._dedup(cells[dist[cells] == d])  # drop stale entries
+            if not cells.size:
+                continue
+            nb = (cells[:, None] + offsets[None, :]).ravel()
+            nb = nb[free[nb]]
+            nd = d + cost[nb]
+            better = nd < dist[nb]
+            nb, nd = nb[better], nd[better]
+            if not nb.size:
+                continue
+            np.minimum.at(dist, nb, nd)
+            keep = dist[nb] == nd
+            nb, nd = nb[keep], nd[keep]
+            improved.append(nb)
+            push(nb, nd)
+        return self._dedup(np.concatenate(improved)) if improved else np.zeros(0, dtype=np.int64)
+
+
+class HazardSpread:
+    def __init__(self, maze, origins, cells_per_second=2.0, smoke_margin=25, smoke_cost=10):
+        """
+        maze:             2D array, 0 = path, nonzero = wall.
+        origins:          list of (row, col) ignition cells.
+        cells_per_second: fire front speed through walkable space.
+        smoke_margin:     width (cells) of the high-cost band ahead of the fire.
+        smoke_cost:       crossing cost of a smoke cell (a clear cell costs 1).
+        """
+        self.cells_per_second = cells_per_second
+        self.smoke_margin = smoke_margin
+        self.smoke_cost = smoke_cost
+        # Fire arrival distance per cell, sorted once so every update is a slice
+        arrival = DistanceField(maze, origins).distances
+        reach = np.nonzero(arrival.ravel() != UNREACHABLE)[0]
+        order = np.argsort(arrival.ravel()[reach], kind="stable")
+        self._cells = np.stack(np.unravel_index(reach[order], arrival.shape))
+        self._arrival = arrival.ravel()[reach][order]
+        self._fire = 0      # cells [0, _fire) are burning
+        self._smoke = 0     # cells [0, _smoke) are at least smoky
+        self.time = 0.0
+
+    def advance(self, t):
+        """
+        Move the hazard to time t (seconds since ignition).
+        Returns (rows, cols, costs) of the cells whose state changed.
+        """
+        self.time = t
+        radius = self.cells_per_second * t
+        fire = int(np.searchsorted(self._arrival, radius, side="right"))
+        smoke = int(np.searchsorted(self._arrival, radius + self.smoke_margin, side="right"))
+        new_smoke = self._cells[:, max(self._smoke, fire):smoke]
+        new_fire = self._cells[:, self._fire:fire]
+        self._fire, self._smoke = fire, smoke
+        rows = np.concatenate([new_fire[0], new_smoke[0]])
+        cols = np.concatenate([new_fire[1], new_smoke[1]])
+        costs = np.concatenate([np.full(new_fire.shape[1], BLOCKED), np.full(new_smoke.shape[1], self.smoke_cost)])
+        return rows, cols, costs
+
+    @property
+    def burning(self):
+        """
+        (rows, cols) of the burning cells.
+        """
+        return self._cells[:, :self._fire]
+
+
+class EvacuationPlanner:
+    def __init__(self, maze, exits, hazard=None):
+        self.field = IncrementalField(maze, exits)
+        self.hazard = hazard
+        self.routes = {}      # person -> flat path (None = trapped)
+        self._positions = {}  # person -> flat cell
+
+    def add_people(self, people, cells):
+        """
+        Place many people at (row, col) cells and plan all their routes at once.
+        """
+        cells = np.asarray(cells).reshape(-1, 2)
+        flat = self.field._flat_many(cells[:, 0], cells[:, 1])
+        for person, at, path in zip(people, flat, self.field.routes_flat(flat)):
+            self._positions[person] = int(at)
+            self.routes[person] = path
+
+    def add_person(self, person, cell):
+        self.add_people([person], [cell])
+
+    def route(self, person):
+        """
+        Current route of a person as a list of (row, col), or None if trapped.
+        """
+        path = self.routes[person]
+        if path is None:
+            return None
+        cols = self.field._cols
+        return [(int(p // cols) - 1, int(p % cols) - 1) for p in path]
+
+    def tick(self, t):
+        """
+        Advance the hazard to time t and repair only the stale routes.
+        Returns the number of routes that were recomputed.
+        """
+        rows, cols, costs = self.hazard.advance(t)
+        if len(rows) == 0:
+            return 0
+        changed = np.zeros(self.field._free.shape, dtype=bool)
+        changed[self.field.update(rows, cols, costs)] = True
+        # Routes through changed cells are often still optimal (everything
+        # behind the smoke got uniformly costlier); only re-walk broken ones.
+        reachable = self.field._dist < _INF
+        stale = [p for p, path in self.routes.items()
+                 if (reachable[self._positions[p]] if path is None
+                     else changed[path].any() and not self.field.is_shortest(path))]
+        for person, path in zip(stale, self.field.routes_flat([self._positions[p] for p in stale])):
+            self.routes[person] = path
+        return len(stale)
@@ -0,0 +1,313 @@
+"""
+Hierarchical A* (HPA*)
+======================
+Search cost that grows with the building's layout, not the image size:
+- Preprocessing cuts the binary maze into square clusters and places
+  entrance nodes on every free stretch of each cluster border.
+- Distances between the entrances of each cluster are found with one
+  vectorized wavefront per entrance slot for all clusters at once (the
+  clusters are laid out side by side, separated by wall lines).
+- A query connects start and goal to the entrances of their clusters,
+  runs A* on the small abstract graph, and refines each abstract edge
+  back to pixels with a local search inside one cluster. When start and
+  goal are in the same or neighbouring clusters, an exact search over
+  those clusters is a candidate too.
+Paths are 4-connected (row, col) lists like Path Finder's BFS, but not
+shortest: every route passes through entrance nodes. On the benchmark's
+synthetic floor plans they average about 6% longer than the shortest
+path, with 5% of routes 25% or more longer and the worst seen 1.9x (short
+trips across two clusters). Use distance_field when the exact shortest
+route matters.
+"""
+
+import heapq
+import json
+import os
+
+import numpy as np
+
+from distance_field import UNREACHABLE, DistanceField, wavefront
+
+
+class HierarchicalPlanner:
+    def __init__(self, maze, cluster_size=64, long_entrance=6):
+        """
+        maze:          2D array, 0 = path, nonzero = wall.
+        cluster_size:  side of a square cluster in cells.
+        long_entrance: border stretches at least this long get an entrance
+                       at both ends instead of one in the middle.
+        """
+        self._init_grid(maze, cluster_size, long_entrance)
+        self._build_entrances()
+        self._build_intra_edges()
+        self._build_adjacency()
+
+    def _init_grid(self, maze, cluster_size, long_entrance):
+        self.maze = np.ascontiguousarray(maze)
+        self.shape = maze.shape
+        self.cluster_size = cluster_size
+        self.long_entrance = long_entrance
+        self._free = self.maze == 0
+        self._n_cluster_cols = -(-self.shape[1] // cluster_size)
+
+    # --- Persistence ---
+    _ARRAYS = ("node_cells", "node_cluster", "_inter", "_intra")
+
+    def save(self, directory):
+        """
+        Write the abstract graph as plain .npy files (memory-mappable).
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in self._ARRAYS:
+            np.save(os.path.join(directory, name.lstrip("_") + ".npy"), getattr(self, name))
+        with open(os.path.join(directory, "params.json"), "w") as f:
+            json.dump({"shape": list(self.shape), "cluster_size": self.cluster_size,
+                       "long_entrance": self.long_entrance}, f)
+
+    @classmethod
+    def load(cls, directory, maze):
+        with open(os.path.join(directory, "params.json")) as f:
+            params = json.load(f)
+        if tuple(params["shape"]) != maze.shape:
+            raise ValueError("Saved graph does not match the maze shape")
+        planner = cls.__new__(cls)
+        planner._init_grid(maze, params["cluster_size"], params["long_entrance"])
+        for name in cls._ARRAYS:
+            setattr(planner, name, np.load(os.path.join(directory, name.lstrip("_") + ".npy"), mmap_mode="r"))
+        planner._build_adjacency()
+        return planner
+
+    # --- Preprocessing ---
+    def cluster_of(self, cell):
+        c = self.cluster_size
+        return (cell[0] // c) * self._n_cluster_cols + cell[1] // c
+
+    def _window(self, cluster):
+        c = self.cluster_size
+        r0 = (cluster // self._n_cluster_cols) * c
+        c0 = (cluster % self._n_cluster_cols) * c
+        return r0, c0, self.maze[r0:r0 + c, c0:c0 + c]
+
+    def _runs(self, mask, breaks):
+        """
+        (start, end) of every True stretch in mask, also split at `breaks`.
+        """
+        padded = np.concatenate([[False], mask, [False]]).astype(np.int8)
+        edges = np.diff(padded)
+        starts, ends = np.nonzero(edges == 1)[0], np.nonzero(edges == -1)[0]
+        runs = []
+        for s, e in zip(starts, ends):
+            cuts = [b for b in breaks if s < b < e]
+            for a, b in zip([s] + cuts, cuts + [e]):
+                runs.append((a, b))
+        return runs
+
+    def _build_entrances(self):
+        rows, cols = self.shape
+        c = self.cluster_size
+        node_of = {}
+        cells, inter = [], []
+
+        def node(r, col):
+            key = r * cols + col
+            if key not in node_of:
+                node_of[key] = len(cells)
+                cells.append((r, col))
+            return node_of[key]
+
+        def place(run, make_pair):
+            start, end = run
+            if end - start >= self.long_entrance:
+                spots = (start, end - 1)
+            else:
+                spots = ((start + end - 1) // 2,)
+            for p in spots:
+                a, b = make_pair(p)
+                inter.append((node(*a), node(*b)))
+
+        row_breaks = list(range(c, rows, c))
+        col_breaks = list(range(c, cols, c))
+        for x in col_breaks:  # vertical borders between horizontal neighbours
+            for run in self._runs(self._free[:, x - 1] & self._free[:, x], row_breaks):
+                place(run, lambda p: ((p, x - 1), (p, x)))
+        for y in row_breaks:  # horizontal borders between vertical neighbours
+            for run in self._runs(self._free[y - 1, :] & self._free[y, :], col_breaks):
+                place(run, lambda p: ((y - 1, p), (y, p)))
+
+        self.node_cells = np.array(cells, dtype=np.int64).reshape(-1, 2)
+        self.node_cluster = np.array([self.cluster_of(cell) for cell in cells], dtype=np.int64)
+        self._inter = np.array(inter, dtype=np.int64).reshape(-1, 2)
+
+    def _build_intra_edges(self):
+        rows, cols = self.shape
+        c = self.cluster_size
+        n = len(self.node_cells)
+        # Expanded grid: every cluster framed by wall lines
+        row_map = np.arange(rows) + np.arange(rows) // c + 1
+        col_map = np.arange(cols) + np.arange(cols) // c + 1
+        exp_shape = (row_map[-1] + 2, col_map[-1] + 2)
+        expanded = np.zeros(exp_shape, dtype=bool)
+        expanded[np.ix_(row_map, col_map)] = self._free
+        free = expanded.ravel()
+        offsets = np.array([-exp_shape[1], exp_shape[1], -1, 1], dtype=np.int64)
+        node_exp = row_map[self.node_cells[:, 0]] * exp_shape[1] + col_map[self.node_cells[:, 1]]
+
+        # Rank of each node inside its cluster = which wavefront layer it seeds
+        order = np.argsort(self.node_cluster, kind="stable")
+        sorted_clusters = self.node_cluster[order]
+        first = np.searchsorted(sorted_clusters, sorted_clusters, side="left")
+        rank = np.empty(n, dtype=np.int64)
+        rank[order] = np.arange(n) - first
+        counts = np.bincount(self.node_cluster, minlength=int(self.node_cluster.max(initial=0)) + 1)
+        starts = np.concatenate([[0], np.cumsum(counts)])
+
+        # All ordered pairs (u, v) of distinct nodes sharing a cluster
+        per_u = counts[self.node_cluster]
+        u = np.repeat(np.arange(n), per_u)
+        within = np.arange(len(u)) - np.repeat(np.cumsum(per_u) - per_u, per_u)
+        v = order[starts[self.node_cluster[u]] + within]
+        keep = u != v
+        u, v = u[keep], v[keep]
+
+        cost = np.full(len(u), UNREACHABLE, dtype=np.int64)
+        dist = np.empty(free.shape, dtype=np.int32)
+        for layer in range(int(rank.max(initial=-1)) + 1):
+            seeds = node_exp[rank == layer]
+            dist.fill(UNREACHABLE)
+            wavefront(free, dist, seeds, offsets)
+            sel = rank[u] == layer
+            cost[sel] = dist[node_exp[v[sel]]]
+        reachable = cost != UNREACHABLE
+        self._intra = np.stack([u[reachable], v[reachable], cost[reachable]], axis=1)
+
+    def _build_adjacency(self):
+        inter = self._inter
+        edges = np.concatenate([
+            np.stack([inter[:, 0], inter[:, 1], np.ones(len(inter), np.int64)], axis=1),
+            np.stack([inter[:, 1], inter[:, 0], np.ones(len(inter), np.int64)], axis=1),
+            self._intra,
+        ]).reshape(-1, 3)
+        edges = edges[np.argsort(edges[:, 0], kind="stable")]
+        # CSR adjacency as plain lists: the A* inner loop is pure Python
+        self._adj_start = np.searchsorted(edges[:, 0], np.arange(len(self.node_cells) + 1)).tolist()
+        self._adj_to = edges[:, 1].tolist()
+        self._adj_cost = edges[:, 2].tolist()
+        self._node_rc = self.node_cells.tolist()
+
+    @property
+    def num_nodes(self):
+        return len(self.node_cells)
+
+    @property
+    def num_edges(self):
+        return len(self._adj_to)
+
+    # --- Queries ---
+    def _local_field(self, cluster, target):
+        r0, c0, window = self._window(cluster)
+        return r0, c0, DistanceField(window, [(target[0] - r0, target[1] - c0)])
+
+    def _connect(self, cell):
+        """
+        Costs from a cell to the entrances of its cluster, plus the local field.
+        """
+        cluster = self.cluster_of(cell)
+        r0, c0, field = self._local_field(cluster, cell)
+        links = []
+        for node in np.nonzero(self.node_cluster == cluster)[0].tolist():
+            r, col = self._node_rc[node]
+            d = field.distance((r - r0, col - c0))
+            if d != UNREACHABLE:
+                links.append((node, d))
+        return cluster, field, (r0, c0), links
+
+    def query(self, start, goal, refine=True):
+        """
+        Near-shortest path from start to goal. Returns (cost, path) where path
+        is a list of (row, col) (or the abstract node cells if refine=False),
+        or (None, None) when there is no path.
+        """
+        start, goal = tuple(start), tuple(goal)
+        if not (self._free[start] and self._free[goal]):
+            return None, None
+        s_cluster, _, _, s_links = self._connect(start)
+        g_cluster, g_field, g_origin, g_links = self._connect(goal)
+        goal_links = dict(g_links)
+
+        # Same or neighbouring clusters: an exact search in the window around
+        # both is a candidate too, as detours through entrances can double
+        # the length of short trips
+        best_direct, near = None, None
+        (s_row, s_col), (g_row, g_col) = divmod(s_cluster, self._n_cluster_cols), divmod(g_cluster, self._n_cluster_cols)
+        if abs(s_row - g_row) <= 1 and abs(s_col - g_col) <= 1:
+            if s_cluster == g_cluster:
+                near = g_origin, g_field
+            else:
+                c = self.cluster_size
+                r0, c0 = min(s_row, g_row) * c, min(s_col, g_col) * c
+                window = self.maze[r0:(max(s_row, g_row) + 1) * c, c0:(max(s_col, g_col) + 1) * c]
+                near = (r0, c0), DistanceField(window, [(goal[0] - r0, goal[1] - c0)])
+            d = near[1].distance((start[0] - near[0][0], start[1] - near[0][1]))
+            if d != UNREACHABLE:
+                best_direct = d
+
+        START, GOAL = -1, -2
+        gr, gc = goal
+        rc = self._node_rc
+        adj_start, adj_to, adj_cost = self._adj_start, self._adj_to, self._adj_cost
+
+        def h(node):
+            r, col = rc[node]
+            return abs(r - gr) + abs(col - gc)
+
+        g_cost = {START: 0}
+        parent = {START: None}
+        heap = [(h(node) + d, d, node, START) for node, d in s_links]
+        if best_direct is not None:
+            heap.append((best_direct, best_direct, GOAL, START))
+        heapq.heapify(heap)
+        closed = set()
+        while heap:
+            f, g, node, prev = heapq.heappop(heap)
+            if node in closed:
+                continue
+            closed.add(node)
+            parent[node] = prev
+            g_cost[node] = g
+            if node == GOAL:
+                break
+            if node in goal_links:
+                heapq.heappush(heap, (g + goal_links[node], g + goal_links[node], GOAL, node))
+            for e in range(adj_start[node], adj_start[node + 1]):
+                nb = adj_to[e]
+                if nb not in closed:
+                    ng = g + adj_cost[e]
+                    heapq.heappush(heap, (ng + h(nb), ng, nb, node))
+        if GOAL not in closed:
+            return None, None
+
+        if parent[GOAL] == START:
+            if not refine:
+                return best_direct, [start, goal]
+            (r0, c0), field = near
+            return best_direct, [(r + r0, col + c0) for r, col in field.route((start[0] - r0, start[1] - c0))]
+
+        abstract = [GOAL]
+        while parent[abstract[-1]] is not None:
+            abstract.append(parent[abstract[-1]])
+        abstract.reverse()
+        cells = [start if n == START else goal if n == GOAL else tuple(rc[n]) for n in abstract]
+        if not refine:
+            return g_cost[GOAL], cells
+        return g_cost[GOAL], self._refine(cells)
+
+    def _refine(self, cells):
+        path = [cells[0]]
+        for a, b in zip(cells[:-1], cells[1:]):
+            if abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1 and self.cluster_of(a) != self.cluster_of(b):
+                path.append(b)  # inter-cluster step
+                continue
+            r0, c0, field = self._local_field(self.cluster_of(b), b)
+            local = field.route((a[0] - r0, a[1] - c0))
+            path.extend((r + r0, col + c0) for r, col in local[1:])
+        return path
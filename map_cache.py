@@ -0,0 +1,174 @@
+"""
+Compiled Map Cache
+==================
+Makes evacuation routing available right after a restart:
+- A floor plan is compiled once into a cache directory: the grayscale
+  image, the binary maze and prepared icons, stored as plain .npy files
+  that reload as memory maps in milliseconds.
+- The directory name is a hash of the source files' contents and every
+  preprocessing parameter, so a changed image, icon or setting compiles
+  a new artifact and an unchanged one is never rebuilt.
+- Derived structures (distance fields for a set of exits, the HPA* graph)
+  are compiled into the same artifact on first use and memory-mapped on
+  every later start.
+- Artifacts are written to a temporary name and renamed into place, so an
+  interrupted build never leaves a half-written map behind.
+
+    python map_cache.py temple.jpg --icon fire=fire.jpg
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import cv2
+import numpy as np
+
+from distance_field import DistanceField
+from floor_plan import binarize_maze, load_icon
+from hpa_star import HierarchicalPlanner
+
+CACHE_VERSION = 1
+
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _digest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode()).hexdigest()
+
+
+def _save_npy(path, array):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, np.ascontiguousarray(array))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class CompiledMap:
+    def __init__(self, path):
+        """
+        Open a compiled artifact directory (see `compile_map`).
+        """
+        self.path = path
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        self.key = self.manifest["key"]
+        self.gray = np.load(os.path.join(path, "gray.npy"), mmap_mode="r")
+        self.maze = np.load(os.path.join(path, "maze.npy"), mmap_mode="r")
+
+    def icon(self, name):
+        return np.load(os.path.join(self.path, "icons", name + ".npy"), mmap_mode="r")
+
+    # --- Derived structures ---
+    def field(self, exits):
+        """
+        DistanceField to `exits`, compiled on first use.
+        """
+        exits = [tuple(int(v) for v in e) for e in exits]
+        path = os.path.join(self.path, "fields", _digest(sorted(exits))[:32] + ".npy")
+        if os.path.exists(path):
+            return DistanceField.from_distances(self.maze, exits, np.load(path, mmap_mode="r"))
+        field = DistanceField(self.maze, exits)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _save_npy(path, field.padded_distances)
+        return field
+
+    def hierarchical(self, cluster_size=64, long_entrance=6):
+        """
+        HierarchicalPlanner for the maze, compiled on first use.
+        """
+        path = os.path.join(self.path, "hpa", f"{cluster_size}-{long_entrance}")
+        if os.path.exists(os.path.join(path, "params.json")):
+            return HierarchicalPlanner.load(path, self.maze)
+        planner = HierarchicalPlanner(self.maze, cluster_size=cluster_size, long_entrance=long_entrance)
+        tmp = path + ".tmp"
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp)
+        planner.save(tmp)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.rename(tmp, path)
+        return planner
+
+
+def compile_map(image_path, cache_dir="map_cache", dilate_kernel=3, dilate_iterations=1, icons=None):
+    """
+    Compiled artifact for a floor plan image, built only if the inputs changed.
+    icons: {name: (path, (width, height) or None)} icons to prepare alongside.
+    """
+    icons = icons or {}
+    params = {"version": CACHE_VERSION, "image": _file_sha256(image_path),
+              "dilate_kernel": dilate_kernel, "dilate_iterations": dilate_iterations,
+              "icons": {name: [_file_sha256(p), list(size) if size else None]
+                        for name, (p, size) in icons.items()}}
+    key = _digest(params)
+    final = os.path.join(cache_dir, key[:32])
+    if os.path.exists(os.path.join(final, "manifest.json")):
+        return CompiledMap(final)
+
+    gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise FileNotFoundError("Maze image not found!")
+    tmp = f"{final}.tmp-{os.getpid()}"
+    if os.path.exists(tmp):
+        shutil.rmtree(tmp)
+    os.makedirs(os.path.join(tmp, "icons"))
+    _save_npy(os.path.join(tmp, "gray.npy"), gray)
+    _save_npy(os.path.join(tmp, "maze.npy"), binarize_maze(gray, dilate_kernel, dilate_iterations))
+    for name, (path, size) in icons.items():
+        icon = load_icon(path)
+        if size:
+            icon = cv2.resize(icon, tuple(size))
+        _save_npy(os.path.join(tmp, "icons", name + ".npy"), icon)
+    # The manifest goes last: its presence marks a complete artifact
+    with open(os.path.join(tmp, "manifest.json"), "w") as f:
+        json.dump({"key": key, "source": os.path.abspath(image_path), "params": params}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    try:
+        os.rename(tmp, final)
+    except OSError:
+        # Another process compiled the same map first
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.exists(os.path.join(final, "manifest.json")):
+            raise
+    return CompiledMap(final)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compile a floor plan into the map cache")
+    parser.add_argument("image", type=str, help="Floor plan image")
+    parser.add_argument("--cache", type=str, default="map_cache", help="Cache directory")
+    parser.add_argument("--dilate-kernel", type=int, default=3)
+    parser.add_argument("--dilate-iterations", type=int, default=1)
+    parser.add_argument("--icon", action="append", default=[], metavar="NAME=PATH",
+                        help="Icon to prepare (repeatable), resized to --icon-size")
+    parser.add_argument("--icon-size", type=int, default=60)
+    parser.add_argument("--exit", action="append", default=[], metavar="ROW,COL",
+                        help="Exit cell; all exits are compiled into one distance field")
+    parser.add_argument("--hpa", action="store_true", help="Also compile the HPA* graph")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    size = (args.icon_size, args.icon_size)
+    icons = {name: (path, size) for name, path in (spec.split("=", 1) for spec in args.icon)}
+    start = time.perf_counter()
+    compiled = compile_map(args.image, args.cache, args.dilate_kernel, args.dilate_iterations, icons)
+    if args.exit:
+        compiled.field([tuple(int(v) for v in e.split(",")) for e in args.exit])
+    if args.hpa:
+        compiled.hierarchical()
+    print(f"Map {compiled.key[:12]} ready in {time.perf_counter() - start:.3f}s: {compiled.path}")
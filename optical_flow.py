@@ -0,0 +1,161 @@
+"""
+Crowd Optical Flow
+==================
+Cheaper alternatives to full-resolution Farneback for CrowdFlowPredictor.
+Every mode returns a dense (h, w, 2) per-frame flow field, so arrows and
+forecasts work unchanged:
+- "dense":   Farneback on the full frame (the original behaviour).
+- "pyramid": Farneback on a frame reduced `levels` times with pyrDown; the
+             vectors are upsampled and rescaled to full-frame pixels.
+- "sparse":  pyramidal Lucas-Kanade on corner features inside the person
+             boxes only; each box is filled with the median motion of its
+             points and the rest of the field is zero.
+- skip > 1:  flow is measured only every `skip` frames, between frames
+             `skip` apart, and divided by `skip` to a per-frame field. Over
+             the following `skip` frames the returned field is interpolated
+             linearly from the previous measurement to the new one, or with
+             interpolate=False the new one is held unchanged.
+
+    flow = FlowEstimator("pyramid", levels=2, skip=2)
+    for gray, boxes in frames:
+        field = flow.update(gray, boxes)   # None until there are two frames
+"""
+
+import cv2
+import numpy as np
+
+MODES = ("dense", "pyramid", "sparse")
+
+
+def dense_flow(prev_gray, gray):
+    """
+    Full-resolution Farneback with the parameters CrowdFlowPredictor used.
+    """
+    return cv2.calcOpticalFlowFarneback(prev_gray, gray, None, 0.5, 3, 15, 3, 5, 1.2, 0)
+
+
+def pyramid_flow(prev_gray, gray, levels=1):
+    """
+    Farneback on frames reduced `levels` times (2**levels smaller per side),
+    upsampled back to full size. The window and the number of Farneback
+    pyramid levels shrink with the frame so the spatial support stays the same.
+    """
+    small_prev, small = prev_gray, gray
+    for _ in range(levels):
+        small_prev, small = cv2.pyrDown(small_prev), cv2.pyrDown(small)
+    winsize = max(5, 15 >> levels) | 1
+    flow = cv2.calcOpticalFlowFarneback(small_prev, small, None, 0.5, max(1, 3 - levels), winsize, 3, 5, 1.2, 0)
+    h, w = gray.shape[:2]
+    flow = cv2.resize(flow, (w, h), interpolation=cv2.INTER_LINEAR)
+    flow[..., 0] *= w / small.shape[1]
+    flow[..., 1] *= h / small.shape[0]
+    return flow
+
+
+def _box_mask(shape, boxes):
+    mask = np.zeros(shape[:2], dtype=np.uint8)
+    for x1, y1, x2, y2 in _clip_boxes(shape, boxes):
+        mask[y1:y2, x1:x2] = 255
+    return mask
+
+
+def _clip_boxes(shape, boxes):
+    if boxes is None or len(boxes) == 0:
+        return np.zeros((0, 4), dtype=np.int64)
+    boxes = np.rint(np.asarray(boxes, dtype=np.float64)[:, :4]).astype(np.int64)
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, shape[0])
+    return boxes[(boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])]
+
+
+def sparse_flow(prev_gray, gray, prev_boxes, boxes=None, max_points=400):
+    """
+    Lucas-Kanade on features found inside prev_boxes (x1, y1, x2, y2) of the
+    previous frame. Tracked points are assigned to the current boxes (the
+    previous ones if boxes is None) and each box gets their median motion.
+    """
+    flow = np.zeros(gray.shape[:2] + (2,), dtype=np.float32)
+    boxes = prev_boxes if boxes is None else boxes
+    mask = _box_mask(gray.shape, prev_boxes)
+    if not mask.any():
+        return flow
+    p0 = cv2.goodFeaturesToTrack(prev_gray, max_points, 0.01, 5, mask=mask)
+    if p0 is None:
+        return flow
+    p1, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, p0, None, winSize=(15, 15), maxLevel=3)
+    ok = status.ravel() == 1
+    p0, p1 = p0.reshape(-1, 2)[ok], p1.reshape(-1, 2)[ok]
+    motion = p1 - p0
+    for x1, y1, x2, y2 in _clip_boxes(gray.shape, boxes):
+        inside = (p1[:, 0] >= x1) & (p1[:, 0] < x2) & (p1[:, 1] >= y1) & (p1[:, 1] < y2)
+        if inside.any():
+            flow[y1:y2, x1:x2] = np.median(motion[inside], axis=0)
+    return flow
+
+
+class FlowEstimator:
+    def __init__(self, mode="dense", levels=1, skip=1, max_points=400, interpolate=True):
+        """
+        mode:        "dense", "pyramid" or "sparse" (see the module docstring).
+        levels:      pyrDown steps for "pyramid".
+        skip:        measure flow every `skip` frames (1 = every frame).
+        max_points:  feature budget per frame for "sparse".
+        interpolate: with skip > 1, blend between the last two measurements
+                     instead of holding the last one.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown flow mode {mode!r}, expected one of {MODES}")
+        if skip < 1:
+            raise ValueError("skip must be at least 1")
+        self.mode = mode
+        self.levels = levels
+        self.skip = skip
+        self.max_points = max_points
+        self.interpolate = interpolate
+        self.reset()
+
+    def reset(self):
+        self._key_gray = None  # frame the next measurement starts from
+        self._key_boxes = None
+        self._since = 0
+        self._from = None  # previous per-frame measurement
+        self._to = None  # latest per-frame measurement
+        self._step = 0  # frames since the latest measurement
+        self.flow = None
+
+    def estimate(self, prev_gray, gray, prev_boxes=None, boxes=None):
+        """
+        Displacement field from prev_gray to gray in the configured mode.
+        """
+        if self.mode == "pyramid":
+            return pyramid_flow(prev_gray, gray, self.levels)
+        if self.mode == "sparse":
+            return sparse_flow(prev_gray, gray, prev_boxes, boxes, self.max_points)
+        return dense_flow(prev_gray, gray)
+
+    def update(self, gray, boxes=None):
+        """
+        Feed the next gray frame (and, for "sparse", its person boxes). Returns
+        the per-frame flow field, or None until one has been measured.
+        """
+        if self._key_gray is None:
+            self._key_gray, self._key_boxes = gray, boxes
+            return None
+        self._since += 1
+        if self._since >= self.skip:
+            flow = self.estimate(self._key_gray, gray, self._key_boxes, boxes)
+            if self._since > 1:
+                flow /= self._since
+            self._from = flow if self._to is None else self._to
+            self._to, self._step = flow, 0
+            self._key_gray, self._key_boxes, self._since = gray, boxes, 0
+        if self._to is None:
+            return None
+        if self.skip == 1 or not self.interpolate:
+            self.flow = self._to
+        else:
+            # Reaches the new measurement on the frame before the next one
+            self._step += 1
+            t = min(self._step / self.skip, 1.0)
+            self.flow = cv2.addWeighted(self._from, 1.0 - t, self._to, t, 0.0)
+        return self.flow
@@ -0,0 +1,205 @@
+"""
+Path Query Service
+==================
+Path Finder without the GUI, for volunteers' phones and the dashboard:
+- `PathService` loads the compiled map once (see map_cache) and answers
+  start/goal queries: to the nearest configured exit along a precomputed
+  distance field, or between any two cells with hierarchical A*.
+  Queries only read shared state, so any number of threads can call it.
+- Rendering is optional and separate: `render_route` draws the polyline
+  and blends the icon with one vectorized alpha blend.
+- `PathServer` exposes it over HTTP (JSON). With `workers` > 0, queries run in
+  a pool of processes that each memory-map the same compiled map.
+
+    python path_service.py temple.jpg --exit 5,400 --port 8080 --workers 4
+    curl "localhost:8080/route?start=120,300&goal=5,400"
+    curl "localhost:8080/route?start=120,300"          # nearest exit
+    curl "localhost:8080/render?start=120,300" -o route.png
+"""
+
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+import numpy as np
+
+from floor_plan import blend_icon
+from map_cache import compile_map
+
+
+# --- Rendering ---
+def render_route(gray, path, icon=None, icon_offset=15, color=(0, 0, 255), thickness=2):
+    """
+    BGR image of the floor plan with the route drawn and, optionally, the
+    icon placed at the route's start (as Path Finder places the fire).
+    """
+    image = cv2.cvtColor(np.asarray(gray), cv2.COLOR_GRAY2BGR)
+    if path is not None and len(path):
+        points = np.asarray(path, dtype=np.int32)[:, ::-1].reshape(-1, 1, 2)
+        cv2.polylines(image, [points], isClosed=False, color=color, thickness=thickness)
+        if icon is not None:
+            blend_icon(image, icon, int(path[0][1]) - icon_offset, int(path[0][0]) - icon_offset)
+    return image
+
+
+# --- Queries ---
+class PathService:
+    def __init__(self, image_path, exits=(), cache_dir="map_cache", dilate_kernel=3, dilate_iterations=1,
+                 cluster_size=64, icon_path=None, icon_size=60):
+        """
+        exits:        (row, col) exits for goal-less queries.
+        cluster_size: HPA* cluster size for point-to-point queries.
+        icon_path:    icon drawn at the start of rendered routes.
+        """
+        icons = {"start": (icon_path, (icon_size, icon_size))} if icon_path else None
+        self.map = compile_map(image_path, cache_dir, dilate_kernel, dilate_iterations, icons)
+        self.shape = self.map.maze.shape
+        self.exits = [tuple(e) for e in exits]
+        self._exit_field = self.map.field(self.exits) if self.exits else None
+        self._planner = self.map.hierarchical(cluster_size)
+        self._icon = self.map.icon("start") if icon_path else None
+
+    def route(self, start, goal=None):
+        """
+        (cost, path) from start to goal, or to the nearest exit when goal is
+        None; path is a list of (row, col). (None, None) if there is no path.
+        """
+        start = tuple(int(v) for v in start)
+        if not self._inside(start):
+            return None, None
+        if goal is None:
+            if self._exit_field is None:
+                raise ValueError("No exits configured for goal-less queries")
+            path = self._exit_field.route(start)
+            return (None, None) if path is None else (len(path) - 1, path)
+        goal = tuple(int(v) for v in goal)
+        if not self._inside(goal):
+            return None, None
+        return self._planner.query(start, goal)
+
+    def _inside(self, cell):
+        return 0 <= cell[0] < self.shape[0] and 0 <= cell[1] < self.shape[1]
+
+    def render(self, start, goal=None):
+        """
+        PNG bytes of the route (the plain floor plan if there is none).
+        """
+        _, path = self.route(start, goal)
+        _, png = cv2.imencode(".png", render_route(self.map.gray, path, self._icon))
+        return png.tobytes()
+
+
+# --- Worker processes ---
+_worker = None
+
+
+def _init_worker(kwargs):
+    global _worker
+    _worker = PathService(**kwargs)
+
+
+def _worker_route(start, goal):
+    return _worker.route(start, goal)
+
+
+def _worker_render(start, goal):
+    return _worker.render(start, goal)
+
+
+# --- HTTP ---
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            if url.path == "/health":
+                return self._send(200, "application/json", b'{"status": "ok"}')
+            if url.path not in ("/route", "/render"):
+                return self._send_json(404, {"error": "unknown endpoint"})
+            start = self._cell(params.get("start"))
+            goal = self._cell(params["goal"]) if "goal" in params else None
+            if url.path == "/route":
+                cost, path = self.server.run(_worker_route, self.server.service.route, start, goal)
+                if path is None:
+                    return self._send_json(404, {"error": "no path"})
+                return self._send_json(200, {"cost": cost, "length": len(path),
+                                             "path": [[int(r), int(c)] for r, c in path]})
+            png = self.server.run(_worker_render, self.server.service.render, start, goal)
+            return self._send(200, "image/png", png)
+        except (ValueError, TypeError) as e:
+            return self._send_json(400, {"error": str(e)})
+
+    @staticmethod
+    def _cell(text):
+        if not text:
+            raise ValueError("start (and goal) are given as row,col")
+        row, col = (int(v) for v in text.split(","))
+        return row, col
+
+    def _send_json(self, status, body):
+        self._send(status, "application/json", json.dumps(body).encode())
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # one line per query would dominate the console
+
+
+class PathServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service_kwargs, workers=0):
+        """
+        service_kwargs: PathService arguments.
+        workers:        query processes (0 = answer on the request threads).
+        """
+        self.service = PathService(**service_kwargs)  # also compiles the map before workers start
+        self.pool = None
+        if workers:
+            self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                            initargs=(service_kwargs,))
+        super().__init__(address, _Handler)
+
+    def run(self, worker_fn, local_fn, *args):
+        if self.pool is None:
+            return local_fn(*args)
+        return self.pool.submit(worker_fn, *args).result()
+
+    def server_close(self):
+        super().server_close()
+        if self.pool is not None:
+            self.pool.shutdown()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Headless path query service")
+    parser.add_argument("image", type=str, help="Floor plan image")
+    parser.add_argument("--exit", action="append", default=[], metavar="ROW,COL",
+                        help="Exit for goal-less queries (repeatable)")
+    parser.add_argument("--icon", type=str, default=None, help="Icon drawn at the route start (e.g. fire.jpg)")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=0, help="Query processes (0 = in the server process)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    kwargs = {"image_path": args.image, "icon_path": args.icon,
+              "exits": [tuple(int(v) for v in e.split(",")) for e in args.exit]}
+    server = PathServer((args.host, args.port), kwargs, workers=args.workers)
+    print(f"Serving routes on http://{args.host}:{args.port} ({args.workers or 'no'} worker processes)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
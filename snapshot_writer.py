@@ -0,0 +1,105 @@
+"""
+Snapshot Writer
+===============
+Encodes and saves vehicle snapshots off the tracking loop:
+- `save` only puts the crop on a bounded queue and never blocks; when the
+  queue is full the snapshot is dropped and counted.
+- A small pool of worker threads encodes (cv2.imencode releases the GIL)
+  and writes the files.
+- Format and quality are configurable: "jpg" and "webp" take a quality of
+  0-100, "png" a compression level of 0-9.
+- The caller must pass a crop it owns (e.g. `frame[y1:y2, x1:x2].copy()`),
+  since the frame itself is reused and drawn on.
+
+    writer = SnapshotWriter(workers=2, image_format="jpg", quality=85)
+    writer.save(os.path.join("snapshots_in2", "car17" + writer.extension), crop)
+    writer.close()
+"""
+
+import queue
+import threading
+
+import cv2
+
+FORMATS = {"jpg": (".jpg", cv2.IMWRITE_JPEG_QUALITY),
+           "png": (".png", cv2.IMWRITE_PNG_COMPRESSION),
+           "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY)}
+_STOP = None
+
+
+class SnapshotWriter:
+    def __init__(self, workers=2, max_queue=64, image_format="jpg", quality=90):
+        """
+        workers:      encoding threads.
+        max_queue:    snapshots waiting for a worker; more are dropped.
+        image_format: "jpg", "png" or "webp".
+        quality:      JPEG/WebP quality (0-100) or PNG compression level (0-9).
+        """
+        if image_format not in FORMATS:
+            raise ValueError(f"image_format must be one of {sorted(FORMATS)}")
+        self.extension, flag = FORMATS[image_format]
+        self.params = [flag, int(quality)]
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self.saved = 0
+        self.dropped = 0
+        self.failed = 0
+        self.last_error = None
+        self._closed = False
+        self._threads = [threading.Thread(target=self._run, daemon=True) for _ in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def save(self, path, image):
+        """
+        Queue one snapshot; never blocks. Returns False if it was dropped.
+        """
+        try:
+            self._queue.put_nowait((path, image))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            path, image = item
+            try:
+                ok, data = cv2.imencode(self.extension, image, self.params)
+                if not ok:
+                    raise ValueError(f"Could not encode {path}")
+                with open(path, "wb") as f:
+                    f.write(data.tobytes())
+                with self._lock:
+                    self.saved += 1
+            except Exception as e:  # keep the worker alive; the snapshot is counted as failed
+                with self._lock:
+                    self.failed += 1
+                    self.last_error = e
+
+    def stats(self):
+        with self._lock:
+            return {"queued": self._queue.qsize(), "saved": self.saved, "dropped": self.dropped,
+                    "failed": self.failed}
+
+    def close(self, timeout=None):
+        """
+        Save everything still queued and stop the workers.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
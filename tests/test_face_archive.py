@@ -0,0 +1,38 @@
+import numpy as np
+
+from face_archive import FaceArchive
+from face_gallery import ENCODING_DIM
+
+
+def unit(v):
+    return (v / np.linalg.norm(v, axis=-1, keepdims=True)).astype(np.float32)
+
+
+def test_each_query_keeps_its_own_top_k_across_chunks(tmp_path):
+    rng = np.random.default_rng(0)
+    a, b = unit(rng.standard_normal((2, ENCODING_DIM)))
+    archive = FaceArchive(str(tmp_path))
+    # Many near-duplicates of a, and a few looser matches of b in a later chunk
+    for i in range(40):
+        archive.append("cam0", 1000.0 + i, i, (0, 1, 1, 0), unit(a + 0.01 * rng.standard_normal(ENCODING_DIM)))
+    for i in range(40, 43):
+        archive.append("cam0", 1000.0 + i, i, (0, 1, 1, 0), unit(b + 0.3 * rng.standard_normal(ENCODING_DIM)))
+
+    hits_a, hits_b = archive.search(np.stack([a, b]), 0, 2000, k=3, chunk=8)
+    assert all(h["frame"] < 40 for h in hits_a)
+    assert sorted(h["frame"] for h in hits_b) == [40, 41, 42]
+
+
+def test_search_sees_records_after_a_torn_write(tmp_path):
+    archive = FaceArchive(str(tmp_path), partition_seconds=100, flush_every=2)
+    encoding = unit(np.ones(ENCODING_DIM))
+    archive.append("cam0", 10.0, 0, (0, 1, 1, 0), encoding)
+    archive.append("cam0", 11.0, 1, (0, 1, 1, 0), encoding)
+    enc_path, _ = archive._segment_paths(0, "cam0")
+    with open(enc_path, "ab") as f:
+        f.write(b"torn")  # a crash between the .enc and .meta appends
+    archive.append("cam0", 12.0, 2, (0, 1, 1, 0), encoding)
+    archive.flush()
+
+    hits, = archive.search(encoding[None], 0, 100, k=5)
+    assert sorted(h["frame"] for h in hits) == [0, 1, 2]
@@ -0,0 +1,41 @@
+import numpy as np
+
+from face_gallery import ENCODING_DIM
+from face_index import IVFIndex, squared_distances
+
+
+def small_gallery(n, seed=0):
+    rng = np.random.default_rng(seed)
+    gallery = rng.standard_normal((n, ENCODING_DIM)).astype(np.float32)
+    return gallery / np.linalg.norm(gallery, axis=1, keepdims=True)
+
+
+def test_pq_search_on_gallery_smaller_than_codebook():
+    # 100 encodings: k-means caps every PQ codebook at 100 codes instead of 256
+    gallery = small_gallery(100)
+    index = IVFIndex(nlist=4, nprobe=4, pq_m=8).train(gallery).add(gallery)
+    assert index.codebooks.shape[1] == 100
+
+    rows, distances = index.search(gallery[:5], k=3)
+    assert rows.shape == (5, 3)
+    assert (rows >= 0).all()
+    assert np.isfinite(distances).all()
+
+
+def test_pq_rerank_finds_exact_neighbours_on_small_gallery():
+    gallery = small_gallery(50, seed=1)
+    sq = np.einsum("ij,ij->i", gallery, gallery)
+    index = IVFIndex(nlist=2, nprobe=2, pq_m=16, rerank=50).train(gallery).add(gallery)
+
+    rows, _ = index.search(gallery[:10], k=1, vectors=gallery, vector_sq_norms=sq)
+    exact = squared_distances(gallery[:10], gallery, sq).argmin(axis=1)
+    assert np.array_equal(rows[:, 0], exact)
+
+
+def test_pq_search_after_save_and_load(tmp_path):
+    gallery = small_gallery(30, seed=2)
+    index = IVFIndex(nlist=3, nprobe=3, pq_m=8).train(gallery).add(gallery)
+    index.save(tmp_path / "index.npz")
+
+    loaded = IVFIndex.load(tmp_path / "index.npz")
+    assert np.array_equal(loaded.search(gallery[:4], k=2)[0], index.search(gallery[:4], k=2)[0])
@@ -0,0 +1,29 @@
+import numpy as np
+
+from distance_field import DistanceField
+from hpa_star import HierarchicalPlanner
+
+
+def test_neighbouring_clusters_get_the_exact_route():
+    # Open floor: the long border stretch gets entrances only at its ends, so
+    # a route through them detours around the middle of the border
+    maze = np.zeros((32, 32), dtype=np.uint8)
+    planner = HierarchicalPlanner(maze, cluster_size=16)
+    start, goal = (8, 10), (8, 22)
+
+    cost, path = planner.query(start, goal)
+    assert cost == DistanceField(maze, [goal]).distance(start)
+    assert path[0] == start and path[-1] == goal and len(path) - 1 == cost
+    assert all(maze[r, c] == 0 for r, c in path)
+    assert all(abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1 for a, b in zip(path, path[1:]))
+
+
+def test_distant_route_is_a_valid_path():
+    rng = np.random.default_rng(0)
+    maze = (rng.random((96, 96)) < 0.15).astype(np.uint8)
+    maze[0, :] = maze[:, 0] = 0
+    planner = HierarchicalPlanner(maze, cluster_size=16)
+
+    cost, path = planner.query((0, 0), (0, 95))
+    assert path[0] == (0, 0) and path[-1] == (0, 95) and len(path) - 1 == cost
+    assert cost >= DistanceField(maze, [(0, 95)]).distance((0, 0))
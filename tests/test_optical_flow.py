@@ -0,0 +1,31 @@
+import numpy as np
+
+from optical_flow import FlowEstimator
+
+
+class ScriptedFlow(FlowEstimator):
+    """
+    Measures a uniform displacement equal to the difference of the frame values.
+    """
+
+    def estimate(self, prev_gray, gray, prev_boxes=None, boxes=None):
+        return np.full((2, 2, 2), float(gray[0, 0]) - float(prev_gray[0, 0]), dtype=np.float32)
+
+
+def frames(values):
+    return [np.full((2, 2), v, dtype=np.float32) for v in values]
+
+
+def test_skip_interpolates_between_measurements():
+    # 1 px/frame for three frames, then 4 px/frame
+    flow = ScriptedFlow(skip=3)
+    out = [flow.update(g) for g in frames([0, 1, 2, 3, 7, 11, 15, 19])]
+    assert out[:3] == [None, None, None]
+    seen = [float(f[0, 0, 0]) for f in out[3:]]
+    assert np.allclose(seen, [1, 1, 1, 2, 3])
+
+
+def test_skip_without_interpolation_holds_last_measurement():
+    flow = ScriptedFlow(skip=3, interpolate=False)
+    out = [flow.update(g) for g in frames([0, 1, 2, 3, 7, 11, 15])]
+    assert np.allclose([float(f[0, 0, 0]) for f in out[3:]], [1, 1, 1, 4])
@@ -0,0 +1,48 @@
+from track_store import TrackStore
+
+
+def test_memory_stays_bounded_over_many_ttl_cycles():
+    store = TrackStore(history=5, capacity=64, ttl=2.0)
+    nbytes = store.points.nbytes
+    track_id = 0
+    # 500 cycles of 20 fresh tracks, each forgotten after the TTL
+    for cycle in range(500):
+        t = cycle * 3.0
+        for _ in range(20):
+            for step in range(3):
+                store.append(track_id, (step, step), t)
+            track_id += 1
+        store.evict(t)
+        assert len(store) == 20
+        assert len(store._slots) == 20
+    store.evict(500 * 3.0 + 10)
+    assert len(store) == 0
+    assert store.points.nbytes == nbytes
+    assert len(store._free) == store.capacity
+    assert store.evicted == track_id
+
+
+def test_full_store_evicts_the_least_recently_seen_track():
+    store = TrackStore(history=3, capacity=3, ttl=100.0)
+    for track_id, t in ((1, 0.0), (2, 1.0), (3, 2.0)):
+        store.append(track_id, (track_id, 0), t)
+    store.set_flags(1, 1)
+    store.append(1, (1, 1), 3.0)  # track 2 is now the stalest
+
+    store.append(4, (4, 0), 4.0)
+    assert 2 not in store
+    assert {1, 3, 4} == {i for i in (1, 2, 3, 4) if i in store}
+    assert store.evicted == 1
+    # A reused slot starts empty
+    assert store.length(4) == 1 and store.get_flags(4) == 0
+    assert store.get_flags(1) == 1 and store.previous(1) == (1, 0)
+
+
+def test_unsigned_64_bit_ids():
+    store = TrackStore(history=3, capacity=2, ttl=1.0)
+    big = 0xFFFFFFFFFFFFFFFE
+    store.append(big, (1, 2), 0.0)
+    store.append(big, (3, 4), 0.5)
+    assert store.previous(big) == (1, 2)
+    assert store.evict(5.0) == [big]
+    assert big not in store
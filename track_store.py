@@ -0,0 +1,137 @@
+"""
+Track Store
+===========
+Bounded per-track point history for the counting loops, replacing a dict
+of Python lists trimmed with pop(0) and a crossed-ID set that never
+shrinks:
+- All tracks live in preallocated slots: a NumPy ring buffer of the last
+  `history` points per slot and a NumPy array of last-seen times (so
+  eviction is vectorized), with the per-slot id, head, length and flags
+  word (e.g. which lines the track has crossed) in fixed-size lists,
+  which are cheaper than NumPy scalars for single-element updates. Ids
+  can be any hashable, e.g. DeepStream's unsigned 64-bit object ids.
+- `append` and `previous` are O(1); `history` returns the points oldest
+  first for drawing.
+- `evict(now)` frees the slots of tracks not seen for `ttl` seconds, so
+  their ids, points and flags go away together. When every slot is taken,
+  the least recently seen track is evicted to make room, so memory never
+  exceeds `capacity` tracks.
+
+    store = TrackStore(history=30, capacity=1024, ttl=10.0)
+    store.append(track_id, (x, y), t)
+    prev = store.previous(track_id)
+    store.evict(t)
+"""
+
+import numpy as np
+
+
+class TrackStore:
+    def __init__(self, history=30, capacity=1024, ttl=10.0):
+        """
+        history:  points kept per track.
+        capacity: tracks kept at once; the stalest is evicted beyond this.
+        ttl:      seconds without an update after which a track is evicted.
+        """
+        if history < 2:
+            raise ValueError("history must be at least 2")
+        self.history_size = history
+        self.capacity = capacity
+        self.ttl = ttl
+        self.points = np.zeros((capacity, history, 2), dtype=np.int32)
+        self.last_seen = np.full(capacity, np.inf)  # inf = free slot, never stale
+        self.lengths = [0] * capacity
+        self.heads = [0] * capacity  # index of the next write
+        self.flags = [0] * capacity
+        self.ids = [None] * capacity
+        self.evicted = 0
+        self._slots = {}
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, track_id):
+        return track_id in self._slots
+
+    def _release(self, slot):
+        del self._slots[self.ids[slot]]
+        self.ids[slot] = None
+        self.lengths[slot] = 0
+        self.heads[slot] = 0
+        self.flags[slot] = 0
+        self.last_seen[slot] = np.inf
+        self._free.append(slot)
+        self.evicted += 1
+
+    def _new_slot(self, track_id):
+        if not self._free:
+            self._release(int(np.argmin(self.last_seen)))
+        slot = self._free.pop()
+        self._slots[track_id] = slot
+        self.ids[slot] = track_id
+        return slot
+
+    def append(self, track_id, point, t):
+        """
+        Add the track's latest point, seen at time t (seconds).
+        """
+        slot = self._slots.get(track_id)
+        if slot is None:
+            slot = self._new_slot(track_id)
+        head = self.heads[slot]
+        self.points[slot, head] = point
+        self.heads[slot] = head + 1 if head + 1 < self.history_size else 0
+        if self.lengths[slot] < self.history_size:
+            self.lengths[slot] += 1
+        self.last_seen[slot] = t
+
+    def length(self, track_id):
+        slot = self._slots.get(track_id)
+        return 0 if slot is None else self.lengths[slot]
+
+    def last(self, track_id, back=0):
+        """
+        The track's latest point (back=0), the one before it (back=1), ...
+        or None if the track has fewer points.
+        """
+        slot = self._slots.get(track_id)
+        if slot is None or back >= self.lengths[slot]:
+            return None
+        x, y = self.points[slot, (self.heads[slot] - 1 - back) % self.history_size].tolist()
+        return x, y
+
+    def previous(self, track_id):
+        return self.last(track_id, 1)
+
+    def history(self, track_id):
+        """
+        The track's points, oldest first: (n, 2) int32.
+        """
+        slot = self._slots.get(track_id)
+        if slot is None:
+            return np.zeros((0, 2), dtype=np.int32)
+        n, head = self.lengths[slot], self.heads[slot]
+        if n < self.history_size:
+            return self.points[slot, :n].copy()
+        return np.roll(self.points[slot], -head, axis=0)
+
+    def get_flags(self, track_id):
+        slot = self._slots.get(track_id)
+        return 0 if slot is None else self.flags[slot]
+
+    def set_flags(self, track_id, flags):
+        """
+        OR flags into the track's flags word (the track must exist).
+        """
+        self.flags[self._slots[track_id]] |= flags
+
+    def evict(self, now):
+        """
+        Free tracks not seen since now - ttl. Returns the evicted ids.
+        """
+        stale = np.nonzero(self.last_seen < now - self.ttl)[0].tolist()
+        evicted = [self.ids[slot] for slot in stale]
+        for slot in stale:
+            self._release(slot)
+        return evicted
@@ -0,0 +1,183 @@
+"""
+Traffic Batch Counter
+=====================
+Counts recorded traffic videos headlessly across a process pool:
+- ROI, counting lines and tracker settings come from a JSON config (see
+  traffic_counter.load_config; Traffic Monitoring's --save-config writes one).
+- Long videos are cut into chunks of `chunk_seconds`. A chunk's tracker
+  starts `overlap_seconds` earlier and only counts from the chunk's own
+  start, so vehicles near a boundary have a track history and each
+  crossing is counted by exactly one chunk (the one containing its frame).
+- Every chunk runs in a worker process with its own model and tracker and
+  returns its crossings; snapshots are saved by the worker.
+- The merge is deterministic whatever order chunks finish in: crossings
+  are ordered by (video, frame, track id), vehicle ids are renumbered
+  1..N in that order (tracker ids restart in every chunk), the log is
+  written once with the chosen backend, and per-chunk, per-video and
+  total counts go to summary.json.
+- Event timestamps are the recording start plus the video time; the start
+  is the config's `recorded_at` or else the video file's modification time.
+
+    python traffic_batch.py footage/*.MP4 --config junction.json --chunk-minutes 10 --workers 4
+"""
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from event_sink import CsvBackend, HourlyColumnarBackend, SqliteBackend
+from snapshot_writer import SnapshotWriter
+from traffic_counter import CLASS_NAMES, count_video, load_config, recording_start
+
+
+def plan_chunks(video, chunk_seconds=None, overlap_seconds=5.0):
+    """
+    Jobs for one video: (start_frame, end_frame, warmup_frame) per chunk,
+    the whole video as one chunk when chunk_seconds is None.
+    """
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Could not open video file at {video}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    step = frames if not chunk_seconds else max(1, int(round(chunk_seconds * fps)))
+    overlap = int(round(overlap_seconds * fps))
+    jobs = []
+    for index, start in enumerate(range(0, max(frames, 1), max(step, 1))):
+        end = None if start + step >= frames else start + step  # the last chunk reads to the real end
+        jobs.append({"video": video, "chunk": index, "start_frame": start, "end_frame": end,
+                     "warmup_frame": max(0, start - overlap)})
+    return jobs
+
+
+# --- Worker processes ---
+def _count_chunk(job):
+    config = job["config"]
+    writer = None
+    if job["snapshots"]:
+        writer = SnapshotWriter(image_format=job["snapshot_format"], quality=job["snapshot_quality"])
+    start = time.time()
+    try:
+        counter = count_video(job["video"], config, start_frame=job["warmup_frame"], end_frame=job["end_frame"],
+                              count_from=job["start_frame"], recorded_at=job["recorded_at"],
+                              snapshot_writer=writer, snapshot_dirs=job["snapshot_dirs"])
+    finally:
+        if writer is not None:
+            writer.close()
+    return {"video": job["video"], "chunk": job["chunk"], "start_frame": job["start_frame"],
+            "end_frame": job["end_frame"], "in": counter.in_counts, "out": counter.out_counts,
+            "crossings": counter.crossings, "seconds": time.time() - start}
+
+
+# --- Merge ---
+def merge(results, videos):
+    """
+    (log events, summary) from chunk results, independent of their order.
+    """
+    order = {video: i for i, video in enumerate(videos)}
+    results = sorted(results, key=lambda r: (order[r["video"]], r["chunk"]))
+    crossings = sorted(((order[r["video"]], c.frame, c.track_id, c) for r in results for c in r["crossings"]),
+                       key=lambda item: item[:3])
+    events = [(c.timestamp, vehicle_id, c.vehicle_type, c.image_path, c.direction)
+              for vehicle_id, (_, _, _, c) in enumerate(crossings, 1)]
+
+    def empty():
+        return {name: 0 for name in CLASS_NAMES.values()}
+
+    summary = {"videos": {}, "total": {"in": empty(), "out": empty()}}
+    for r in results:
+        entry = summary["videos"].setdefault(r["video"], {"in": empty(), "out": empty(), "chunks": []})
+        entry["chunks"].append({"chunk": r["chunk"], "start_frame": r["start_frame"], "end_frame": r["end_frame"],
+                                "in": r["in"], "out": r["out"], "crossings": len(r["crossings"])})
+        for direction in ("in", "out"):
+            for name, count in r[direction].items():
+                entry[direction][name] = entry[direction].get(name, 0) + count
+                summary["total"][direction][name] = summary["total"][direction].get(name, 0) + count
+    return events, summary
+
+
+def make_backend(kind, output):
+    if kind == "csv":
+        return CsvBackend(os.path.join(output, "vehicle_log_in.csv"), os.path.join(output, "vehicle_log_out.csv"))
+    if kind == "sqlite":
+        return SqliteBackend(os.path.join(output, "vehicle_log.db"))
+    if kind == "hourly":
+        return HourlyColumnarBackend(os.path.join(output, "vehicle_log"))
+    raise ValueError(f"Unknown log backend: {kind}")
+
+
+def run_batch(videos, config, output="traffic_batch", workers=None, chunk_seconds=None, overlap_seconds=5.0,
+              log_backend="csv", snapshots=True, snapshot_format="jpg", snapshot_quality=90):
+    """
+    Count every video, write the merged log and summary.json to output and
+    return the summary.
+    """
+    if os.path.exists(os.path.join(output, "summary.json")):
+        raise FileExistsError(f"{output} already holds a batch run; logs are appended, so use a new folder")
+    snapshot_dirs = (os.path.join(output, "snapshots_in"), os.path.join(output, "snapshots_out"))
+    for folder in (output,) + (snapshot_dirs if snapshots else ()):
+        os.makedirs(folder, exist_ok=True)
+    jobs = []
+    for video in videos:
+        start = recording_start(config)
+        if start is None:
+            start = datetime.datetime.fromtimestamp(os.path.getmtime(video))
+        for job in plan_chunks(video, chunk_seconds, overlap_seconds):
+            job.update(config=config, recorded_at=start, snapshots=snapshots, snapshot_dirs=snapshot_dirs,
+                       snapshot_format=snapshot_format, snapshot_quality=snapshot_quality)
+            jobs.append(job)
+
+    results = []
+    # Spawned, not forked: CUDA and OpenCV's thread pools do not survive a fork
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(_count_chunk, job) for job in jobs]
+        for done, future in enumerate(as_completed(futures), 1):
+            r = future.result()
+            results.append(r)
+            print(f"[{done}/{len(jobs)}] {os.path.basename(r['video'])} chunk {r['chunk']}: "
+                  f"{len(r['crossings'])} crossings in {r['seconds']:.0f} s")
+
+    events, summary = merge(results, videos)
+    backend = make_backend(log_backend, output)
+    try:
+        if events:
+            backend.write(events)
+    finally:
+        backend.close()
+    with open(os.path.join(output, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Headless vehicle counting over many recorded videos")
+    parser.add_argument("videos", nargs="+", help="Video files, counted and logged in this order")
+    parser.add_argument("--config", type=str, required=True, help="JSON with the ROI and counting lines")
+    parser.add_argument("--output", type=str, default="traffic_batch", help="Folder for logs, snapshots and summary")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-minutes", type=float, default=None, help="Split videos into chunks of this length")
+    parser.add_argument("--overlap-seconds", type=float, default=5.0, help="Tracker warm-up before each chunk")
+    parser.add_argument("--log-backend", choices=("csv", "sqlite", "hourly"), default="csv")
+    parser.add_argument("--device", type=str, default=None, help="Inference device, overrides the config")
+    parser.add_argument("--no-snapshots", action="store_true", help="Do not save vehicle snapshots")
+    parser.add_argument("--snapshot-format", choices=("jpg", "png", "webp"), default="jpg")
+    parser.add_argument("--snapshot-quality", type=int, default=90)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    config = load_config(args.config)
+    if args.device is not None:
+        config["device"] = args.device
+    summary = run_batch(args.videos, config, args.output, args.workers,
+                        args.chunk_minutes * 60 if args.chunk_minutes else None, args.overlap_seconds,
+                        args.log_backend, not args.no_snapshots, args.snapshot_format, args.snapshot_quality)
+    print(f"Total IN: {summary['total']['in']}  OUT: {summary['total']['out']}")
@@ -0,0 +1,221 @@
+"""
+Traffic Counter
+===============
+The counting loop of Traffic Monitoring as an importable module, so it can
+run headless and in batch (see traffic_batch):
+- `load_config` reads the ROI, the IN/OUT lines and the tracker settings
+  from a JSON file (`save_config` writes one, e.g. from the interactive
+  setup); settings left out take `DEFAULTS`. A null device lets
+  ultralytics pick the GPU when there is one.
+- `TrafficCounter.update` counts one frame's tracked vehicles with the
+  vectorized ROI and line tests (counting_engine) and bounded track
+  memory (track_store); snapshots go to a SnapshotWriter and events to an
+  EventSink when given. Every crossing is also kept as a `Crossing` with
+  its frame index and video time.
+- `count_video` tracks a frame range of a video. Frames before
+  `count_from` only warm up the tracker and the track histories: their
+  crossings are marked but not counted, so overlapping chunks count each
+  vehicle once.
+- Event timestamps are `recorded_at` plus the video time when the start
+  of the recording is known, else the wall clock (live use).
+
+    {"roi": [[200, 150], [1700, 100], [1850, 950], [150, 1000]],
+     "in_line": [[300, 520], [1600, 500]],
+     "out_line": [[300, 600], [1600, 590]],
+     "model": "yolo11m-seg.pt", "device": null, "recorded_at": "2025-03-01T07:00:00"}
+"""
+
+import collections
+import datetime
+import json
+import os
+
+import cv2
+import numpy as np
+
+from counting_engine import CountingEngine
+from track_store import TrackStore
+
+# COCO class names for vehicles
+CLASS_NAMES = {2: 'car', 3: 'motorcycle', 5: 'bus', 7: 'truck'}
+CROSSED = 1  # track flag: already counted (or crossed during warm-up)
+DEFAULTS = {"model": "yolo11m-seg.pt", "tracker": "custom_tracker.yaml", "device": None, "conf": 0.5,
+            "track_history": 30, "track_ttl": 10.0, "recorded_at": None}
+
+Crossing = collections.namedtuple("Crossing",
+                                  "frame video_time timestamp track_id vehicle_type direction image_path")
+
+
+# --- Configuration ---
+def load_config(path):
+    """
+    Counting configuration from a JSON file, with DEFAULTS filled in.
+    """
+    with open(path) as f:
+        config = {**DEFAULTS, **json.load(f)}
+    if len(config.get("roi") or []) < 3:
+        raise ValueError(f"{path}: roi needs at least 3 points")
+    for key in ("in_line", "out_line"):
+        if len(config.get(key) or []) != 2:
+            raise ValueError(f"{path}: {key} needs exactly 2 points")
+    for key in ("roi", "in_line", "out_line"):
+        config[key] = [(int(x), int(y)) for x, y in config[key]]
+    return config
+
+
+def save_config(path, roi, in_line, out_line, **settings):
+    config = {"roi": [list(p) for p in roi], "in_line": [list(p) for p in in_line],
+              "out_line": [list(p) for p in out_line], **settings}
+    with open(path, "w") as f:
+        json.dump(config, f, indent=2)
+
+
+def recording_start(config):
+    """
+    The configured start of the recording as a datetime, or None.
+    """
+    value = config.get("recorded_at")
+    return datetime.datetime.fromisoformat(value) if value else None
+
+
+def load_model(config):
+    from ultralytics import YOLO
+    return YOLO(config["model"])
+
+
+def tracked(result):
+    """
+    (xywh boxes (N, 4), track ids, class ids) of an ultralytics tracking result.
+    """
+    boxes = result.boxes
+    if boxes is None or boxes.id is None:
+        return np.zeros((0, 4), dtype=np.float32), [], []
+    return boxes.xywh.cpu().numpy(), boxes.id.int().cpu().tolist(), boxes.cls.int().cpu().tolist()
+
+
+# --- Counting ---
+class TrafficCounter:
+    def __init__(self, config, frame_size, snapshot_writer=None, event_sink=None,
+                 snapshot_dirs=("snapshots_in2", "snapshots_out2")):
+        """
+        config:          see load_config.
+        frame_size:      (width, height) of the video.
+        snapshot_writer: SnapshotWriter for vehicle crops (None = no snapshots).
+        event_sink:      EventSink receiving each crossing (None = only kept in `crossings`).
+        snapshot_dirs:   folders for IN and OUT snapshots.
+        """
+        self.frame_size = frame_size
+        self.engine = CountingEngine({"in": tuple(config["in_line"]), "out": tuple(config["out_line"])},
+                                     roi=config["roi"], frame_size=frame_size)
+        self.tracks = TrackStore(config["track_history"], ttl=config["track_ttl"])
+        self.snapshot_writer = snapshot_writer
+        self.event_sink = event_sink
+        self.snapshot_dirs = {"in": snapshot_dirs[0], "out": snapshot_dirs[1]}
+        self.in_counts = {name: 0 for name in CLASS_NAMES.values()}
+        self.out_counts = {name: 0 for name in CLASS_NAMES.values()}
+        self.crossings = []
+
+    def _snapshot(self, frame, box, name):
+        if self.snapshot_writer is None:
+            return ""
+        W, H = self.frame_size
+        x, y, w, h = box
+        x1, y1 = max(0, int(x - w / 2)), max(0, int(y - h / 2))
+        x2, y2 = min(W, int(x + w / 2)), min(H, int(y + h / 2))
+        snapshot = frame[y1:y2, x1:x2]
+        if snapshot.size == 0:
+            return "N/A (empty crop)"
+        # Encoded and written by the worker pool; copy only the crop
+        if not self.snapshot_writer.save(name, snapshot.copy()):
+            return "N/A (dropped)"  # the pool is backed up; never log a file that will not exist
+        return name
+
+    def update(self, frame, boxes, track_ids, classes, frame_index, frame_time, timestamp=None, count=True,
+               trails=None):
+        """
+        Count the frame's tracked vehicles (xywh boxes, track ids, class ids)
+        before anything is drawn on it. With count=False crossings are only
+        marked (warm-up). Trail polylines are appended to `trails` if given.
+        Returns the crossings counted on this frame.
+        """
+        centers = np.asarray(boxes)[:, :2].astype(np.int32)
+        candidates, previous = [], []  # uncounted tracks with a previous point
+        for i in np.nonzero(self.engine.in_roi(centers))[0].tolist():
+            track_id = track_ids[i]
+            self.tracks.append(track_id, centers[i], frame_time)
+            if self.tracks.length(track_id) > 1:
+                if trails is not None:
+                    trails.append(self.tracks.history(track_id).reshape((-1, 1, 2)))
+                if not self.tracks.get_flags(track_id) & CROSSED:
+                    candidates.append(i)
+                    previous.append(self.tracks.previous(track_id))
+
+        # Test every candidate against the IN and OUT lines at once
+        counted = []
+        gates, _ = self.engine.first_gate(previous, centers[candidates])
+        for i, gate in zip(candidates, gates.tolist()):
+            if gate < 0:
+                continue
+            track_id = track_ids[i]
+            self.tracks.set_flags(track_id, CROSSED)
+            if not count:
+                continue
+            direction = self.engine.names[gate]
+            vehicle_type = CLASS_NAMES.get(classes[i], 'unknown')
+            (self.in_counts if direction == "in" else self.out_counts)[vehicle_type] += 1
+
+            stamp = timestamp or datetime.datetime.now()
+            image_filename = (f"{stamp.strftime('%Y%m%d_%H%M%S_%f')}{vehicle_type}{track_id}"
+                              f"{self.snapshot_writer.extension if self.snapshot_writer else ''}")
+            image_path = self._snapshot(frame, boxes[i], os.path.join(self.snapshot_dirs[direction], image_filename))
+            crossing = Crossing(frame_index, frame_time, stamp, track_id, vehicle_type, direction, image_path)
+            self.crossings.append(crossing)
+            counted.append(crossing)
+            if self.event_sink is not None:
+                self.event_sink.emit(stamp, track_id, vehicle_type, image_path, direction)
+
+        # Forget tracks that left the scene
+        self.tracks.evict(frame_time)
+        return counted
+
+
+def count_video(video, config, start_frame=0, end_frame=None, count_from=None, model=None, recorded_at=None,
+                on_frame=None, **counter_kwargs):
+    """
+    Track and count frames [start_frame, end_frame) of a video; crossings
+    before count_from (default start_frame) only warm up. A new model (and
+    so a new tracker) is loaded unless one is passed. on_frame(frame,
+    counter, trails) runs after each frame, e.g. to draw and show it, and
+    stops the run by returning False. Returns the TrafficCounter.
+    """
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Could not open video file at {video}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    if model is None:
+        model = load_model(config)
+    counter = TrafficCounter(config, frame_size, **counter_kwargs)
+    count_from = start_frame if count_from is None else count_from
+    if start_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    frame_index = start_frame
+    try:
+        while end_frame is None or frame_index < end_frame:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            result = model.track(frame, persist=True, tracker=config["tracker"], device=config["device"],
+                                 classes=list(CLASS_NAMES), verbose=False, conf=config["conf"])[0]
+            frame_time = frame_index / fps
+            timestamp = None if recorded_at is None else recorded_at + datetime.timedelta(seconds=frame_time)
+            trails = [] if on_frame is not None else None
+            counter.update(frame, *tracked(result), frame_index, frame_time, timestamp,
+                           count=frame_index >= count_from, trails=trails)
+            frame_index += 1
+            if on_frame is not None and on_frame(frame, counter, trails) is False:
+                break
+    finally:
+        cap.release()
+    return counter